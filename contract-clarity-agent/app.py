@@ -3,10 +3,9 @@ Streamlit UI for Contract Clarity Agent.
 Provides file upload, chat interface, and analysis display.
 """
 
-import streamlit as st
-import asyncio
 import os
-from pathlib import Path
+import streamlit as st
+import time
 import tempfile
 from dotenv import load_dotenv
 
@@ -15,7 +14,11 @@ load_dotenv()
 
 # Import agent (will be imported after installation)
 try:
-    from src.agent import ContractClarityAgent
+    from src.agent import ContractClarityAgent, create_chat_client
+    from src.analysis_jobs import get_job_queue
+    from src.background_loop import get_background_loop
+    from src.converter_service import InMemoryDocument, get_converter_service
+    from src.telemetry import session_profile
     AGENT_AVAILABLE = True
 except ImportError:
     AGENT_AVAILABLE = False
@@ -91,23 +94,48 @@ def init_session_state():
         st.session_state.messages = []
     if "analysis_result" not in st.session_state:
         st.session_state.analysis_result = None
-    if "uploaded_file_path" not in st.session_state:
-        st.session_state.uploaded_file_path = None
+    if "analysis_job_id" not in st.session_state:
+        st.session_state.analysis_job_id = None
+    if "analysis_error" not in st.session_state:
+        st.session_state.analysis_error = None
     if "new_thread_requested" not in st.session_state:
         st.session_state.new_thread_requested = False
 
 
+@st.cache_resource(show_spinner=False)
+def get_shared_chat_client():
+    """
+    Azure chat client shared by every session's agent, once per server process.
+    All agent calls run on the background event loop, so its HTTP connection
+    pool stays open across reruns instead of being rebuilt on every turn.
+    """
+    return create_chat_client()
+
+
 def get_agent():
-    """Get or create agent instance."""
+    """Get or create agent instance (kept in session state across reruns)."""
     if st.session_state.agent is None and AGENT_AVAILABLE:
         try:
-            st.session_state.agent = ContractClarityAgent()
+            st.session_state.agent = ContractClarityAgent(chat_client=get_shared_chat_client())
         except Exception as e:
             st.error(f"Error initializing agent: {str(e)}")
             st.info("Please check your .env file and ensure all required variables are set.")
     return st.session_state.agent
 
 
+@st.cache_resource(show_spinner=False)
+def warm_document_converter():
+    """
+    Start loading Docling models in the background, once per server process,
+    so the first analysis in any session only pays for conversion time.
+    """
+    try:
+        return get_converter_service().warm_up()
+    except Exception as e:
+        print(f"Warning: Could not warm up Docling converter: {e}")
+        return None
+
+
 def display_disclaimer():
     """Display legal disclaimer."""
     st.markdown("""
@@ -162,51 +190,78 @@ def display_example_use_cases():
         """)
 
 
-def save_uploaded_file(uploaded_file) -> str:
+def to_in_memory_document(uploaded_file) -> "InMemoryDocument":
     """
-    Save uploaded file to temp directory.
+    Wrap an upload for processing without writing it to disk.
     
     Args:
         uploaded_file: Streamlit UploadedFile object
     
     Returns:
-        Path to saved file
+        InMemoryDocument sharing the upload's bytes
     """
-    # Create uploads directory if it doesn't exist
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
-    
-    # Save file
-    file_path = upload_dir / uploaded_file.name
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    
-    return str(file_path)
+    return InMemoryDocument(name=uploaded_file.name, data=uploaded_file.getvalue())
+
+
+# Minimum seconds between re-renders of streamed text (each render resends the whole text)
+STREAM_REFRESH_SECONDS = 0.1
+
+# Seconds between status polls of a running background analysis
+ANALYSIS_POLL_SECONDS = 1.0
 
 
-def delete_uploaded_file(file_path: str):
+@st.fragment(run_every=ANALYSIS_POLL_SECONDS)
+def display_analysis_job():
     """
-    Delete an uploaded file from the uploads directory.
-    
-    Args:
-        file_path: Path to the file to delete
+    Show the session's background analysis job: queue position, conversion
+    progress and the report as it is written. Only this fragment reruns on
+    each poll; once the job finishes the whole page reruns with the result.
     """
-    try:
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"Deleted file: {file_path}")
-    except Exception as e:
-        print(f"Error deleting file {file_path}: {e}")
+    queue = get_job_queue()
+    job = queue.get(st.session_state.analysis_job_id)
+    if job is None or job.finished:
+        st.session_state.analysis_job_id = None
+        if job is None:
+            st.session_state.analysis_error = "The analysis job expired. Please analyze the document again."
+        elif job.status == "done":
+            st.session_state.analysis_result = job.result["analysis"]
+        elif job.status == "failed":
+            st.session_state.analysis_error = (job.result or {}).get("error", "Unknown error")
+        st.rerun()
+    
+    st.markdown("### 📊 Analysis Results")
+    if job.status == "queued":
+        position = queue.queue_position(job)
+        st.caption(f"Queued behind {position} other document(s)..." if position else job.message)
+    elif job.progress is not None and job.progress < 1:
+        st.progress(job.progress, text=job.message)
+    else:
+        st.caption(job.message)
+    if job.text:
+        st.markdown(job.text + "▌")
 
 
-async def analyze_document_async(agent, file_path: str):
-    """Async wrapper for document analysis."""
-    result = await agent.analyze_document(file_path)
+def stream_response(chunks, placeholder) -> str:
+    """
+    Render a streamed chat response into a placeholder as it arrives.
+    The response is generated on the background event loop; this thread only renders.
     
-    # Delete the file after processing to maintain privacy
-    delete_uploaded_file(file_path)
+    Args:
+        chunks: Async iterator of text chunks (agent.ask_question_stream / agent.chat_stream)
+        placeholder: Streamlit placeholder to render into
     
-    return result
+    Returns:
+        The complete response text
+    """
+    text = ""
+    last_render = 0.0
+    for chunk in get_background_loop().iterate(chunks):
+        text += chunk
+        if time.monotonic() - last_render >= STREAM_REFRESH_SECONDS:
+            placeholder.markdown(text + "▌")
+            last_render = time.monotonic()
+    placeholder.markdown(text)
+    return text
 
 
 def display_analysis(analysis_text: str):
@@ -231,13 +286,15 @@ def main():
     if not AGENT_AVAILABLE:
         st.warning("Please install dependencies first. See README.md for setup instructions.")
         return
+
+    warm_document_converter()
     
     # Sidebar
     with st.sidebar:
         if st.button("🔄 New Chat", help="Start a fresh conversation (clears chat history and document)"):
-            # Delete uploaded file if exists
-            if st.session_state.uploaded_file_path:
-                delete_uploaded_file(st.session_state.uploaded_file_path)
+            # Stop any analysis still running for this session
+            if st.session_state.analysis_job_id:
+                get_job_queue().cancel(st.session_state.analysis_job_id)
             
             # Reset agent thread to flush document from memory
             agent = st.session_state.agent
@@ -247,7 +304,8 @@ def main():
             # Clear session state
             st.session_state.messages = []
             st.session_state.analysis_result = None
-            st.session_state.uploaded_file_path = None
+            st.session_state.analysis_job_id = None
+            st.session_state.analysis_error = None
             st.session_state.new_thread_requested = True
             
             st.success("✅ Chat reset! Starting fresh conversation.")
@@ -268,27 +326,26 @@ def main():
             file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
             st.caption(f"Size: {file_size_mb:.2f} MB")
             
-            if st.button("🔍 Analyze Document", type="primary"):
-                with st.spinner("Analyzing document... This may take 30-60 seconds."):
-                    try:
-                        # Save file
-                        file_path = save_uploaded_file(uploaded_file)
-                        st.session_state.uploaded_file_path = file_path
-                        
-                        # Get agent
-                        agent = get_agent()
-                        if agent:
-                            # Run analysis
-                            result = asyncio.run(analyze_document_async(agent, file_path))
-                            
-                            if result.get("success"):
-                                st.session_state.analysis_result = result["analysis"]
-                                st.success("✅ Analysis complete!")
-                                st.rerun()
-                            else:
-                                st.error(f"Error: {result.get('error', 'Unknown error')}")
-                    except Exception as e:
-                        st.error(f"Error analyzing document: {str(e)}")
+            analysis_running = st.session_state.analysis_job_id is not None
+            if st.button("🔍 Analyze Document", type="primary", disabled=analysis_running):
+                # Get agent
+                agent = get_agent()
+                if agent:
+                    # The upload goes to the converter straight from memory; the analysis
+                    # runs on a background worker and the main area polls its progress
+                    job = get_job_queue().submit(agent, to_in_memory_document(uploaded_file))
+                    st.session_state.analysis_job_id = job.id
+                    st.session_state.analysis_error = None
+                    st.rerun()
+        
+        if st.session_state.analysis_error:
+            st.error(f"Error: {st.session_state.analysis_error}")
+        
+        # Per-stage timings for this process (TELEMETRY_EXPORTER=memory)
+        profile = session_profile() if AGENT_AVAILABLE else ""
+        if profile:
+            with st.expander("⏱️ Session profile"):
+                st.code(profile, language=None)
         
         st.markdown("---")
         st.markdown("### ℹ️ About")
@@ -301,14 +358,24 @@ def main():
         """)
         
         st.markdown("### 🔒 Privacy")
-        st.caption("""
-        Your documents are processed securely and deleted immediately after analysis.
-        Document content is only retained in the active conversation thread.
-        Click "New Chat" to clear all data and start fresh.
-        """)
+        if os.getenv("DOCUMENT_CACHE_DIR"):
+            st.caption("""
+            Your uploads are processed in memory, but parsed document text is
+            cached on this server's disk (DOCUMENT_CACHE_DIR) so re-uploads skip
+            conversion. "New Chat" clears the conversation, not the cache.
+            """)
+        else:
+            st.caption("""
+            Your documents are processed in memory and never written to disk.
+            Document content is only retained in the active conversation thread.
+            Click "New Chat" to clear all data and start fresh.
+            """)
     
     # Main content area
-    if st.session_state.analysis_result:
+    if st.session_state.analysis_job_id:
+        # Analysis in progress (polled by the fragment)
+        display_analysis_job()
+    elif st.session_state.analysis_result:
         # Display analysis
         display_analysis(st.session_state.analysis_result)
         
@@ -331,15 +398,13 @@ def main():
             agent = get_agent()
             if agent:
                 with st.chat_message("assistant"):
-                    with st.spinner("Thinking..."):
-                        try:
-                            response = asyncio.run(agent.ask_question(prompt))
-                            st.markdown(response)
-                            st.session_state.messages.append({"role": "assistant", "content": response})
-                        except Exception as e:
-                            error_msg = f"Error: {str(e)}"
-                            st.error(error_msg)
-                            st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                    try:
+                        response = stream_response(agent.ask_question_stream(prompt), st.empty())
+                        st.session_state.messages.append({"role": "assistant", "content": response})
+                    except Exception as e:
+                        error_msg = f"Error: {str(e)}"
+                        st.error(error_msg)
+                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
     else:
         # No document uploaded - show general chat interface
         st.markdown("### 💬 Chat with Contract Clarity Agent")
@@ -361,24 +426,22 @@ def main():
             agent = get_agent()
             if agent:
                 with st.chat_message("assistant"):
-                    with st.spinner("Thinking..."):
-                        try:
-                            # Check if new thread was requested (refresh)
-                            new_thread = st.session_state.get("new_thread_requested", False)
-                            
-                            # Use general chat method which maintains thread continuity
-                            response = asyncio.run(agent.chat(prompt, new_thread=new_thread))
-                            
-                            # Reset the flag after first message
-                            if new_thread:
-                                st.session_state.new_thread_requested = False
-                            
-                            st.markdown(response)
-                            st.session_state.messages.append({"role": "assistant", "content": response})
-                        except Exception as e:
-                            error_msg = f"Error: {str(e)}"
-                            st.error(error_msg)
-                            st.session_state.messages.append({"role": "assistant", "content": error_msg})
+                    try:
+                        # Check if new thread was requested (refresh)
+                        new_thread = st.session_state.get("new_thread_requested", False)
+                        
+                        # Use general chat method which maintains thread continuity
+                        response = stream_response(agent.chat_stream(prompt, new_thread=new_thread), st.empty())
+                        
+                        # Reset the flag after first message
+                        if new_thread:
+                            st.session_state.new_thread_requested = False
+                        
+                        st.session_state.messages.append({"role": "assistant", "content": response})
+                    except Exception as e:
+                        error_msg = f"Error: {str(e)}"
+                        st.error(error_msg)
+                        st.session_state.messages.append({"role": "assistant", "content": error_msg})
         
         # Only show landing page content if no messages yet
         if len(st.session_state.messages) == 0:
@@ -4,19 +4,19 @@ Main agent logic for contract analysis and conversational interaction.
 """
 
 import os
+import re
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, AsyncIterator, List, Union
 
-from agent_framework import ChatAgent, ChatMessageStore
+from agent_framework import ChatAgent, ChatMessage, DataContent, TextContent
 from agent_framework.azure import AzureOpenAIChatClient
 
-from opentelemetry import trace
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-
+from .clause_index import ClauseIndex, group_clauses, split_into_clauses
+from .conversation_memory import BoundedChatMessageStore
+from .converter_service import DocumentSource
 from .document_processor import DocumentProcessor, WebContentExtractor
+from .telemetry import LLMCallMetrics, setup_telemetry, stage
 
 # Configure logging for agent operations
 logger = logging.getLogger(__name__)
@@ -28,33 +28,25 @@ if not logger.handlers:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
-
-def setup_telemetry():
-    """Configure OpenTelemetry with OTLP exporter for Opik observability."""
-    # Create a resource with service name and other metadata
-    resource = Resource.create(
-        {
-            "service.name": "contract-clarity-agent",
-            "service.version": "0.1.0",
-            "deployment.environment": os.getenv("DEPLOYMENT_ENVIRONMENT", "development"),
-        }
+def create_chat_client(
+    azure_endpoint: Optional[str] = None,
+    azure_api_key: Optional[str] = None,
+    azure_deployment: Optional[str] = None,
+) -> AzureOpenAIChatClient:
+    """
+    Create an Azure OpenAI chat client from arguments or the AZURE_OPENAI_* env vars.
+    A client can be shared by many agents (see ContractClarityAgent's `chat_client`).
+    """
+    return AzureOpenAIChatClient(
+        endpoint=azure_endpoint or os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_key=azure_api_key or os.getenv("AZURE_OPENAI_API_KEY"),
+        deployment_name=azure_deployment or os.getenv("AZURE_OPENAI_CHAT_DEPLOYMENT_NAME", "gpt-4o-mini"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2025-01-01-preview"),
     )
 
-    # Create TracerProvider with the resource
-    provider = TracerProvider(resource=resource)
-
-    # Create BatchSpanProcessor with OTLPSpanExporter
-    processor = BatchSpanProcessor(OTLPSpanExporter())
-    provider.add_span_processor(processor)
-
-    # Set the TracerProvider
-    trace.set_tracer_provider(provider)
 
-    tracer = trace.get_tracer(__name__)
-    
-    logger.info("OpenTelemetry tracing initialized for Opik observability")
-
-    return tracer, provider
+# Numbered report headings, e.g. "#### 3. **HIGH RISK CLAUSES (🔴)**:"
+SECTION_HEADING_RE = re.compile(r"^#{1,6}\s*\d+\.\s*\**\s*([^*:\n]+?)\s*(?:\*\*|:|$)")
 
 
 class ContractClarityAgent:
@@ -120,12 +112,49 @@ When answering follow-up questions:
 4. Suggest clarifying questions to ask the other party
 """
     
+    # Report structure shared by single-call and map-reduce analysis
+    ANALYSIS_STRUCTURE = """#### 1. **DOCUMENT TYPE**: Identify what type of document this is (e.g., Employment Agreement, Vendor Contract, NDA, Lease, etc.)
+
+#### 2. **EXECUTIVE SUMMARY**: Provide a 3-5 sentence plain-language summary of the entire document
+
+#### 3. **HIGH RISK CLAUSES (🔴)**: List all clauses that pose significant risk, for each include:
+   - Section/clause number
+   - Plain-language explanation
+   - Why it's concerning
+   - Actionable recommendation
+
+#### 4. **MEDIUM RISK CLAUSES (🟡)**: List all clauses with moderate concerns, for each include:
+   - Section/clause number
+   - Plain-language explanation
+   - Why it's worth noting
+   - Suggestion for user
+
+#### 5. **POSITIVE/STANDARD CLAUSES (🟢)**: Highlight any particularly favorable or well-balanced terms
+
+#### 6. **MISSING CLAUSES**: Identify any important standard clauses that should be present but aren't
+
+#### 7. **KEY DATES & DEADLINES**: Extract all important dates (effective date, termination notice periods, renewal dates, etc.)
+
+#### 8. **KEY TERMS**: Summarize important contract terms (payment terms, contract duration, notice periods, etc.)
+
+-------------------
+
+Remember to:
+- Use plain language (8th-grade reading level)
+- Cite specific sections for every claim
+- Provide real-world examples where helpful
+- End with the legal disclaimer"""
+    
+    # Number of clauses retrieved for each follow-up question
+    RETRIEVAL_TOP_K = 6
+    
     def __init__(
         self,
         azure_endpoint: Optional[str] = None,
         azure_api_key: Optional[str] = None,
         azure_deployment: Optional[str] = None,
-        firecrawl_api_key: Optional[str] = None
+        firecrawl_api_key: Optional[str] = None,
+        chat_client: Optional[AzureOpenAIChatClient] = None
     ):
         """
         Initialize the Contract Clarity Agent.
@@ -135,6 +164,8 @@ When answering follow-up questions:
             azure_api_key: Azure OpenAI API key
             azure_deployment: Azure OpenAI deployment name
             firecrawl_api_key: Firecrawl API key for web content
+            chat_client: Optional existing chat client to share (and its HTTP connection
+                pool) across agents; it must only be used from one event loop
         """
         # Load from environment if not provided
         self.azure_endpoint = azure_endpoint or os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -159,36 +190,77 @@ When answering follow-up questions:
         logger.info(f"Initializing ContractClarityAgent with deployment: {self.azure_deployment}")
         
         # Initialize Azure chat client
-        self.chat_client = AzureOpenAIChatClient(
-            endpoint=self.azure_endpoint,
-            api_key=self.azure_api_key,
-            deployment_name=self.azure_deployment,
-            api_version=self.api_version,
+        self.chat_client = chat_client or create_chat_client(
+            self.azure_endpoint, self.azure_api_key, self.azure_deployment
         )
         
         # Initialize document processor and web extractor
         self.doc_processor = DocumentProcessor()
         self.web_extractor = WebContentExtractor(api_key=firecrawl_api_key)
         
-        # Create the agent with local message store for multi-turn conversations
+        # Conversation memory: token budget per turn and turns always kept verbatim
+        self.memory_token_budget = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "8000"))
+        self.memory_recent_turns = int(os.getenv("CONVERSATION_RECENT_TURNS", "2"))
+        
+        # Create the agent with a bounded local message store for multi-turn conversations
         self.agent = ChatAgent(
             name="ContractClarityAgent",
             instructions=self.SYSTEM_PROMPT,
             chat_client=self.chat_client,
-            chat_message_store_factory=ChatMessageStore,  # Enable local message history
+            chat_message_store_factory=self._create_message_store,
             tools=[
                 self._create_extract_web_content_tool(),
+                self._create_extract_web_pages_tool(),
             ],
         )
         
-        logger.info("Agent initialized successfully with web content extraction tool")
+        logger.info("Agent initialized successfully with web content extraction tools")
         
         # Store conversation thread (for multi-turn conversations)
         self.thread = None
+        
+        # Map-reduce analysis settings for documents too long for a single call
+        self.map_reduce_threshold = int(os.getenv("MAP_REDUCE_THRESHOLD_CHARS", "60000"))
+        self.map_reduce_chunk_chars = int(os.getenv("MAP_REDUCE_CHUNK_CHARS", "20000"))
+        self.map_reduce_concurrency = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+        
+        # Clause index and analysis of the loaded document (for follow-up retrieval)
+        self.clause_index: Optional[ClauseIndex] = None
+        self.analysis_text: Optional[str] = None
+    
+    def _create_message_store(self) -> BoundedChatMessageStore:
+        """Message store factory for agent threads (bounded by the conversation token budget)."""
+        return BoundedChatMessageStore(
+            max_tokens=self.memory_token_budget,
+            keep_recent_turns=self.memory_recent_turns,
+            summarizer=self._summarize,
+            compact_text=self._compact_question_prompt,
+        )
+    
+    async def _summarize(self, prompt: str) -> str:
+        """Run a summarization prompt directly on the chat client (no tools or thread)."""
+        with LLMCallMetrics("summary", len(prompt) // 4) as call:
+            response = await self.chat_client.get_response(prompt)
+            call.on_response(response)
+        return getattr(response, "text", None) or str(response)
+    
+    @staticmethod
+    def _compact_question_prompt(text: str) -> str:
+        """
+        Shorten an earlier follow-up prompt to its question plus the citations
+        it was answered from; the retrieved clause text is dropped.
+        """
+        if "QUESTION: " not in text:
+            return text
+        question = text.rsplit("QUESTION: ", 1)[1].strip()
+        citations = re.findall(r"^\[(.+)\]$", text, re.M)
+        if citations:
+            return f"{question}\n(Answered from clauses: {', '.join(citations)})"
+        return question
     
     def _create_extract_web_content_tool(self):
         """Create the web content extraction tool."""
-        def extract_web_content(url: str) -> str:
+        async def extract_web_content(url: str) -> str:
             """
             Extract content from a web URL (e.g., contract hosted online).
             
@@ -199,7 +271,8 @@ When answering follow-up questions:
                 Extracted text content from the URL
             """
             logger.info(f"Tool called: extract_web_content with URL: {url}")
-            result = self.web_extractor.extract_from_url(url)
+            # Firecrawl's client is blocking; run it off the event loop
+            result = await asyncio.to_thread(self.web_extractor.extract_from_url, url)
             if result.get("success"):
                 return f"Successfully extracted content from {url}:\n\n{result['text']}"
             else:
@@ -207,84 +280,264 @@ When answering follow-up questions:
         
         return extract_web_content
     
-    async def analyze_document(self, file_path: str, file_type: Optional[str] = None) -> Dict[str, Any]:
+    def _create_extract_web_pages_tool(self):
+        """Create the batch web content extraction tool (pages are fetched concurrently)."""
+        async def extract_web_pages(urls: List[str]) -> str:
+            """
+            Extract content from several related web pages at once, e.g. a Terms of
+            Service together with its Privacy Policy and Data Processing Agreement.
+            
+            Args:
+                urls: The URLs to extract content from
+            
+            Returns:
+                Extracted text content of each URL, in order
+            """
+            logger.info(f"Tool called: extract_web_pages with {len(urls)} URLs: {urls}")
+            results = await self.web_extractor.extract_from_urls(urls)
+            sections = []
+            for url, result in zip(urls, results):
+                if result.get("success"):
+                    sections.append(f"Successfully extracted content from {url}:\n\n{result['text']}")
+                else:
+                    sections.append(f"Error extracting content from {url}: {result.get('error', 'Unknown error')}")
+            return "\n\n-------------------\n\n".join(sections)
+        
+        return extract_web_pages
+    
+    def _build_analysis_prompt(self, document_text: str) -> str:
+        """Build the single-call analysis prompt with the full document text."""
+        return f"""I need you to analyze the following legal document comprehensively.
+
+DOCUMENT CONTENT:
+```
+{document_text}
+```
+
+Please provide a detailed analysis with the following structure:
+
+{self.ANALYSIS_STRUCTURE}
+
+Analyze this document now."""
+    
+    def _build_analysis_input(self, doc_result: Dict[str, Any]):
         """
-        Analyze a document file and return structured analysis.
-        This creates a new conversation thread with the document embedded.
+        Build the single-call analysis input. For photographed or scanned documents
+        the preprocessed page images are attached to the prompt.
+        """
+        images = doc_result.get("images")
+        if not images:
+            return self._build_analysis_prompt(doc_result["text"])
+        
+        prompt = self._build_analysis_prompt(
+            f"[The document is attached as {len(images)} image(s), in reading order from top to bottom. "
+            "Read the document text from the images.]"
+        )
+        return ChatMessage(
+            role="user",
+            contents=[TextContent(text=prompt)] + [
+                DataContent(data=image.data, media_type=image.media_type) for image in images
+            ],
+        )
+    
+    async def _analyze_part(self, part_text: str, part_no: int, total_parts: int, semaphore: asyncio.Semaphore) -> str:
+        """Map step: extract risk findings from one section group on its own thread."""
+        prompt = f"""You are reviewing PART {part_no} OF {total_parts} of a longer legal document.
+Only report what appears in this excerpt; other parts are reviewed separately.
+Each clause below is labelled with its section in brackets — cite those labels.
+
+DOCUMENT EXCERPT:
+```
+{part_text}
+```
+
+Report concisely, as bullet lists:
+- DOCUMENT TYPE HINTS: anything indicating what kind of document this is
+- SUMMARY: 2-3 sentences on what this part covers
+- HIGH RISK CLAUSES (🔴): section, plain-language explanation, why it's concerning, recommendation
+- MEDIUM RISK CLAUSES (🟡): section, plain-language explanation, why it's worth noting, suggestion
+- POSITIVE/STANDARD CLAUSES (🟢): section and why it is favorable
+- KEY DATES & DEADLINES: with section
+- KEY TERMS: payment terms, duration, notice periods, etc., with section
+
+Omit empty headings. Do not add a disclaimer."""
+        async with semaphore:
+            logger.info(f"Analyzing part {part_no}/{total_parts} ({len(part_text)} chars)")
+            response = await self._run(prompt, self.agent.get_new_thread(), "map_part")
+        return getattr(response, "text", None) or str(response)
+    
+    async def _build_merge_prompt(self, document_text: str, on_part_done: Optional[Callable[[int, int], None]] = None) -> str:
+        """
+        Map step of the map-reduce analysis: analyze section groups in parallel
+        and build the prompt that merges their findings into the standard report.
+        
+        Section groups are analyzed concurrently (bounded by map_reduce_concurrency),
+        so latency is roughly the slowest group plus one merge call.
         
         Args:
-            file_path: Path to the document file
-            file_type: Optional file type (pdf, docx, image)
+            document_text: Full document markdown
+            on_part_done: Optional callback(parts_done, total_parts) as each group finishes
         
         Returns:
-            Dictionary containing analysis results
+            Merge prompt string
         """
+        groups = group_clauses(split_into_clauses(document_text), self.map_reduce_chunk_chars)
+        total = len(groups)
+        logger.info(f"Map-reduce analysis: {len(document_text)} chars in {total} parts")
+        
+        semaphore = asyncio.Semaphore(self.map_reduce_concurrency)
+        done = 0
+        
+        async def analyze(group, part_no):
+            nonlocal done
+            try:
+                return await self._analyze_part(ClauseIndex.format_clauses(group), part_no, total, semaphore)
+            finally:
+                done += 1
+                if on_part_done:
+                    on_part_done(done, total)
+        
+        results = await asyncio.gather(
+            *(analyze(group, i) for i, group in enumerate(groups, start=1)),
+            return_exceptions=True,
+        )
+        
+        findings = []
+        for i, (group, result) in enumerate(zip(groups, results), start=1):
+            first, last = group[0].citation, group[-1].citation
+            sections = first if first == last else f"{first} … {last}"
+            if isinstance(result, Exception):
+                logger.error(f"Part {i}/{total} failed: {result}")
+                findings.append(f"### PART {i} ({sections})\n[This part could not be analyzed: {result}]")
+            else:
+                findings.append(f"### PART {i} ({sections})\n{result}")
+        
+        findings_text = "\n\n".join(findings)
+        return f"""A long legal document was reviewed in {total} parts. Below are the findings for each part, in document order.
+
+{findings_text}
+
+-------------------
+
+Merge these findings into one analysis of the whole document. Deduplicate overlapping points, keep every section citation, and judge MISSING CLAUSES against the document as a whole. If any part could not be analyzed, say so. Use the following structure:
+
+{self.ANALYSIS_STRUCTURE}
+
+Write the merged analysis now."""
+    
+    async def _map_reduce_analysis(self, document_text: str, thread):
+        """
+        Analyze a long document in parallel section groups, then merge the findings
+        into the standard eight-part report.
+        
+        Args:
+            document_text: Full document markdown
+            thread: Thread to run the merge step on
+        
+        Returns:
+            Agent response containing the merged analysis
+        """
+        merge_prompt = await self._build_merge_prompt(document_text)
+        return await self._run(merge_prompt, thread, "merge")
+    
+    @staticmethod
+    def _estimate_prompt_tokens(prompt: Union[str, ChatMessage], thread) -> int:
+        """Estimate tokens sent for a call: the new message plus the thread's history."""
+        text = prompt if isinstance(prompt, str) else prompt.text
+        store = getattr(thread, "message_store", None)
+        history = store.token_count() if isinstance(store, BoundedChatMessageStore) else 0
+        return len(text) // 4 + history
+    
+    async def _run(self, prompt: Union[str, ChatMessage], thread, kind: str):
+        """Run the agent on a thread, recording latency and token metrics under `kind`."""
+        with LLMCallMetrics(kind, self._estimate_prompt_tokens(prompt, thread)) as call:
+            response = await self.agent.run(prompt, thread=thread)
+            call.on_response(response)
+        return response
+    
+    async def _stream_text(self, prompt: Union[str, ChatMessage], thread, kind: str) -> AsyncIterator[str]:
+        """Run the agent on a thread and yield response text as it arrives (with time-to-first-token metrics)."""
+        with LLMCallMetrics(kind, self._estimate_prompt_tokens(prompt, thread)) as call:
+            async for update in self.agent.run_stream(prompt, thread=thread):
+                call.on_update(update)
+                text = getattr(update, "text", None)
+                if text:
+                    yield text
+    
+    def _load_document(
+        self,
+        file_path: DocumentSource,
+        file_type: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """Convert a document and build its clause index (shared by analyze_document and analyze_document_stream)."""
         logger.info(f"Starting document analysis: {file_path} (type: {file_type})")
         
         # Process the document
-        doc_result = self.doc_processor.process_document(file_path, file_type)
+        doc_result = self.doc_processor.process_document(file_path, file_type, progress)
         
         if not doc_result.get("success"):
             logger.error(f"Document processing failed: {doc_result.get('error')}")
+            return doc_result
+        
+        logger.info(f"Document processed successfully. Text length: {len(doc_result['text'])} chars")
+        
+        # Index the document by clause so follow-ups only send relevant sections
+        self.clause_index = ClauseIndex.from_markdown(doc_result["text"])
+        logger.info(f"Built clause index with {len(self.clause_index)} chunks")
+        return doc_result
+    
+    def _finish_analysis(self, analysis_text: str):
+        """Start the follow-up conversation thread for a completed analysis, with the analysis pinned."""
+        self.thread = self.agent.get_new_thread()
+        self.analysis_text = analysis_text
+        store = self.thread.message_store
+        if isinstance(store, BoundedChatMessageStore):
+            store.pin(ChatMessage(role="assistant", text=analysis_text))
+    
+    async def analyze_document(
+        self,
+        file_path: DocumentSource,
+        file_type: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze a document file and return structured analysis.
+        Documents longer than the map-reduce threshold are analyzed section by
+        section in parallel and merged (see _map_reduce_analysis).
+        This starts a new conversation thread for follow-up questions.
+        
+        Args:
+            file_path: Path to the document file, or an InMemoryDocument upload
+            file_type: Optional file type (pdf, docx, image)
+            progress: Optional callback(pages_done, total_pages) during conversion
+                (called from the conversion worker thread)
+        
+        Returns:
+            Dictionary containing analysis results
+        """
+        # Conversion is blocking; keep the event loop free for other sessions
+        doc_result = await asyncio.to_thread(self._load_document, file_path, file_type, progress)
+        if not doc_result.get("success"):
             return {
                 "success": False,
                 "error": doc_result.get("error", "Unknown error processing document")
             }
         
-        # Get or create a thread for this conversation
-        if self.thread is None:
-            logger.info("Creating new conversation thread")
-            self.thread = self.agent.get_new_thread()
-        
-        logger.info(f"Document processed successfully. Text length: {len(doc_result['text'])} chars")
-        
-        # Create comprehensive analysis prompt with the full document text
-        analysis_prompt = f"""I need you to analyze the following legal document comprehensively.
-
-DOCUMENT CONTENT:
-```
-{doc_result["text"]}
-```
-
-Please provide a detailed analysis with the following structure:
-
-#### 1. **DOCUMENT TYPE**: Identify what type of document this is (e.g., Employment Agreement, Vendor Contract, NDA, Lease, etc.)
-
-#### 2. **EXECUTIVE SUMMARY**: Provide a 3-5 sentence plain-language summary of the entire document
-
-#### 3. **HIGH RISK CLAUSES (🔴)**: List all clauses that pose significant risk, for each include:
-   - Section/clause number
-   - Plain-language explanation
-   - Why it's concerning
-   - Actionable recommendation
-
-#### 4. **MEDIUM RISK CLAUSES (🟡)**: List all clauses with moderate concerns, for each include:
-   - Section/clause number
-   - Plain-language explanation
-   - Why it's worth noting
-   - Suggestion for user
-
-#### 5. **POSITIVE/STANDARD CLAUSES (🟢)**: Highlight any particularly favorable or well-balanced terms
-
-#### 6. **MISSING CLAUSES**: Identify any important standard clauses that should be present but aren't
-
-#### 7. **KEY DATES & DEADLINES**: Extract all important dates (effective date, termination notice periods, renewal dates, etc.)
-
-#### 8. **KEY TERMS**: Summarize important contract terms (payment terms, contract duration, notice periods, etc.)
-
--------------------
-
-Remember to:
-- Use plain language (8th-grade reading level)
-- Cite specific sections for every claim
-- Provide real-world examples where helpful
-- End with the legal disclaimer
-
-Analyze this document now."""
+        document_text = doc_result["text"]
+        use_map_reduce = len(document_text) > self.map_reduce_threshold
         
-        # Run the agent with the thread to maintain conversation context
+        # Run the analysis on its own thread so the full document text is not
+        # replayed on every follow-up; the conversation thread starts fresh and
+        # receives only the analysis plus retrieved clauses
         try:
-            response = await self.agent.run(analysis_prompt, thread=self.thread)
+            analysis_thread = self.agent.get_new_thread()
+            if use_map_reduce:
+                response = await self._map_reduce_analysis(document_text, analysis_thread)
+            else:
+                response = await self._run(self._build_analysis_input(doc_result), analysis_thread, "analysis")
+            
+            self._finish_analysis(getattr(response, "text", None) or str(response))
             
             return {
                 "success": True,
@@ -292,6 +545,7 @@ Analyze this document now."""
                 "document_info": {
                     "file_type": doc_result.get("file_type"),
                     "num_pages": doc_result.get("num_pages"),
+                    "analysis_mode": "map_reduce" if use_map_reduce else "single",
                 }
             }
         except Exception as e:
@@ -300,10 +554,139 @@ Analyze this document now."""
                 "error": f"Error during analysis: {str(e)}"
             }
     
+    async def analyze_document_stream(
+        self,
+        file_path: DocumentSource,
+        file_type: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of analyze_document.
+        
+        Yields event dicts as the analysis is produced:
+            {"type": "status", "text": ...}    progress messages before the report starts
+            {"type": "token", "text": ...}     report text, as it arrives from the model
+            {"type": "section", "title": ...}  a numbered report heading has been completed
+            {"type": "done", "result": {...}}  final result (same shape as analyze_document)
+        
+        For map-reduce analyses the section groups are analyzed first (reported as
+        status events) and the merged report is streamed.
+        
+        Args:
+            file_path: Path to the document file, or an InMemoryDocument upload
+            file_type: Optional file type (pdf, docx, image)
+            progress: Optional callback(pages_done, total_pages) during conversion
+                (called from the conversion worker thread)
+        """
+        yield {"type": "status", "text": "Converting document..."}
+        # Conversion is blocking; keep the event loop free for other sessions
+        doc_result = await asyncio.to_thread(self._load_document, file_path, file_type, progress)
+        if not doc_result.get("success"):
+            yield {"type": "done", "result": {
+                "success": False,
+                "error": doc_result.get("error", "Unknown error processing document")
+            }}
+            return
+        
+        document_text = doc_result["text"]
+        use_map_reduce = len(document_text) > self.map_reduce_threshold
+        
+        try:
+            analysis_thread = self.agent.get_new_thread()
+            if use_map_reduce:
+                # Relay per-part completions from the map step as status events
+                part_events: asyncio.Queue = asyncio.Queue()
+                map_task = asyncio.ensure_future(self._build_merge_prompt(
+                    document_text,
+                    on_part_done=lambda done, total: part_events.put_nowait(
+                        {"type": "status", "text": f"Analyzed part {done}/{total} of the document..."}
+                    ),
+                ))
+                getter = None
+                try:
+                    yield {"type": "status", "text": "Analyzing document sections in parallel..."}
+                    while not map_task.done() or not part_events.empty():
+                        getter = asyncio.ensure_future(part_events.get())
+                        await asyncio.wait({getter, map_task}, return_when=asyncio.FIRST_COMPLETED)
+                        if getter.done():
+                            yield getter.result()
+                        else:
+                            getter.cancel()
+                    prompt = map_task.result()
+                finally:
+                    # A consumer that stops early (rerun, job cancel) must not leave map calls running
+                    if getter is not None and not getter.done():
+                        getter.cancel()
+                    if not map_task.done():
+                        map_task.cancel()
+            else:
+                prompt = self._build_analysis_input(doc_result)
+                yield {"type": "status", "text": "Analyzing document..."}
+            
+            chunks = []
+            line = ""
+            async for text in self._stream_text(prompt, analysis_thread, "merge" if use_map_reduce else "analysis"):
+                chunks.append(text)
+                yield {"type": "token", "text": text}
+                
+                # Report section boundaries once each heading line is complete
+                line += text
+                *complete, line = line.split("\n")
+                for heading in complete:
+                    match = SECTION_HEADING_RE.match(heading.strip())
+                    if match:
+                        yield {"type": "section", "title": match.group(1).strip()}
+            
+            analysis_text = "".join(chunks)
+            self._finish_analysis(analysis_text)
+            
+            yield {"type": "done", "result": {
+                "success": True,
+                "analysis": analysis_text,
+                "document_info": {
+                    "file_type": doc_result.get("file_type"),
+                    "num_pages": doc_result.get("num_pages"),
+                    "analysis_mode": "map_reduce" if use_map_reduce else "single",
+                }
+            }}
+        except Exception as e:
+            yield {"type": "done", "result": {
+                "success": False,
+                "error": f"Error during analysis: {str(e)}"
+            }}
+    
+    def build_question_prompt(self, question: str) -> str:
+        """
+        Build a follow-up prompt containing only the clauses relevant to the question.
+        The analysis report is pinned in the thread's message store, so it is not repeated here.
+        
+        Args:
+            question: The user's question
+        
+        Returns:
+            Prompt string
+        """
+        parts = []
+        with stage("prompt.build", kind="question") as span:
+            clauses = self.clause_index.search(question, top_k=self.RETRIEVAL_TOP_K) if self.clause_index else []
+            span.set_attribute("prompt.clauses", len(clauses))
+        if clauses:
+            logger.info(f"Retrieved clauses: {[c.citation for c in clauses]}")
+            parts.append(
+                "RELEVANT CLAUSES FROM THE DOCUMENT (cite them by the label in brackets):\n"
+                f"{ClauseIndex.format_clauses(clauses)}"
+            )
+        else:
+            parts.append("No clauses in the document matched this question directly.")
+        
+        parts.append(f"QUESTION: {question}")
+        return "\n\n".join(parts)
+    
     async def ask_question(self, question: str) -> str:
         """
         Ask a follow-up question about the document.
-        Uses the same thread to maintain conversation context from analyze_document().
+        Sends only the clauses retrieved from the document's clause index (plus the
+        conversation so far), not the full document text.
         
         Args:
             question: The user's question
@@ -314,14 +697,31 @@ Analyze this document now."""
         if self.thread is None:
             return "I don't have a document loaded yet. Please upload and analyze a document first."
         
-        # Simply pass the question - the thread maintains full conversation history
-        # including the original document text from analyze_document()
         try:
-            response = await self.agent.run(question, thread=self.thread)
+            prompt = self.build_question_prompt(question)
+            response = await self._run(prompt, self.thread, "question")
             return response
         except Exception as e:
             return f"Error processing question: {str(e)}"
     
+    async def ask_question_stream(self, question: str) -> AsyncIterator[str]:
+        """
+        Streaming variant of ask_question: yields response text as it arrives.
+        
+        Args:
+            question: The user's question
+        """
+        if self.thread is None:
+            yield "I don't have a document loaded yet. Please upload and analyze a document first."
+            return
+        
+        try:
+            prompt = self.build_question_prompt(question)
+            async for text in self._stream_text(prompt, self.thread, "question"):
+                yield text
+        except Exception as e:
+            yield f"Error processing question: {str(e)}"
+    
     async def chat(self, message: str, new_thread: bool = False) -> str:
         """
         General chat interface for the agent.
@@ -344,14 +744,46 @@ Analyze this document now."""
                 self.thread = self.agent.get_new_thread()
             
             logger.info(f"Processing chat message: {message[:50]}...")
-            response = await self.agent.run(message, thread=self.thread)
+            response = await self._run(message, self.thread, "chat")
             return response
         except Exception as e:
             return f"Error: {str(e)}"
     
+    async def chat_stream(self, message: str, new_thread: bool = False) -> AsyncIterator[str]:
+        """
+        Streaming variant of chat: yields response text as it arrives.
+        
+        Args:
+            message: User message
+            new_thread: If True, creates a new thread (starts fresh conversation)
+        """
+        try:
+            if new_thread or self.thread is None:
+                logger.info("Starting new chat thread" + (" (refresh requested)" if new_thread else ""))
+                self.thread = self.agent.get_new_thread()
+            
+            logger.info(f"Processing chat message: {message[:50]}...")
+            async for text in self._stream_text(message, self.thread, "chat"):
+                yield text
+        except Exception as e:
+            yield f"Error: {str(e)}"
+    
+    async def wait_for_memory(self):
+        """
+        Wait until background summarization of the current thread has finished.
+        Only needed when the event loop running the agent is about to close
+        (e.g. at the end of `asyncio.run()`); on a long-lived loop the summary
+        simply completes in the background.
+        """
+        store = self.thread.message_store if self.thread is not None else None
+        if isinstance(store, BoundedChatMessageStore):
+            await store.wait_for_summary()
+    
     def reset_conversation(self):
         """
         Reset the conversation thread.
         Useful when starting analysis of a new document.
         """
         self.thread = self.agent.get_new_thread()
+        self.clause_index = None
+        self.analysis_text = None
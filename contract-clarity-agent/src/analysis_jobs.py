@@ -0,0 +1,184 @@
+"""
+Background analysis jobs for Contract Clarity Agent.
+Document analyses run as tasks on the process-wide background event loop
+instead of the Streamlit script thread; the UI submits a job and polls its
+status, so one user's conversion and model call never block another user's page.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from .background_loop import get_background_loop
+from .converter_service import DocumentSource, source_name
+from .telemetry import stage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AnalysisJob:
+    """
+    State of one document analysis, updated by the worker and read by the UI.
+
+    status is "queued", "running", "done", "failed" or "cancelled". While the
+    job runs, `message` holds the latest status line, `progress` the conversion
+    progress (0..1, None when unknown) and `text` the report generated so far.
+    """
+    id: str
+    name: str
+    status: str = "queued"
+    message: str = "Waiting for a free analysis slot..."
+    progress: Optional[float] = None
+    text: str = ""
+    result: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+
+class AnalysisJobQueue:
+    """
+    Runs agent.analyze_document_stream() for submitted documents on the
+    background event loop, at most `max_workers` at a time.
+
+    Jobs are kept for `retention_seconds` after they finish so the page that
+    submitted them can pick up the result on its next poll.
+    """
+
+    def __init__(self, max_workers: int = 2, retention_seconds: float = 3600):
+        """
+        Initialize the job queue.
+
+        Args:
+            max_workers: Number of analyses that run at the same time
+            retention_seconds: How long finished jobs stay available to poll
+        """
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._tasks: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._slots = asyncio.Semaphore(max_workers)
+
+    def submit(self, agent, source: DocumentSource, file_type: Optional[str] = None) -> AnalysisJob:
+        """
+        Queue an analysis.
+
+        Args:
+            agent: ContractClarityAgent that analyzes the document (and keeps the
+                follow-up thread); it should not be used elsewhere until the job finishes
+            source: Path to the document, or an InMemoryDocument upload
+            file_type: Optional file type (pdf, docx, image)
+
+        Returns:
+            The new job (poll it with get())
+        """
+        job = AnalysisJob(id=uuid.uuid4().hex, name=source_name(source))
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self._tasks[job.id] = get_background_loop().submit(self._run(job, agent, source, file_type))
+        logger.info(f"Queued analysis job {job.id} for {job.name}")
+        return job
+
+    def get(self, job_id: Optional[str]) -> Optional[AnalysisJob]:
+        """Look up a job by id (None if unknown or expired)."""
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def queue_position(self, job: AnalysisJob) -> int:
+        """Number of queued jobs submitted before this one (0 once it is running)."""
+        if job.status != "queued":
+            return 0
+        with self._lock:
+            return sum(
+                1 for other in self._jobs.values()
+                if other.status == "queued" and other.created_at < job.created_at
+            )
+
+    def cancel(self, job_id: Optional[str]):
+        """Stop a queued or running job (its model call and conversion wait are cancelled)."""
+        job = self.get(job_id)
+        if job and not job.finished:
+            with self._lock:
+                task = self._tasks.get(job.id)
+            if task:
+                task.cancel()
+            if job.status == "queued":
+                # A task cancelled before it starts never runs _run's cleanup
+                job.status, job.finished_at = "cancelled", time.time()
+
+    def _prune(self):
+        """Drop finished jobs past their retention period (caller holds the lock)."""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+            self._tasks.pop(job_id, None)
+
+    async def _run(self, job: AnalysisJob, agent, source: DocumentSource, file_type: Optional[str]):
+        try:
+            async with self._slots:
+                job.status, job.started_at = "running", time.time()
+                job.message = "Converting document..."
+                with stage("analysis.job", queue_wait_s=job.started_at - job.created_at):
+                    job.result = await self._consume(job, agent, source, file_type)
+            job.status = "done" if job.result.get("success") else "failed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.exception(f"Analysis job {job.id} failed")
+            job.result = {"success": False, "error": f"Error analyzing document: {str(e)}"}
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._tasks.pop(job.id, None)
+        logger.info(f"Analysis job {job.id} {job.status} in {job.finished_at - job.created_at:.1f}s")
+
+    async def _consume(self, job: AnalysisJob, agent, source: DocumentSource, file_type: Optional[str]) -> Dict[str, Any]:
+        def on_progress(pages_done: int, total_pages: int):
+            job.progress = pages_done / total_pages if total_pages else 1.0
+            job.message = f"Converting document... {pages_done}/{total_pages} pages"
+
+        result = {"success": False, "error": "Analysis ended without a result"}
+        events = agent.analyze_document_stream(source, file_type, on_progress)
+        try:
+            async for event in events:
+                if event["type"] == "status":
+                    job.message = event["text"]
+                elif event["type"] == "section":
+                    job.message = f"Writing: {event['title']}"
+                elif event["type"] == "token":
+                    job.text += event["text"]
+                elif event["type"] == "done":
+                    result = event["result"]
+        finally:
+            await events.aclose()
+        return result
+
+
+_queue: Optional[AnalysisJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> AnalysisJobQueue:
+    """
+    Get the process-wide analysis job queue, creating it on first call.
+    Concurrency comes from the ANALYSIS_WORKERS env var (default 2).
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = AnalysisJobQueue(max_workers=int(os.getenv("ANALYSIS_WORKERS", "2")))
+        return _queue
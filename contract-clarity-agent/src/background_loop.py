@@ -0,0 +1,117 @@
+"""
+Process-wide asyncio event loop for Contract Clarity Agent.
+Streamlit reruns its script on a fresh thread for every interaction, so
+`asyncio.run()` per message would create and close an event loop (and with
+it the chat client's HTTP connections) on every turn. Instead, all agent
+coroutines run on one long-lived loop on a daemon thread and the script
+thread waits on thread-safe futures.
+"""
+
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundEventLoop:
+    """
+    An event loop running forever on its own daemon thread.
+
+    Coroutines are scheduled with `submit()` (returns a concurrent Future) or
+    `run()` (blocks until done); async iterators are consumed from synchronous
+    code with `iterate()`. Objects that hold loop-bound resources (HTTP
+    connection pools, background tasks) stay valid for the life of the process.
+    """
+
+    def __init__(self, name: str = "agent-loop"):
+        """
+        Start the loop thread.
+
+        Args:
+            name: Thread name (shown in logs and profilers)
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def _check_thread(self):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Blocking on the background loop from its own thread would deadlock; await instead")
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the loop.
+
+        Returns:
+            concurrent.futures.Future for the coroutine's result (cancelling it cancels the task)
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it returns."""
+        self._check_thread()
+        return self.submit(coro).result(timeout)
+
+    def iterate(self, aiter: AsyncIterator) -> Iterator:
+        """
+        Consume an async iterator from synchronous code.
+
+        Items are produced on the loop and handed over through a thread-safe
+        queue, so the producer never waits for the consumer. Closing the
+        returned iterator early cancels the producer.
+
+        Args:
+            aiter: Async iterator (e.g. agent.chat_stream(...))
+
+        Yields:
+            The iterator's items, in order
+        """
+        self._check_thread()
+        items: queue.Queue = queue.Queue()
+        end = object()
+
+        async def pump():
+            try:
+                async for item in aiter:
+                    items.put((item, None))
+            except Exception as e:
+                items.put((end, e))
+                return
+            finally:
+                if hasattr(aiter, "aclose"):
+                    await aiter.aclose()
+            items.put((end, None))
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item, error = items.get()
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+
+_loop: Optional[BackgroundEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundEventLoop:
+    """Get the process-wide background event loop, starting it on first call."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = BackgroundEventLoop()
+            logger.info("Background event loop started")
+        return _loop
@@ -0,0 +1,215 @@
+"""
+Clause-level retrieval index for Contract Clarity Agent.
+Splits Docling markdown into section-aware chunks and ranks them with BM25,
+so follow-up questions only carry the clauses they need.
+"""
+
+import re
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+# "5.2 ...", "5.2. ...", "5. ...", "(a) ...", "iv) ..."
+CLAUSE_NUMBER_RE = re.compile(r"^\(?((?:\d+\.)+\d+\.?|\d+[.)]|[a-z][.)]|[ivx]+[.)])\s+", re.I)
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in is it its
+may of on or shall that the their them there these this to was what when
+where which who will with would you your
+""".split())
+
+
+@dataclass
+class Clause:
+    """
+    A chunk of the document with its location for citation. `clause` is the
+    clause number, or a range such as "5.1–5.3" when the chunk spans several.
+    """
+    index: int
+    section: str
+    clause: Optional[str]
+    text: str
+
+    @property
+    def citation(self) -> str:
+        """Human-readable location, e.g. 'Termination › 5.2' or 'Termination › 5.1–5.3'."""
+        if self.clause and self.clause not in self.section:
+            return f"{self.section} › {self.clause}"
+        return self.section
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with common stopwords removed."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_into_clauses(markdown: str, max_chars: int = 1500) -> List[Clause]:
+    """
+    Split document markdown into clause-sized chunks.
+
+    Chunks never cross a markdown heading. Within a section, paragraphs are
+    grouped up to `max_chars`, starting a new chunk at each numbered clause
+    (e.g. "5.2 ...", "(a) ...") once the current chunk is non-trivial.
+    A chunk holding several numbered clauses is cited with their range
+    ("5.1–5.3"), and one that continues a clause from the previous chunk
+    starts its range at that clause. Lettered sub-items only name a chunk
+    that has no numbered clause.
+
+    Args:
+        markdown: Document text as exported by Docling
+        max_chars: Soft upper bound on chunk size
+
+    Returns:
+        List of Clause chunks in document order
+    """
+    clauses: List[Clause] = []
+    section = "Preamble"
+    buffer: List[str] = []
+    numbers: List[str] = []         # numbered clauses in the current chunk, in order
+    sub_item: Optional[str] = None  # leading "(a)"-style label, if the chunk starts with one
+    last_number: Optional[str] = None
+
+    def flush():
+        nonlocal buffer, numbers, sub_item
+        text = "\n\n".join(buffer).strip()
+        if text:
+            if numbers:
+                clause_no = numbers[0] if numbers[0] == numbers[-1] else f"{numbers[0]}–{numbers[-1]}"
+            else:
+                clause_no = sub_item
+            clauses.append(Clause(len(clauses), section, clause_no, text))
+        buffer = []
+        numbers = []
+        sub_item = None
+
+    for block in re.split(r"\n\s*\n", markdown):
+        block = block.strip()
+        if not block:
+            continue
+
+        heading = HEADING_RE.match(block.splitlines()[0])
+        if heading:
+            flush()
+            section = heading.group(2).strip()
+            last_number = None
+            rest = "\n".join(block.splitlines()[1:]).strip()
+            if not rest:
+                continue
+            block = rest
+
+        number = CLAUSE_NUMBER_RE.match(block)
+        size = sum(len(b) for b in buffer)
+        if buffer and (size + len(block) > max_chars or (number and size > max_chars // 4)):
+            flush()
+        label = number.group(1).rstrip(".)") if number else None
+        is_numbered = bool(label) and label[0].isdigit()
+        if not buffer:
+            if last_number and not is_numbered:
+                numbers.append(last_number)  # continues the previous chunk's clause
+            elif label and not is_numbered:
+                sub_item = label
+        if is_numbered:
+            numbers.append(label)
+            last_number = label
+        buffer.append(block)
+
+    flush()
+    return clauses
+
+
+def group_clauses(clauses: List[Clause], max_chars: int) -> List[List[Clause]]:
+    """
+    Pack consecutive clauses into groups of at most `max_chars` of text
+    (a single oversized clause forms its own group).
+
+    Args:
+        clauses: Chunks from split_into_clauses()
+        max_chars: Soft upper bound on each group's text size
+
+    Returns:
+        List of clause groups in document order
+    """
+    groups: List[List[Clause]] = []
+    size = 0
+    for clause in clauses:
+        if groups and size + len(clause.text) <= max_chars:
+            groups[-1].append(clause)
+            size += len(clause.text)
+        else:
+            groups.append([clause])
+            size = len(clause.text)
+    return groups
+
+
+class ClauseIndex:
+    """BM25 index over document clauses."""
+
+    def __init__(self, clauses: List[Clause], k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index.
+
+        Args:
+            clauses: Chunks from split_into_clauses()
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.clauses = clauses
+        self.k1 = k1
+        self.b = b
+        # Section titles are indexed with the body so "termination" finds the Termination section
+        self._term_freqs = [Counter(tokenize(f"{c.section} {c.text}")) for c in clauses]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if clauses else 0.0
+        doc_freq = Counter()
+        for tf in self._term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(clauses)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    @classmethod
+    def from_markdown(cls, markdown: str, max_chars: int = 1500) -> "ClauseIndex":
+        """Chunk a document and index it."""
+        return cls(split_into_clauses(markdown, max_chars=max_chars))
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    def search(self, query: str, top_k: int = 6) -> List[Clause]:
+        """
+        Rank clauses for a query.
+
+        Args:
+            query: The user's question
+            top_k: Number of clauses to return
+
+        Returns:
+            Best-matching clauses, in document order
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.clauses:
+            return []
+
+        scores = []
+        for i, tf in enumerate(self._term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_length or 1))
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((score, i))
+
+        best = sorted(scores, reverse=True)[:top_k]
+        return [self.clauses[i] for i in sorted(i for _, i in best)]
+
+    @staticmethod
+    def format_clauses(clauses: List[Clause]) -> str:
+        """Render clauses for a prompt, each tagged with its citation."""
+        return "\n\n".join(f"[{c.citation}]\n{c.text}" for c in clauses)
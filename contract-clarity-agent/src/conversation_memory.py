@@ -0,0 +1,230 @@
+"""
+Bounded conversation memory for Contract Clarity Agent.
+A chat message store that keeps each turn's prompt within a token budget:
+the document reference is pinned, older turns are folded into a rolling
+summary in the background, and stale tool outputs are truncated.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+from agent_framework import ChatMessage, ChatMessageStore, FunctionResultContent
+
+logger = logging.getLogger(__name__)
+
+TRUNCATED_MARKER = " …[truncated]"
+
+SUMMARY_PROMPT = """Update the running summary of a conversation about a legal document.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW TURNS TO FOLD IN:
+{transcript}
+
+Write the updated summary in at most {max_words} words. Keep every question the user asked,
+the key facts and section citations from the answers, and any decisions or open concerns.
+Return only the summary."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return len(text) // 4
+
+
+def message_text(message: ChatMessage) -> str:
+    """All text carried by a message, including tool call results."""
+    parts = []
+    for content in message.contents:
+        if isinstance(content, FunctionResultContent):
+            parts.append(str(content.result))
+        elif getattr(content, "text", None):
+            parts.append(content.text)
+        elif getattr(content, "arguments", None):
+            parts.append(str(content.arguments))
+    return "\n".join(parts)
+
+
+def _role(message: ChatMessage) -> str:
+    return str(getattr(message.role, "value", message.role))
+
+
+class BoundedChatMessageStore(ChatMessageStore):
+    """
+    ChatMessageStore whose listed history stays within `max_tokens`.
+
+    The prompt sent for each turn is:
+        pinned messages (e.g. the document analysis)
+        + a summary of evicted turns
+        + the most recent turns, verbatim
+
+    When a new turn pushes the history over budget, the oldest turns are
+    evicted and summarized by `summarizer` on a background task. Until that
+    summary is ready, evicted turns are represented by the user's questions.
+    Tool results and user prompts from earlier turns are compacted as soon
+    as a newer turn starts.
+    """
+
+    def __init__(
+        self,
+        messages: Optional[Sequence[ChatMessage]] = None,
+        max_tokens: int = 8000,
+        keep_recent_turns: int = 2,
+        summarizer: Optional[Callable[[str], Awaitable[str]]] = None,
+        compact_text: Optional[Callable[[str], str]] = None,
+        tool_result_chars: int = 1500,
+        summary_words: int = 250,
+    ):
+        """
+        Initialize the message store.
+
+        Args:
+            messages: Initial messages
+            max_tokens: Token budget for the listed history (pinned + summary + recent turns)
+            keep_recent_turns: Turns that are always kept verbatim, even over budget
+            summarizer: Async callable(prompt) -> summary text; without it evicted turns are dropped
+            compact_text: Optional callable that shortens a user prompt once its turn is no longer the latest
+            tool_result_chars: Tool results from earlier turns are truncated to this many characters
+            summary_words: Target length of the rolling summary
+        """
+        super().__init__(messages)
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.summarizer = summarizer
+        self.compact_text = compact_text
+        self.tool_result_chars = tool_result_chars
+        self.summary_words = summary_words
+
+        self.pinned: List[ChatMessage] = []
+        self.summary: Optional[str] = None
+        self._unsummarized: List[ChatMessage] = []
+        self._compacted_turns = 0  # leading turns of self.messages that are already compacted
+        self._summary_task: Optional[asyncio.Task] = None
+
+    def pin(self, message: ChatMessage):
+        """Keep a message at the start of every prompt (never evicted or summarized)."""
+        self.pinned.append(message)
+
+    async def list_messages(self) -> List[ChatMessage]:
+        """Pinned messages, the conversation summary, then the recent turns."""
+        memory = self._memory_message()
+        return self.pinned + ([memory] if memory else []) + self.messages
+
+    async def add_messages(self, messages: Sequence[ChatMessage]) -> None:
+        """Append a turn, then compact and evict older turns to stay within budget."""
+        self.messages.extend(messages)
+        self._compact_earlier_turns()
+        self._enforce_budget()
+
+    async def wait_for_summary(self):
+        """Wait for any in-flight background summarization to finish."""
+        while self._summary_task is not None and not self._summary_task.done():
+            await asyncio.shield(self._summary_task)
+
+    def token_count(self) -> int:
+        """Estimated tokens in the listed history."""
+        memory = self._memory_message()
+        listed = self.pinned + ([memory] if memory else []) + self.messages
+        return sum(estimate_tokens(message_text(m)) for m in listed)
+
+    # --- internals ---
+
+    def _memory_message(self) -> Optional[ChatMessage]:
+        """System message standing in for evicted turns."""
+        if not (self.summary or self._unsummarized):
+            return None
+        parts = []
+        if self.summary:
+            parts.append(f"SUMMARY OF THE EARLIER CONVERSATION:\n{self.summary}")
+        questions = [
+            message_text(m)[:200] for m in self._unsummarized if _role(m) == "user"
+        ][-10:]
+        if questions:
+            parts.append("EARLIER QUESTIONS (not yet summarized):\n" + "\n".join(f"- {q}" for q in questions))
+        return ChatMessage(role="system", text="\n\n".join(parts))
+
+    def _turns(self) -> List[List[ChatMessage]]:
+        """Split the history into turns, each starting at a user message."""
+        turns: List[List[ChatMessage]] = []
+        for message in self.messages:
+            if _role(message) == "user" or not turns:
+                turns.append([])
+            turns[-1].append(message)
+        return turns
+
+    def _compact_earlier_turns(self):
+        """Truncate tool results and shorten user prompts in every turn but the latest."""
+        turns = self._turns()
+        for turn in turns[self._compacted_turns:-1]:
+            for i, message in enumerate(turn):
+                if _role(message) == "user" and self.compact_text:
+                    compacted = ChatMessage(role="user", text=self.compact_text(message_text(message)))
+                    turn[i] = compacted
+                    message = compacted
+                elif any(isinstance(c, FunctionResultContent) for c in message.contents):
+                    turn[i] = message = ChatMessage(
+                        role=message.role,
+                        contents=[self._truncate_result(c) for c in message.contents],
+                    )
+        self._compacted_turns = max(self._compacted_turns, len(turns) - 1)
+        self.messages = [m for turn in turns for m in turn]
+
+    def _truncate_result(self, content):
+        if not isinstance(content, FunctionResultContent):
+            return content
+        result = str(content.result)
+        if len(result) <= self.tool_result_chars:
+            return content
+        return FunctionResultContent(
+            call_id=content.call_id,
+            result=result[:self.tool_result_chars] + TRUNCATED_MARKER,
+        )
+
+    def _enforce_budget(self):
+        """Evict the oldest turns while over budget, then summarize them in the background."""
+        turns = self._turns()
+        evicted = False
+        while len(turns) > self.keep_recent_turns and self.token_count() > self.max_tokens:
+            self._unsummarized.extend(turns.pop(0))
+            self.messages = [m for turn in turns for m in turn]
+            self._compacted_turns = max(0, self._compacted_turns - 1)
+            evicted = True
+
+        if evicted:
+            logger.info(f"Conversation memory over budget; {len(self._unsummarized)} messages queued for summary")
+            if self.summarizer is None:
+                # No summarizer: keep only the questions of the most recent evicted turns
+                self._unsummarized = [m for m in self._unsummarized if _role(m) == "user"][-10:]
+            self._schedule_summary()
+
+    def _schedule_summary(self):
+        if self.summarizer is None or not self._unsummarized:
+            return
+        if self._summary_task is not None and not self._summary_task.done():
+            return  # the running task picks up newly evicted turns when it finishes
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop; the next add_messages() will retry
+        self._summary_task = loop.create_task(self._summarize())
+
+    async def _summarize(self):
+        """Fold evicted turns into the rolling summary until none are left."""
+        while self._unsummarized:
+            batch = list(self._unsummarized)
+            transcript = "\n\n".join(f"{_role(m).upper()}: {message_text(m)}" for m in batch)
+            prompt = SUMMARY_PROMPT.format(
+                summary=self.summary or "(none yet)",
+                transcript=transcript,
+                max_words=self.summary_words,
+            )
+            try:
+                self.summary = (await self.summarizer(prompt)).strip()
+            except asyncio.CancelledError:
+                raise  # evicted turns stay queued for the next attempt
+            except Exception as e:
+                logger.warning(f"Could not summarize earlier conversation: {e}")
+                return
+            del self._unsummarized[:len(batch)]
+            logger.info(f"Conversation summary updated ({estimate_tokens(self.summary)} tokens)")
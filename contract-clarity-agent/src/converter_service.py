@@ -0,0 +1,348 @@
+"""
+Process-wide Docling conversion service for Contract Clarity Agent.
+Loads Docling's layout/OCR/table models once per process and serves
+conversion jobs from a small pool of warm worker threads. Large PDFs can
+also be converted in page batches across worker processes.
+
+Sources are file paths or InMemoryDocument uploads, which are converted
+straight from their in-memory buffer without being written to disk.
+"""
+
+import io
+import os
+import hashlib
+import logging
+import threading
+import multiprocessing
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from .document_cache import hash_file
+
+try:
+    from docling.document_converter import DocumentConverter
+except ImportError:
+    DocumentConverter = None
+
+try:
+    from docling.datamodel.base_models import DocumentStream, InputFormat
+except ImportError:
+    DocumentStream = None
+    InputFormat = None
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InMemoryDocument:
+    """
+    An uploaded document held in memory (e.g. a Streamlit UploadedFile's bytes).
+
+    Every consumer reads from the same buffer: Docling gets a DocumentStream,
+    PIL and pypdfium2 read it directly, and the content hash is computed once.
+    """
+    name: str
+    data: bytes = field(repr=False)
+
+    @property
+    def suffix(self) -> str:
+        return Path(self.name).suffix.lower()
+
+    @cached_property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+    def open(self) -> io.BytesIO:
+        """A fresh read-only stream over the buffer (BytesIO shares `bytes` without copying)."""
+        return io.BytesIO(self.data)
+
+
+DocumentSource = Union[str, InMemoryDocument]
+
+
+def source_name(source: DocumentSource) -> str:
+    """File name of a source (used for file-type detection and logging)."""
+    return source.name if isinstance(source, InMemoryDocument) else str(source)
+
+
+def source_hash(source: DocumentSource) -> str:
+    """SHA-256 of a source's contents (cache key for converted documents and images)."""
+    return source.sha256 if isinstance(source, InMemoryDocument) else hash_file(source)
+
+
+def readable(source: DocumentSource):
+    """What file readers (PIL, pypdfium2) accept for a source: a path or an in-memory stream."""
+    return source.open() if isinstance(source, InMemoryDocument) else source
+
+
+def docling_source(source: DocumentSource) -> Any:
+    """What DocumentConverter.convert accepts for a source (a new DocumentStream per call)."""
+    if isinstance(source, InMemoryDocument):
+        if DocumentStream is None:
+            raise ImportError("Docling is not installed")
+        return DocumentStream(name=source.name, stream=source.open())
+    return source
+
+
+class ConverterService:
+    """
+    Pool of warm Docling converters shared by every DocumentProcessor.
+
+    Each worker thread owns one DocumentConverter (created on the thread's
+    first job and reused afterwards), so model loading happens once per
+    worker instead of once per browser session. Jobs are submitted with
+    `submit()` and return a Future; `convert()` is the blocking shortcut.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        """
+        Initialize the conversion service.
+
+        Args:
+            max_workers: Number of concurrent conversions (each holds its own models in memory)
+        """
+        if DocumentConverter is None:
+            raise ImportError("Docling is not installed")
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docling")
+
+    def _get_converter(self):
+        """Return this worker thread's converter, loading models on first use."""
+        converter = getattr(self._local, "converter", None)
+        if converter is None:
+            logger.info("Loading Docling models in %s", threading.current_thread().name)
+            converter = DocumentConverter()
+            # Build the PDF pipeline (layout, OCR, table models) eagerly
+            if InputFormat is not None and hasattr(converter, "initialize_pipeline"):
+                try:
+                    converter.initialize_pipeline(InputFormat.PDF)
+                except Exception as e:
+                    logger.warning(f"Could not pre-initialize Docling PDF pipeline: {e}")
+            self._local.converter = converter
+        return converter
+
+    def _run(self, source: Any, **kwargs):
+        return self._get_converter().convert(docling_source(source), **kwargs)
+
+    def submit(self, source: Any, **kwargs) -> Future:
+        """
+        Queue a conversion job.
+
+        Args:
+            source: File path, InMemoryDocument, or any source accepted by DocumentConverter.convert
+            **kwargs: Passed through to DocumentConverter.convert
+
+        Returns:
+            Future resolving to Docling's ConversionResult
+        """
+        return self._executor.submit(self._run, source, **kwargs)
+
+    def convert(self, source: Any, **kwargs):
+        """Convert a document and block until the result is ready."""
+        return self.submit(source, **kwargs).result()
+
+    def warm_up(self) -> list:
+        """
+        Load models in every worker ahead of the first real job.
+
+        Returns:
+            Futures that resolve once each worker is warm
+        """
+        return [self._executor.submit(self._get_converter) for _ in range(self.max_workers)]
+
+    def shutdown(self):
+        """Stop the worker threads (pending jobs are completed first)."""
+        self._executor.shutdown(wait=True)
+
+
+_service: Optional[ConverterService] = None
+_service_lock = threading.Lock()
+
+
+def get_converter_service() -> ConverterService:
+    """
+    Get the process-wide converter service, creating it on first call.
+    Pool size comes from the DOCLING_WORKERS env var (default 1).
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            workers = int(os.getenv("DOCLING_WORKERS", "1"))
+            _service = ConverterService(max_workers=workers)
+            logger.info(f"Docling converter service started with {workers} worker(s)")
+        return _service
+
+
+# ---------------------------------------------------------------------------
+# Page-parallel PDF conversion
+# ---------------------------------------------------------------------------
+
+# Converter owned by a page-batch worker process (set by _init_page_worker)
+_process_converter = None
+
+
+def _init_page_worker():
+    """Load Docling models once when a page-batch worker process starts."""
+    global _process_converter
+    _process_converter = DocumentConverter()
+
+
+def _convert_page_range(source: DocumentSource, start: int, end: int) -> Tuple[int, str]:
+    """Convert pages start..end (1-based, inclusive) in a worker process."""
+    result = _process_converter.convert(docling_source(source), page_range=(start, end))
+    return start, result.document.export_to_markdown()
+
+
+def _slice_pdf(pdf, name: str, start: int, end: int) -> InMemoryDocument:
+    """Copy pages start..end (1-based, inclusive) of an open pypdfium2 PDF into a new, smaller PDF."""
+    batch = pypdfium2.PdfDocument.new()
+    try:
+        batch.import_pages(pdf, list(range(start - 1, end)))
+        buffer = io.BytesIO()
+        batch.save(buffer)
+    finally:
+        batch.close()
+    return InMemoryDocument(name=name, data=buffer.getvalue())
+
+
+def count_pdf_pages(source: DocumentSource) -> Optional[int]:
+    """
+    Count the pages of a PDF without running a conversion.
+
+    Args:
+        source: Path to the PDF file, or an InMemoryDocument
+
+    Returns:
+        Page count, or None if it cannot be determined
+    """
+    if pypdfium2 is None:
+        return None
+    try:
+        pdf = pypdfium2.PdfDocument(source.data if isinstance(source, InMemoryDocument) else source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception as e:
+        logger.warning(f"Could not count PDF pages: {e}")
+        return None
+
+
+class PageParallelConverter:
+    """
+    Converts large PDFs in page batches across worker processes and stitches
+    the per-batch markdown back together in page order.
+
+    Each worker process loads Docling models once and is reused across
+    documents, so batches only pay for conversion. Workers are started with
+    the "spawn" method: forking the multi-threaded Streamlit process (with
+    torch/Docling threads running) can deadlock children on locks held at
+    fork time.
+    """
+
+    def __init__(self, max_workers: int, batch_size: int = 20):
+        """
+        Initialize the page-parallel converter.
+
+        Args:
+            max_workers: Number of worker processes (each holds its own models in memory)
+            batch_size: Pages per conversion job
+        """
+        if DocumentConverter is None:
+            raise ImportError("Docling is not installed")
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_page_worker,
+        )
+
+    def page_batches(self, num_pages: int) -> List[Tuple[int, int]]:
+        """Split 1..num_pages into inclusive (start, end) batches."""
+        return [
+            (start, min(start + self.batch_size - 1, num_pages))
+            for start in range(1, num_pages + 1, self.batch_size)
+        ]
+
+    def convert_to_markdown(
+        self,
+        source: DocumentSource,
+        num_pages: int,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> str:
+        """
+        Convert a PDF to markdown, one page batch per job.
+
+        Args:
+            source: Path to the PDF file, or an InMemoryDocument (each worker
+                process is sent only the pages of its batch, as a small PDF)
+            num_pages: Total number of pages in the PDF
+            progress: Optional callback(pages_done, num_pages), called as each batch finishes
+
+        Returns:
+            Markdown for the whole document, in page order
+        """
+        batches = self.page_batches(num_pages)
+        futures = {}
+        # Pickling the whole upload into every job would copy it once per batch,
+        # so in-memory PDFs are opened once and sent as one small PDF per batch
+        pdf = pypdfium2.PdfDocument(source.data) if isinstance(source, InMemoryDocument) else None
+        try:
+            for start, end in batches:
+                if pdf is not None:
+                    job = (_slice_pdf(pdf, source.name, start, end), 1, end - start + 1)
+                else:
+                    job = (source, start, end)
+                futures[self._executor.submit(_convert_page_range, *job)] = (start, end)
+        finally:
+            if pdf is not None:
+                pdf.close()
+        parts = {}
+        pages_done = 0
+        for future in as_completed(futures):
+            start, end = futures[future]
+            parts[start] = future.result()[1]
+            pages_done += end - start + 1
+            logger.info(f"Converted pages {start}-{end} ({pages_done}/{num_pages})")
+            if progress:
+                progress(pages_done, num_pages)
+        return "\n\n".join(parts[start] for start, _ in batches)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=True)
+
+
+_page_converter: Optional[PageParallelConverter] = None
+
+
+def get_page_parallel_converter() -> Optional[PageParallelConverter]:
+    """
+    Get the process-wide page-parallel converter, creating it on first call.
+
+    Enabled when DOCLING_PAGE_WORKERS > 1 (default 0 = disabled); batch size
+    comes from DOCLING_PAGE_BATCH (default 20).
+
+    Returns:
+        PageParallelConverter instance, or None if disabled
+    """
+    global _page_converter
+    workers = int(os.getenv("DOCLING_PAGE_WORKERS", "0"))
+    if workers <= 1 or DocumentConverter is None:
+        return None
+    with _service_lock:
+        if _page_converter is None:
+            batch_size = int(os.getenv("DOCLING_PAGE_BATCH", "20"))
+            _page_converter = PageParallelConverter(max_workers=workers, batch_size=batch_size)
+            logger.info(f"Page-parallel Docling converter started with {workers} processes")
+        return _page_converter
@@ -0,0 +1,215 @@
+"""
+Caches for Contract Clarity Agent.
+On-disk cache of parsed documents, keyed by file content hash + converter options
+with size-bounded LRU eviction, and a small in-memory TTL cache for web content.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 of a file without reading it into memory at once.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """
+    Persistent cache of processed-document results (markdown + page metadata).
+
+    Each entry is one JSON file named after the cache key. Reads refresh the
+    file's mtime, and writes evict least-recently-used entries until the
+    directory fits in `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 500 * 1024 * 1024):
+        """
+        Initialize the document cache.
+
+        Args:
+            cache_dir: Directory to store cache entries in
+            max_bytes: Maximum total size of the cache directory
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(file_hash: str, options: Dict[str, Any]) -> str:
+        """
+        Build a cache key from a file hash and the converter options that produced it.
+
+        Args:
+            file_hash: SHA-256 of the file contents
+            options: Converter options (anything that changes the output)
+
+        Returns:
+            Hex cache key
+        """
+        fingerprint = json.dumps(options, sort_keys=True, default=str)
+        return hashlib.sha256(f"{file_hash}:{fingerprint}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Cache key from make_key()
+
+        Returns:
+            The cached result dict, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)  # mark as recently used
+            return result
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """
+        Store a result and evict old entries if the cache is over its size limit.
+
+        Args:
+            key: Cache key from make_key()
+            result: JSON-serializable result dict
+        """
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with self._lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(result, f)
+                tmp_path.replace(path)
+            except (OSError, TypeError) as e:
+                logger.warning(f"Could not write cache entry: {e}")
+                tmp_path.unlink(missing_ok=True)
+                return
+            self._evict()
+
+    def _evict(self):
+        """Remove least-recently-used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for entry in self.cache_dir.glob("*.json"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            logger.info(f"Evicted document cache entry {entry.name}")
+
+    def clear(self):
+        """Delete every cache entry."""
+        with self._lock:
+            for entry in self.cache_dir.glob("*.json"):
+                entry.unlink(missing_ok=True)
+
+
+def get_document_cache() -> Optional[DocumentCache]:
+    """
+    Create the document cache from environment settings.
+
+    Caching is opt-in: it is enabled only when DOCUMENT_CACHE_DIR is set, since
+    entries keep parsed document text on disk after the upload is deleted.
+    DOCUMENT_CACHE_MAX_MB bounds its size (default 500).
+
+    Returns:
+        DocumentCache instance, or None if caching is disabled
+    """
+    cache_dir = os.getenv("DOCUMENT_CACHE_DIR")
+    if not cache_dir:
+        return None
+    max_mb = float(os.getenv("DOCUMENT_CACHE_MAX_MB", "500"))
+    try:
+        return DocumentCache(cache_dir, max_bytes=int(max_mb * 1024 * 1024))
+    except OSError as e:
+        logger.warning(f"Document cache disabled: {e}")
+        return None
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache whose entries expire after `ttl` seconds.
+    Holds at most `max_entries`, evicting the least recently used.
+    """
+
+    def __init__(self, ttl: float = 900, max_entries: int = 128):
+        """
+        Initialize the cache.
+
+        Args:
+            ttl: Seconds an entry stays valid
+            max_entries: Maximum number of entries kept
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
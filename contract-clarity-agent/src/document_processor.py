@@ -4,23 +4,32 @@ Handles PDF/DOCX parsing with Docling and web content extraction with Firecrawl.
 """
 
 import os
+import time
+import asyncio
 import tempfile
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List
+from urllib.parse import urldefrag
 import io
 
-try:
-    from docling.document_converter import DocumentConverter
-except ImportError:
-    DocumentConverter = None
+from .converter_service import (
+    DocumentConverter,
+    DocumentSource,
+    count_pdf_pages,
+    get_converter_service,
+    get_page_parallel_converter,
+    source_hash,
+    source_name,
+)
+from .document_cache import TTLCache, get_document_cache
+from .image_preprocessing import get_image_preprocessor, read_image_size
+from .telemetry import record_cache_lookup, record_conversion, stage
 
 try:
     from firecrawl import Firecrawl
 except ImportError:
     Firecrawl = None
 
-from PIL import Image
-import base64
 
 
 class DocumentProcessor:
@@ -28,21 +37,53 @@ class DocumentProcessor:
     
     def __init__(self):
         """Initialize document processor."""
+        self.cache = get_document_cache()
+        self.page_converter = None
         self.converter = None
         if DocumentConverter:
             try:
-                # Initialize Docling converter with default options
-                # The converter automatically handles OCR and table structure
-                self.converter = DocumentConverter()
+                # Use the process-wide converter service so Docling's layout, OCR and
+                # table-structure models are loaded once, not once per session
+                self.converter = get_converter_service()
+                # Optional page-sharded conversion for large PDFs (DOCLING_PAGE_WORKERS > 1)
+                self.page_converter = get_page_parallel_converter()
             except Exception as e:
                 print(f"Warning: Could not initialize Docling converter: {e}")
     
-    def process_pdf(self, file_path: str) -> Dict[str, Any]:
+    def converter_options(self, file_type: str) -> Dict[str, Any]:
+        """
+        Options that determine conversion output (part of the cache key).
+        
+        Args:
+            file_type: Document type being converted
+            
+        Returns:
+            Dictionary of option names to values
+        """
+        try:
+            from importlib.metadata import version
+            docling_version = version("docling")
+        except Exception:
+            docling_version = "unknown"
+        options = {"file_type": file_type, "docling": docling_version}
+        if file_type == 'pdf' and self.page_converter:
+            options["page_batch"] = self.page_converter.batch_size
+        return options
+    
+    def process_pdf(
+        self,
+        file_path: DocumentSource,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
         """
         Process a PDF file and extract text with structure.
         
+        PDFs longer than one page batch are converted batch-by-batch in worker
+        processes when page-parallel conversion is enabled.
+        
         Args:
-            file_path: Path to the PDF file
+            file_path: Path to the PDF file, or an InMemoryDocument upload
+            progress: Optional callback(pages_done, total_pages)
             
         Returns:
             Dictionary containing extracted text and metadata
@@ -54,15 +95,31 @@ class DocumentProcessor:
             }
         
         try:
-            # Convert document
-            result = self.converter.convert(file_path)
+            num_pages = count_pdf_pages(file_path) if self.page_converter else None
+            if num_pages and num_pages > self.page_converter.batch_size:
+                with stage("docling.convert", mode="page_parallel", num_pages=num_pages):
+                    markdown_text = self.page_converter.convert_to_markdown(file_path, num_pages, progress)
+                return {
+                    "text": markdown_text,
+                    "num_pages": num_pages,
+                    "file_type": "pdf",
+                    "success": True
+                }
             
-            # Extract text with structure preservation
-            markdown_text = result.document.export_to_markdown()
+            # Convert document
+            with stage("docling.convert", mode="single") as span:
+                result = self.converter.convert(file_path)
+                
+                # Extract text with structure preservation
+                markdown_text = result.document.export_to_markdown()
+                span.set_attribute("num_pages", len(result.document.pages) if hasattr(result.document, 'pages') else 0)
+            num_pages = len(result.document.pages) if hasattr(result.document, 'pages') else 0
+            if progress:
+                progress(num_pages, num_pages)
             
             return {
                 "text": markdown_text,
-                "num_pages": len(result.document.pages) if hasattr(result.document, 'pages') else 0,
+                "num_pages": num_pages,
                 "file_type": "pdf",
                 "success": True
             }
@@ -73,12 +130,12 @@ class DocumentProcessor:
                 "success": False
             }
     
-    def process_docx(self, file_path: str) -> Dict[str, Any]:
+    def process_docx(self, file_path: DocumentSource) -> Dict[str, Any]:
         """
         Process a DOCX file and extract text.
         
         Args:
-            file_path: Path to the DOCX file
+            file_path: Path to the DOCX file, or an InMemoryDocument upload
             
         Returns:
             Dictionary containing extracted text and metadata
@@ -108,29 +165,29 @@ class DocumentProcessor:
                 "success": False
             }
     
-    def process_image(self, file_path: str) -> Dict[str, Any]:
+    def process_image(self, file_path: DocumentSource) -> Dict[str, Any]:
         """
         Process an image file (OCR will be handled by the LLM vision capabilities).
+        The image is downsampled to the vision model's working resolution and
+        very tall pages are split into tiles (see image_preprocessing).
         
         Args:
-            file_path: Path to the image file
+            file_path: Path to the image file, or an InMemoryDocument upload
             
         Returns:
-            Dictionary containing image data for LLM processing
+            Dictionary containing image data for LLM processing; "images" holds
+            the encoded tiles (ImagePayload) in reading order
         """
         try:
-            # Open and validate image
-            img = Image.open(file_path)
-            
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            # Dimensions come from the header; pixels are only decoded by the preprocessor
+            width, height = read_image_size(file_path)
+            images = get_image_preprocessor().prepare(file_path)
             
-            # Get image info
             return {
-                "image_path": file_path,
-                "width": img.width,
-                "height": img.height,
+                "image_path": source_name(file_path),
+                "width": width,
+                "height": height,
+                "images": images,
                 "file_type": "image",
                 "success": True,
                 "text": "[Image will be processed by vision-enabled LLM]"
@@ -142,20 +199,68 @@ class DocumentProcessor:
                 "success": False
             }
     
-    def process_document(self, file_path: str, file_type: Optional[str] = None) -> Dict[str, Any]:
+    def _process_cached(
+        self,
+        file_path: DocumentSource,
+        file_type: str,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Convert a PDF/DOCX, serving the result from the document cache when the
+        same file was already converted with the same options.
+        
+        Args:
+            file_path: Path to the document, or an InMemoryDocument upload
+            file_type: 'pdf' or 'docx'
+            progress: Optional callback(pages_done, total_pages) for PDFs
+            
+        Returns:
+            Dictionary containing extracted text and metadata
+        """
+        if file_type == 'pdf':
+            def process(path):
+                return self.process_pdf(path, progress)
+        else:
+            process = self.process_docx
+        if not self.cache:
+            return process(file_path)
+        
+        try:
+            key = self.cache.make_key(source_hash(file_path), self.converter_options(file_type))
+        except OSError:
+            return process(file_path)
+        
+        cached = self.cache.get(key)
+        record_cache_lookup("document", cached is not None)
+        if cached is not None:
+            cached["cache_hit"] = True
+            return cached
+        
+        result = process(file_path)
+        if result.get("success"):
+            self.cache.put(key, result)
+        return result
+    
+    def process_document(
+        self,
+        file_path: DocumentSource,
+        file_type: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, Any]:
         """
         Process a document based on its type.
         
         Args:
-            file_path: Path to the document
+            file_path: Path to the document, or an InMemoryDocument upload
             file_type: Optional file type hint (pdf, docx, image)
+            progress: Optional callback(pages_done, total_pages) for PDF conversion
             
         Returns:
             Dictionary containing extracted content and metadata
         """
         # Determine file type if not provided
         if not file_type:
-            file_ext = Path(file_path).suffix.lower()
+            file_ext = Path(source_name(file_path)).suffix.lower()
             if file_ext == '.pdf':
                 file_type = 'pdf'
             elif file_ext in ['.docx', '.doc']:
@@ -169,13 +274,23 @@ class DocumentProcessor:
                     "success": False
                 }
         
-        # Process based on type
-        if file_type == 'pdf':
-            return self.process_pdf(file_path)
-        elif file_type == 'docx':
-            return self.process_docx(file_path)
-        elif file_type == 'image':
-            return self.process_image(file_path)
+        # Converted documents are cached by content hash, so re-uploads skip Docling
+        if file_type in ('pdf', 'docx', 'image'):
+            with stage("document.process", file_type=file_type) as span:
+                start = time.perf_counter()
+                if file_type == 'image':
+                    result = self.process_image(file_path)
+                else:
+                    result = self._process_cached(file_path, file_type, progress)
+                elapsed = time.perf_counter() - start
+                
+                span.set_attribute("success", bool(result.get("success")))
+                span.set_attribute("text_chars", len(result.get("text", "")))
+                if result.get("num_pages"):
+                    span.set_attribute("num_pages", result["num_pages"])
+                if result.get("success") and file_type != 'image' and not result.get("cache_hit"):
+                    record_conversion(elapsed, result.get("num_pages"), file_type)
+                return result
         else:
             return {
                 "text": "",
@@ -187,25 +302,41 @@ class DocumentProcessor:
 class WebContentExtractor:
     """Handles web content extraction using Firecrawl."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    # Only markdown is used downstream, so it is the only format requested
+    SCRAPE_FORMATS = ["markdown"]
+    
+    def __init__(self, api_key: Optional[str] = None, client: Any = None):
         """
         Initialize web content extractor.
         
         Args:
             api_key: Firecrawl API key (if not provided, will use env var)
+            client: Optional pre-built client with Firecrawl's `scrape()` API
+                (e.g. src.fake_firecrawl.FakeFirecrawl for tests)
         """
         self.api_key = api_key or os.getenv("FIRECRAWL_API_KEY")
-        self.client = None
+        self.client = client
         
-        if self.api_key and Firecrawl:
+        if self.client is None and self.api_key and Firecrawl:
             try:
                 self.client = Firecrawl(api_key=self.api_key)
             except Exception as e:
                 print(f"Warning: Could not initialize Firecrawl client: {e}")
+        
+        # Successful extractions are reused for WEB_CACHE_TTL_SECONDS (0 disables)
+        ttl = float(os.getenv("WEB_CACHE_TTL_SECONDS", "900"))
+        self.cache = TTLCache(ttl=ttl) if ttl > 0 else None
+        self.max_concurrency = int(os.getenv("WEB_EXTRACT_CONCURRENCY", "4"))
+    
+    @staticmethod
+    def _cache_key(url: str) -> str:
+        """Normalize a URL for caching (fragments never change the fetched page)."""
+        return urldefrag(url.strip())[0]
     
     def extract_from_url(self, url: str) -> Dict[str, Any]:
         """
         Extract content from a web URL.
+        Results are cached per URL for WEB_CACHE_TTL_SECONDS.
         
         Args:
             url: The URL to scrape
@@ -220,21 +351,33 @@ class WebContentExtractor:
                 "success": False
             }
         
+        key = self._cache_key(url)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            record_cache_lookup("web", cached is not None)
+            if cached is not None:
+                print(f"Web content cache hit: {key}")
+                return {**cached, "cache_hit": True}
+        
         try:
             # Scrape the URL - returns a Document object (Pydantic model), not a dict
-            result = self.client.scrape(url, formats=['markdown', 'html'], remove_base64_images=True)
+            with stage("firecrawl.scrape", url=key):
+                result = self.client.scrape(url, formats=self.SCRAPE_FORMATS, remove_base64_images=True)
             
             # Access Document object properties directly
-            markdown_content = result.markdown or result.html or ""
+            markdown_content = result.markdown or ""
             title = result.metadata.title if result.metadata else ""
             
-            return {
+            extracted = {
                 "text": markdown_content,
                 "url": url,
                 "title": title,
                 "file_type": "web",
                 "success": True
             }
+            if self.cache is not None:
+                self.cache.put(key, extracted)
+            return extracted
         except Exception as e:
             print(f"Error extracting web content: {e}")
             return {
@@ -242,3 +385,24 @@ class WebContentExtractor:
                 "error": f"Error extracting web content: {str(e)}",
                 "success": False
             }
+    
+    async def extract_from_urls(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Extract several pages concurrently (e.g. Terms of Service, Privacy Policy and DPA).
+        Duplicate URLs are fetched once; at most WEB_EXTRACT_CONCURRENCY scrapes run at a time.
+        
+        Args:
+            urls: URLs to scrape
+        
+        Returns:
+            One result dict per URL, in the same order as `urls`
+        """
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        
+        async def extract(url: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await asyncio.to_thread(self.extract_from_url, url)
+        
+        unique = list(dict.fromkeys(self._cache_key(url) for url in urls))
+        results = dict(zip(unique, await asyncio.gather(*(extract(url) for url in unique))))
+        return [results[self._cache_key(url)] for url in urls]
@@ -0,0 +1,82 @@
+"""
+Local stand-in for the Firecrawl client, for tests and offline development.
+Serves canned pages with the same `scrape()` call shape as `firecrawl.Firecrawl`,
+so WebContentExtractor can run without network access or an API key:
+
+    from src.document_processor import WebContentExtractor
+    from src.fake_firecrawl import FakeFirecrawl
+
+    fake = FakeFirecrawl({"https://example.com/terms": "# Terms of Service\\n..."})
+    extractor = WebContentExtractor(client=fake)
+"""
+
+import time
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+
+class FakeFirecrawl:
+    """
+    In-memory Firecrawl backend.
+
+    Pages are markdown strings keyed by URL; the first markdown heading is
+    reported as the page title. Every call is recorded in `calls` so tests can
+    assert on caching and requested formats.
+    """
+
+    def __init__(self, pages: Optional[Dict[str, str]] = None, latency: float = 0.0):
+        """
+        Initialize the fake backend.
+
+        Args:
+            pages: Mapping of URL -> markdown content
+            latency: Seconds to sleep per scrape (to exercise concurrency)
+        """
+        self.pages = dict(pages or {})
+        self.latency = latency
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_directory(cls, directory: str, base_url: str = "https://example.com/", latency: float = 0.0) -> "FakeFirecrawl":
+        """
+        Serve every `*.md` file in a directory, at `base_url + <file stem>`.
+
+        Args:
+            directory: Directory containing markdown files
+            base_url: URL prefix for the pages
+            latency: Seconds to sleep per scrape
+        """
+        pages = {
+            f"{base_url}{path.stem}": path.read_text(encoding="utf-8")
+            for path in sorted(Path(directory).glob("*.md"))
+        }
+        return cls(pages, latency=latency)
+
+    def scrape(self, url: str, formats: Optional[List[str]] = None, **kwargs):
+        """
+        Return a Document-like object for a known URL.
+
+        Raises:
+            ValueError: If the URL has no canned page (mirrors a failed scrape)
+        """
+        formats = list(formats or ["markdown"])
+        with self._lock:
+            self.calls.append({"url": url, "formats": formats, **kwargs})
+        if self.latency:
+            time.sleep(self.latency)
+
+        if url not in self.pages:
+            raise ValueError(f"Fake Firecrawl: no page for {url}")
+        markdown = self.pages[url]
+        title = next(
+            (line.lstrip("#").strip() for line in markdown.splitlines() if line.startswith("#")),
+            "",
+        )
+        return SimpleNamespace(
+            markdown=markdown if "markdown" in formats else None,
+            html=f"<pre>{markdown}</pre>" if "html" in formats else None,
+            metadata=SimpleNamespace(title=title, source_url=url),
+        )
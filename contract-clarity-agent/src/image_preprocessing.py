@@ -0,0 +1,215 @@
+"""
+Image preprocessing for vision-based contract analysis.
+Reads image dimensions from the file header, downsamples photos and scans
+to the vision model's working resolution, tiles very tall pages, and caches
+the encoded payloads by content hash.
+"""
+
+import io
+import os
+import math
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from .converter_service import DocumentSource, readable, source_hash
+from .document_cache import TTLCache
+from .telemetry import record_cache_lookup, stage
+
+logger = logging.getLogger(__name__)
+
+# EXIF orientations that rotate the image by 90/270 degrees (width and height swap)
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+_EXIF_ORIENTATION_TAG = 0x0112
+
+
+@dataclass
+class ImagePayload:
+    """One encoded image (or tile) ready to send to a vision model."""
+    data: bytes
+    media_type: str
+    width: int
+    height: int
+    tile: int
+    total_tiles: int
+
+    @property
+    def approx_tokens(self) -> int:
+        return estimate_image_tokens(self.width, self.height)
+
+
+def read_image_size(source: DocumentSource) -> Tuple[int, int]:
+    """
+    Read an image's display size from its header, without decoding pixel data.
+    EXIF orientation is applied, so phone photos report their upright size.
+
+    Args:
+        source: Path to the image file, or an InMemoryDocument
+
+    Returns:
+        (width, height) in pixels
+    """
+    with Image.open(readable(source)) as img:
+        width, height = img.size
+        try:
+            orientation = img.getexif().get(_EXIF_ORIENTATION_TAG)
+        except Exception:
+            orientation = None
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def estimate_image_tokens(width: int, height: int, tile_size: int = 512) -> int:
+    """
+    Approximate vision tokens for a high-detail image (85 base + 170 per 512px tile),
+    after the model's own fit-to-2048 / 768-short-side scaling.
+    """
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / tile_size) * math.ceil(height / tile_size)
+
+
+def plan_tiles(width: int, height: int, max_aspect: float, overlap: float = 0.03) -> List[Tuple[int, int]]:
+    """
+    Split a tall page into vertical bands no taller than `max_aspect` x width.
+
+    Adjacent bands overlap slightly so a text line on a boundary appears whole
+    in at least one tile.
+
+    Returns:
+        List of (top, bottom) pixel rows
+    """
+    if height <= width * max_aspect:
+        return [(0, height)]
+    count = math.ceil(height / (width * max_aspect))
+    band = math.ceil(height / count)
+    pad = int(band * overlap)
+    return [(max(0, i * band - pad), min(height, (i + 1) * band + pad)) for i in range(count)]
+
+
+def target_size(width: int, height: int, short_side: int, long_side: int) -> Tuple[int, int]:
+    """Size that fits within `long_side` and has at most `short_side` on its short edge (never upscales)."""
+    scale = min(1.0, long_side / max(width, height), short_side / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class ImagePreprocessor:
+    """
+    Turns uploaded photos/scans into vision-model payloads.
+
+    Each page is tiled if it is very tall, each tile is downsampled to the
+    model's working resolution (larger images only cost tokens; the model
+    scales them down anyway), and tiles are re-encoded as JPEG. Results are
+    cached by file content hash, so re-analyzing the same upload is free.
+    """
+
+    def __init__(
+        self,
+        short_side: int = 768,
+        long_side: int = 2048,
+        max_tile_aspect: float = 1.5,
+        jpeg_quality: int = 85,
+        cache_entries: int = 32,
+    ):
+        """
+        Initialize the preprocessor.
+
+        Args:
+            short_side: Maximum short-edge size of each tile in pixels
+            long_side: Maximum long-edge size of each tile in pixels
+            max_tile_aspect: Pages taller than this height/width ratio are tiled
+            jpeg_quality: JPEG quality for encoded tiles
+            cache_entries: Number of processed images kept in memory
+        """
+        self.short_side = short_side
+        self.long_side = long_side
+        self.max_tile_aspect = max_tile_aspect
+        self.jpeg_quality = jpeg_quality
+        self.cache = TTLCache(ttl=3600, max_entries=cache_entries)
+
+    def _cache_key(self, source: DocumentSource) -> str:
+        options = (self.short_side, self.long_side, self.max_tile_aspect, self.jpeg_quality)
+        return f"{source_hash(source)}:{options}"
+
+    def prepare(self, source: DocumentSource) -> List[ImagePayload]:
+        """
+        Preprocess an image into one or more encoded tiles.
+
+        Args:
+            source: Path to the image file, or an InMemoryDocument
+
+        Returns:
+            Encoded tiles in reading order (top to bottom)
+        """
+        key = self._cache_key(source)
+        cached = self.cache.get(key)
+        record_cache_lookup("image", cached is not None)
+        if cached is not None:
+            return cached
+
+        width, height = read_image_size(source)
+        bands = plan_tiles(width, height, self.max_tile_aspect)
+        # Largest scale any tile will be rendered at (tiles share the page width)
+        tile_w, _ = target_size(width, min(height, max(b - t for t, b in bands)), self.short_side, self.long_side)
+
+        with stage("image.preprocess", width=width, height=height, tiles=len(bands)), Image.open(readable(source)) as img:
+            # For JPEGs, decode directly at a reduced scale (much faster and smaller for large photos)
+            request = (tile_w, round(height * tile_w / width))
+            if img.size != (width, height):
+                request = request[::-1]  # EXIF-rotated: the stored image is transposed
+            img.draft("RGB", request)
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            # draft() may have reduced the decoded size; rescale band boundaries to match
+            scale_y = img.height / height
+            payloads = []
+            for i, (top, bottom) in enumerate(bands):
+                tile = img.crop((0, round(top * scale_y), img.width, round(bottom * scale_y)))
+                size = target_size(tile.width, tile.height, self.short_side, self.long_side)
+                if size != tile.size:
+                    tile = tile.resize(size, Image.LANCZOS)
+                buffer = io.BytesIO()
+                tile.save(buffer, format="JPEG", quality=self.jpeg_quality, optimize=True)
+                payloads.append(ImagePayload(
+                    data=buffer.getvalue(),
+                    media_type="image/jpeg",
+                    width=tile.width,
+                    height=tile.height,
+                    tile=i + 1,
+                    total_tiles=len(bands),
+                ))
+
+        logger.info(
+            f"Preprocessed image {width}x{height} into {len(payloads)} tile(s), "
+            f"~{sum(p.approx_tokens for p in payloads)} vision tokens "
+            f"(vs ~{estimate_image_tokens(width, height)} unprocessed), "
+            f"{sum(len(p.data) for p in payloads) / 1024:.0f} KiB"
+        )
+        self.cache.put(key, payloads)
+        return payloads
+
+
+_preprocessor: Optional[ImagePreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_image_preprocessor() -> ImagePreprocessor:
+    """
+    Get the process-wide image preprocessor (shared payload cache), creating it on first call.
+    Tile resolution comes from IMAGE_SHORT_SIDE (default 768) and IMAGE_LONG_SIDE (default 2048).
+    """
+    global _preprocessor
+    with _preprocessor_lock:
+        if _preprocessor is None:
+            _preprocessor = ImagePreprocessor(
+                short_side=int(os.getenv("IMAGE_SHORT_SIDE", "768")),
+                long_side=int(os.getenv("IMAGE_LONG_SIDE", "2048")),
+            )
+        return _preprocessor
@@ -0,0 +1,284 @@
+"""
+Telemetry for Contract Clarity Agent.
+Per-stage spans and latency/token histograms, exported to Opik over OTLP or,
+for profiling a session without a collector, to memory, a JSONL file or the console.
+
+Instrumentation uses the OpenTelemetry API throughout, so it costs nothing
+until setup_telemetry() installs providers.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import (
+    ConsoleMetricExporter,
+    InMemoryMetricReader,
+    PeriodicExportingMetricReader,
+)
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+logger = logging.getLogger(__name__)
+
+INSTRUMENTATION_NAME = "contract_clarity"
+
+tracer = trace.get_tracer(INSTRUMENTATION_NAME)
+meter = metrics.get_meter(INSTRUMENTATION_NAME)
+
+CONVERSION_DURATION = meter.create_histogram(
+    "contract_clarity.conversion.duration", unit="s", description="Document conversion time (cache misses)"
+)
+CONVERSION_PAGES_PER_SECOND = meter.create_histogram(
+    "contract_clarity.conversion.pages_per_second", unit="{page}/s", description="Docling conversion throughput"
+)
+PROMPT_TOKENS = meter.create_histogram(
+    "contract_clarity.llm.prompt_tokens", unit="{token}", description="Prompt tokens per model call"
+)
+COMPLETION_TOKENS = meter.create_histogram(
+    "contract_clarity.llm.completion_tokens", unit="{token}", description="Completion tokens per model call"
+)
+TIME_TO_FIRST_TOKEN = meter.create_histogram(
+    "contract_clarity.llm.time_to_first_token", unit="s", description="Latency until the first streamed token"
+)
+LLM_DURATION = meter.create_histogram(
+    "contract_clarity.llm.duration", unit="s", description="Total model call time"
+)
+CACHE_LOOKUPS = meter.create_counter(
+    "contract_clarity.cache.lookups", unit="{lookup}", description="Cache lookups by cache and result"
+)
+
+# Set by setup_telemetry() when TELEMETRY_EXPORTER=memory
+memory_span_exporter: Optional[InMemorySpanExporter] = None
+memory_metric_reader: Optional[InMemoryMetricReader] = None
+
+# (exporter, tracer_provider) once setup_telemetry() has run; providers can only be set once per process
+_configured: Optional[Tuple[str, TracerProvider]] = None
+
+
+# ---------------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------------
+
+def _jsonl_formatter(span) -> str:
+    return json.dumps(json.loads(span.to_json()), separators=(",", ":")) + "\n"
+
+
+def setup_telemetry(exporter: Optional[str] = None):
+    """
+    Configure OpenTelemetry tracing and metrics.
+
+    Args:
+        exporter: "otlp" (Opik / any OTLP collector), "memory" (read back with
+            session_profile()), "file" (JSONL at TELEMETRY_FILE) or "console".
+            Defaults to the TELEMETRY_EXPORTER env var, then "otlp".
+
+    Returns:
+        (tracer, tracer_provider)
+    """
+    global memory_span_exporter, memory_metric_reader, _configured
+
+    exporter = (exporter or os.getenv("TELEMETRY_EXPORTER", "otlp")).lower()
+    if _configured is not None:
+        # Every agent instance calls this; only the first call installs providers
+        return trace.get_tracer(INSTRUMENTATION_NAME), _configured[1]
+
+    # Create a resource with service name and other metadata
+    resource = Resource.create(
+        {
+            "service.name": "contract-clarity-agent",
+            "service.version": "0.1.0",
+            "deployment.environment": os.getenv("DEPLOYMENT_ENVIRONMENT", "development"),
+        }
+    )
+
+    provider = TracerProvider(resource=resource)
+    metric_readers = []
+
+    if exporter == "memory":
+        memory_span_exporter = InMemorySpanExporter()
+        memory_metric_reader = InMemoryMetricReader()
+        provider.add_span_processor(SimpleSpanProcessor(memory_span_exporter))
+        metric_readers.append(memory_metric_reader)
+    elif exporter in ("file", "console"):
+        if exporter == "file":
+            out = open(os.getenv("TELEMETRY_FILE", "telemetry.jsonl"), "a", encoding="utf-8")
+        else:
+            out = sys.stdout
+        provider.add_span_processor(
+            SimpleSpanProcessor(ConsoleSpanExporter(out=out, formatter=_jsonl_formatter))
+        )
+        metric_readers.append(PeriodicExportingMetricReader(
+            ConsoleMetricExporter(out=out, formatter=lambda m: m.to_json(indent=None) + "\n"),
+            export_interval_millis=60_000,
+        ))
+    else:
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        metric_readers.append(PeriodicExportingMetricReader(OTLPMetricExporter()))
+
+    trace.set_tracer_provider(provider)
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=metric_readers))
+
+    _configured = (exporter, provider)
+    logger.info(f"OpenTelemetry initialized with '{exporter}' exporter")
+    return trace.get_tracer(INSTRUMENTATION_NAME), provider
+
+
+# ---------------------------------------------------------------------------
+# Instrumentation helpers
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[trace.Span]:
+    """Span around one stage of the pipeline (e.g. "docling.convert", "prompt.build")."""
+    with tracer.start_as_current_span(name, attributes=_clean(attributes)) as span:
+        yield span
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache lookup ("document", "web", "image") and tag the current span."""
+    CACHE_LOOKUPS.add(1, {"cache": cache, "result": "hit" if hit else "miss"})
+    trace.get_current_span().set_attribute(f"cache.{cache}.hit", hit)
+
+
+def record_conversion(seconds: float, num_pages: Optional[int], file_type: str):
+    """Record conversion latency and throughput for a cache miss."""
+    attributes = {"file_type": file_type}
+    CONVERSION_DURATION.record(seconds, attributes)
+    if num_pages and seconds > 0:
+        CONVERSION_PAGES_PER_SECOND.record(num_pages / seconds, attributes)
+
+
+def _clean(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop None values (not valid OpenTelemetry attribute values)."""
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+class LLMCallMetrics:
+    """
+    Measures one model call: total time, time to first token and token counts.
+
+    Exact token counts are taken from the service's usage details when it
+    reports them; otherwise they are estimated from text length.
+
+    Usage:
+        with LLMCallMetrics("question", prompt_tokens_estimate) as call:
+            async for update in agent.run_stream(...):
+                call.on_update(update)
+
+    The span is started without being made current, so it is safe to hold
+    across `yield`s in async generators.
+    """
+
+    def __init__(self, kind: str, prompt_tokens_estimate: int = 0):
+        self.kind = kind
+        self.prompt_tokens_estimate = prompt_tokens_estimate
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self._completion_chars = 0
+        self._start = 0.0
+        self._first_token: Optional[float] = None
+        self.span = None
+
+    def __enter__(self) -> "LLMCallMetrics":
+        self.span = tracer.start_span("llm.call", attributes={"llm.kind": self.kind})
+        self._start = time.perf_counter()
+        return self
+
+    def on_text(self, text: Optional[str], streamed: bool = True):
+        """Note response text (time to first token is only measured for streamed text)."""
+        if text:
+            if streamed and self._first_token is None:
+                self._first_token = time.perf_counter()
+            self._completion_chars += len(text)
+
+    def on_usage(self, usage: Any):
+        """Take exact token counts from a UsageDetails object when the service reports them."""
+        if usage is None:
+            return
+        if getattr(usage, "input_token_count", None) is not None:
+            self.prompt_tokens = (self.prompt_tokens or 0) + usage.input_token_count
+        if getattr(usage, "output_token_count", None) is not None:
+            self.completion_tokens = (self.completion_tokens or 0) + usage.output_token_count
+
+    def on_update(self, update: Any):
+        """Note a streamed AgentRunResponseUpdate (text and any usage content)."""
+        self.on_text(getattr(update, "text", None))
+        for content in getattr(update, "contents", None) or []:
+            self.on_usage(getattr(content, "details", None) if getattr(content, "type", None) == "usage" else None)
+
+    def on_response(self, response: Any):
+        """Note a complete AgentRunResponse / ChatResponse."""
+        self.on_text(getattr(response, "text", None), streamed=False)
+        self.on_usage(getattr(response, "usage_details", None))
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        prompt_tokens = self.prompt_tokens if self.prompt_tokens is not None else self.prompt_tokens_estimate
+        completion_tokens = (
+            self.completion_tokens if self.completion_tokens is not None else self._completion_chars // 4
+        )
+        attributes = {"llm.kind": self.kind}
+        LLM_DURATION.record(end - self._start, attributes)
+        PROMPT_TOKENS.record(prompt_tokens, attributes)
+        COMPLETION_TOKENS.record(completion_tokens, attributes)
+
+        self.span.set_attribute("llm.prompt_tokens", prompt_tokens)
+        self.span.set_attribute("llm.completion_tokens", completion_tokens)
+        self.span.set_attribute("llm.tokens_estimated", self.prompt_tokens is None)
+        if self._first_token is not None:
+            ttft = self._first_token - self._start
+            TIME_TO_FIRST_TOKEN.record(ttft, attributes)
+            self.span.set_attribute("llm.time_to_first_token_s", ttft)
+        if exc is not None:
+            self.span.record_exception(exc)
+            self.span.set_status(trace.Status(trace.StatusCode.ERROR, str(exc)))
+        self.span.end()
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Local profiling
+# ---------------------------------------------------------------------------
+
+def session_profile() -> str:
+    """
+    Summarize spans captured by the "memory" exporter: count, total and mean
+    duration per stage, plus token and time-to-first-token figures for model calls.
+
+    Returns:
+        Plain-text table (empty string if the memory exporter is not active)
+    """
+    if memory_span_exporter is None:
+        return ""
+
+    stats: Dict[Tuple[str, str], list] = defaultdict(list)
+    for span in memory_span_exporter.get_finished_spans():
+        kind = span.attributes.get("llm.kind", "")
+        stats[(span.name, kind)].append(span)
+
+    lines = [f"{'stage':<28}{'count':>7}{'total s':>10}{'mean s':>9}{'prompt tok':>12}{'compl tok':>11}{'ttft s':>9}"]
+    for (name, kind), spans in sorted(stats.items()):
+        durations = [(s.end_time - s.start_time) / 1e9 for s in spans]
+        label = f"{name}[{kind}]" if kind else name
+        prompt = sum(s.attributes.get("llm.prompt_tokens", 0) for s in spans)
+        completion = sum(s.attributes.get("llm.completion_tokens", 0) for s in spans)
+        ttfts = [s.attributes["llm.time_to_first_token_s"] for s in spans if "llm.time_to_first_token_s" in s.attributes]
+        lines.append(
+            f"{label:<28}{len(spans):>7}{sum(durations):>10.2f}{sum(durations) / len(spans):>9.2f}"
+            f"{prompt or '':>12}{completion or '':>11}"
+            f"{(f'{sum(ttfts) / len(ttfts):.2f}' if ttfts else ''):>9}"
+        )
+    return "\n".join(lines)
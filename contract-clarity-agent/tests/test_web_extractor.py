@@ -0,0 +1,74 @@
+"""Tests for WebContentExtractor caching, de-duplication and ordering, using FakeFirecrawl."""
+
+import asyncio
+
+import pytest
+
+from src.document_processor import WebContentExtractor
+from src.fake_firecrawl import FakeFirecrawl
+
+PAGES = {
+    "https://example.com/terms": "# Terms of Service\nYou agree to everything.",
+    "https://example.com/privacy": "# Privacy Policy\nWe keep your data.",
+    "https://example.com/dpa": "# Data Processing Addendum\nProcessor obligations.",
+}
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    monkeypatch.setenv("WEB_CACHE_TTL_SECONDS", "900")
+    monkeypatch.setenv("WEB_EXTRACT_CONCURRENCY", "2")
+    return WebContentExtractor(client=FakeFirecrawl(PAGES))
+
+
+def scraped_urls(extractor):
+    return [call["url"] for call in extractor.client.calls]
+
+
+def test_repeat_extraction_is_served_from_cache(extractor):
+    first = extractor.extract_from_url("https://example.com/terms")
+    second = extractor.extract_from_url("https://example.com/terms")
+
+    assert first["success"] and first["title"] == "Terms of Service"
+    assert "cache_hit" not in first
+    assert second["cache_hit"] is True
+    assert second["text"] == first["text"]
+    assert scraped_urls(extractor) == ["https://example.com/terms"]
+
+
+def test_url_fragment_shares_cache_entry(extractor):
+    extractor.extract_from_url("https://example.com/privacy")
+    result = extractor.extract_from_url("https://example.com/privacy#retention")
+
+    assert result["cache_hit"] is True
+    assert scraped_urls(extractor) == ["https://example.com/privacy"]
+
+
+def test_failed_scrape_is_not_cached(extractor):
+    first = extractor.extract_from_url("https://example.com/missing")
+    second = extractor.extract_from_url("https://example.com/missing")
+
+    assert not first["success"] and not second["success"]
+    assert len(scraped_urls(extractor)) == 2
+
+
+def test_extract_from_urls_dedups_and_preserves_order(extractor):
+    extractor.client.latency = 0.01
+    urls = [
+        "https://example.com/dpa",
+        "https://example.com/terms",
+        "https://example.com/dpa#section-2",
+        "https://example.com/privacy",
+        "https://example.com/terms",
+    ]
+
+    results = asyncio.run(extractor.extract_from_urls(urls))
+
+    assert [result["title"] for result in results] == [
+        "Data Processing Addendum",
+        "Terms of Service",
+        "Data Processing Addendum",
+        "Privacy Policy",
+        "Terms of Service",
+    ]
+    assert sorted(scraped_urls(extractor)) == sorted(PAGES)
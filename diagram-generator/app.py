@@ -1,6 +1,9 @@
 import json
+import time
+import requests
 import streamlit as st
 from llm import LLMClient
+from json_stream import JSONFieldStream
 from prompts import *
 from utils import *
 
@@ -35,9 +38,75 @@ def cleanup():
     st.session_state['plantuml_png'] = None
 
 
+@st.cache_resource
+def get_llm_client():
+    """
+    Returns the LLM client shared by all sessions of this server process.
+
+    Requests are built per call, so concurrent sessions can safely use one client,
+    and its pooled connections stay open across reruns.
+    """
+    return LLMClient()
+
+
+def stream_diagram(messages):
+    """
+    Streams a diagram response from the LLM and stores it in the session state.
+
+    The PlantUML syntax comes first in the response, so the SVG and PNG renders are
+    started in the background as soon as it is complete, while the explanation is
+    still being written (and shown live). If a render fails, the regular display
+    code below retries it.
+
+    Args:
+        messages (list): The chat messages to send.
+    """
+    stream = JSONFieldStream()
+    status = st.empty()
+    diagram = st.empty()
+    explanation = st.empty()
+    status.info("Hold tight! Your awesome diagram is brewing... ☕✨")
+    chunks = []
+    renders = None
+    diagram_shown = False
+    last_update = 0.0
+    try:
+        for chunk in llm_client.stream_message(messages):
+            chunks.append(chunk)
+            for event, key, value in stream.feed(chunk):
+                if event == "done" and key == "plantuml_syntax":
+                    renders = submit_render(value)
+                    status.info("Rendering the diagram while the explanation is written... 🎨")
+            if renders and not diagram_shown and renders[0].done() and not renders[0].exception():
+                diagram.write(f"<img src='data:image/svg+xml;base64,{renders[0].result()[1]}'/>", unsafe_allow_html=True)
+                diagram_shown = True
+            # Throttle UI updates; every update is a websocket message to the browser
+            if time.monotonic() - last_update > 0.1 and stream.partial("explanation"):
+                explanation.markdown(stream.partial("explanation"))
+                last_update = time.monotonic()
+    except requests.RequestException as e:
+        st.error(f"The request to the model failed. Please try again.\nError: {e}")
+        return
+    finally:
+        status.empty()
+        diagram.empty()
+        explanation.empty()
+
+    if {"explanation", "plantuml_syntax"} <= stream.fields.keys():
+        st.session_state.response = json.dumps(stream.fields)
+    else:
+        st.session_state.response = "".join(chunks)
+    if renders:
+        try:
+            st.session_state.plantuml_svg = renders[0].result()
+            st.session_state.plantuml_png = renders[1].result()
+        except Exception:
+            st.session_state.plantuml_svg = st.session_state.plantuml_png = None
+
+
 # Initialize session state variables at the start
 init_session()
-llm_client = LLMClient()
+llm_client = get_llm_client()
 
 # Streamlit UI setup
 st.header("AI-Powered Diagram Generator")
@@ -66,8 +135,7 @@ if mode == "From Text":
             cleanup()
             messages = TEXT_TO_DIAGRAM.copy()
             messages.append({"role": "user", "content": text_area_value})
-            with st.spinner("Hold tight! Your awesome diagram is brewing... ☕✨"):
-                st.session_state.response = llm_client.send_message(messages)
+            stream_diagram(messages)
 
 # Handle inputs for diagram generation from sketches
 if mode == "From Sketch":
@@ -75,30 +143,26 @@ if mode == "From Sketch":
         cleanup()
     st.session_state.prev_mode = "From Sketch"
     st.markdown("### Convert Hand-Drawn Sketches to Professional Diagrams")
-    sketch_path=None
+    sketch=None
     selected_sample_sketch = st.selectbox("Select Sample Sketch", options=get_sample_sketches(), index=None)
     if selected_sample_sketch:
-        sketch_path = os.path.join("samples", selected_sample_sketch)
-        st.image(sketch_path, caption="Selected Sketch", use_container_width=True)
+        sketch = os.path.join("samples", selected_sample_sketch)
+        st.image(sketch, caption="Selected Sketch", use_container_width=True)
     else:
         uploaded_sketch = st.file_uploader("Upload sketch", type=["png", "jpg", "jpeg"])
         if uploaded_sketch:
-            sketch_path = f"tmp_{uploaded_sketch.name}"
-            with open(sketch_path, "wb") as f:
-                f.write(uploaded_sketch.getbuffer())
-            st.image(sketch_path, caption="Uploaded Sketch", use_container_width=True)
+            # Kept in memory; the preprocessed copy is what gets sent to the model
+            sketch = uploaded_sketch.getvalue()
+            st.image(sketch, caption="Uploaded Sketch", use_container_width=True)
 
     if st.button("Convert to Diagram", icon="✨", type="primary", use_container_width=True):
-        if not sketch_path:
+        if not sketch:
             st.error("Please upload a sketch or select a sample sketch.")
         else:
             cleanup()
             messages = SKETCH_TO_DIAGRAM.copy()
-            messages.append({"role": "user", "content": [{"type": "image_url", "image_url": {"url": local_image_to_data_url(sketch_path)}}]})
-            with st.spinner("Hold tight! Your awesome diagram is brewing... ☕✨"):
-                st.session_state.response = llm_client.send_message(messages)
-                if not selected_sample_sketch:
-                    os.remove(sketch_path)
+            messages.append({"role": "user", "content": [{"type": "image_url", "image_url": {"url": sketch_to_data_url(sketch)}}]})
+            stream_diagram(messages)
 
 # Process and display the response    
 try:
@@ -109,8 +173,7 @@ try:
 
         if not st.session_state.plantuml_svg or not st.session_state.plantuml_png:
             with st.spinner("Almost there! Rendering the diagram... 🎨"):
-                st.session_state.plantuml_svg = plantuml_to_base64(plantuml_syntax, "svg")
-                st.session_state.plantuml_png = plantuml_to_base64(plantuml_syntax, "png")
+                st.session_state.plantuml_svg, st.session_state.plantuml_png = render_diagram(plantuml_syntax)
         
         if st.session_state.plantuml_svg and st.session_state.plantuml_png:
             with st.container():
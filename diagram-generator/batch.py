@@ -0,0 +1,237 @@
+import os
+import re
+import json
+import hashlib
+import time
+import asyncio
+import argparse
+from dataclasses import dataclass
+from llm import LLMClient
+from prompts import TEXT_TO_DIAGRAM, SKETCH_TO_DIAGRAM
+from utils import sketch_to_data_url, submit_render
+
+TEXT_EXTENSIONS = (".txt", ".md")
+SKETCH_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+@dataclass(frozen=True)
+class BatchItem:
+    """
+    One diagram to generate.
+
+    Attributes:
+        id (str): Name of the output files (<id>.svg, <id>.png, <id>.txt).
+        description (str): Text description (for TEXT_TO_DIAGRAM), or None.
+        sketch (str): Path to a sketch image (for SKETCH_TO_DIAGRAM), or None.
+    """
+    id: str
+    description: str | None = None
+    sketch: str | None = None
+
+def _safe_id(value: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", value).strip("._") or "item"
+
+def load_items(source: str) -> list:
+    """
+    Reads the items of a batch.
+
+    Args:
+        source (str): A directory of descriptions (.txt, .md) and sketches (.png, .jpg, .jpeg),
+            or a JSONL file whose lines have an optional "id" and either "description" or
+            "sketch" (an image path, relative to the JSONL file).
+
+    Returns:
+        list: The BatchItems, with unique ids. Inputs that share an id get the name of their
+            source appended (flow.md and flow.png become flow_md and flow_png), so an item's id
+            does not change when other inputs are added or removed between runs.
+
+    Raises:
+        ValueError: If a JSONL line has neither a description nor a sketch.
+    """
+    items = []  # (item, source name used to tell apart items with the same id)
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            stem, extension = os.path.splitext(name)
+            if extension.lower() in TEXT_EXTENSIONS:
+                with open(path, encoding="utf-8") as f:
+                    items.append((BatchItem(_safe_id(stem), description=f.read()), extension[1:]))
+            elif extension.lower() in SKETCH_EXTENSIONS:
+                items.append((BatchItem(_safe_id(stem), sketch=path), extension[1:]))
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                item_id = _safe_id(str(record.get("id") or f"item-{line_number}"))
+                if record.get("description"):
+                    digest = hashlib.sha256(record["description"].encode("utf-8")).hexdigest()[:8]
+                    items.append((BatchItem(item_id, description=record["description"]), digest))
+                elif record.get("sketch"):
+                    items.append((BatchItem(item_id, sketch=os.path.join(base_dir, record["sketch"])), record["sketch"]))
+                else:
+                    raise ValueError(f"Line {line_number}: expected a 'description' or a 'sketch'")
+
+    # Two inputs may map to the same id (e.g. flow.md and flow.png); qualify both by their source,
+    # not by position, so resuming never mistakes one item's outputs for another's
+    counts = {}
+    for item, _ in items:
+        counts[item.id] = counts.get(item.id, 0) + 1
+    seen, unique = {}, []
+    for item, source_name in items:
+        item_id = item.id if counts[item.id] == 1 else _safe_id(f"{item.id}_{source_name}")
+        if item_id in seen:
+            if seen[item_id] == (item.description, item.sketch):
+                continue  # the same input listed twice
+            source = item.sketch or item.description
+            item_id = f"{item_id}_{hashlib.sha256(source.encode('utf-8')).hexdigest()[:8]}"
+        seen[item_id] = (item.description, item.sketch)
+        unique.append(item if item_id == item.id else BatchItem(item_id, item.description, item.sketch))
+    return unique
+
+class RateLimiter:
+    """
+    Spaces out requests to at most `requests_per_minute` (0 for no limit).
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def _parse_response(response: str) -> dict:
+    """Extracts the diagram JSON from a response (tolerating a ```json fence around it)."""
+    result = json.loads(response[response.find("{"):response.rfind("}") + 1])
+    if not result.get("plantuml_syntax"):
+        raise ValueError("Response has no plantuml_syntax")
+    return result
+
+def _write(path: str, data: bytes):
+    # Write to a temporary file first, so an interrupted batch never leaves a partial output behind
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(data)
+    os.replace(f"{path}.tmp", path)
+
+class BatchRunner:
+    """
+    Generates diagrams for many items: model requests run concurrently (bounded and rate limited),
+    renders run on the shared render worker pool, and every item gets <id>.svg, <id>.png,
+    <id>.puml and <id>.txt (the explanation) in the output directory.
+
+    A batch is resumable: items whose outputs all exist are skipped, and every attempt is appended
+    to <output_dir>/manifest.jsonl.
+
+    Attributes:
+        output_dir (str): Directory for the outputs.
+        concurrency (int): Maximum model requests in flight.
+        rate_limiter (RateLimiter): Limits the request rate.
+        force (bool): Regenerate items whose outputs already exist.
+        client (LLMClient): Client used for all requests.
+    Methods:
+        run(items):
+            Processes the items and returns a summary dict.
+    """
+
+    def __init__(self, output_dir: str, concurrency: int = 8, requests_per_minute: float = 60, force: bool = False, client: LLMClient | None = None):
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.force = force
+        self.client = client or LLMClient(pool_size=concurrency)
+        os.makedirs(output_dir, exist_ok=True)
+        self._manifest_path = os.path.join(output_dir, "manifest.jsonl")
+
+    def _outputs(self, item: BatchItem) -> dict:
+        return {extension: os.path.join(self.output_dir, f"{item.id}.{extension}") for extension in ("svg", "png", "puml", "txt")}
+
+    def is_done(self, item: BatchItem) -> bool:
+        return all(os.path.exists(path) for path in self._outputs(item).values())
+
+    def _record(self, entry: dict):
+        with open(self._manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    async def _messages(self, item: BatchItem) -> list:
+        if item.description is not None:
+            return TEXT_TO_DIAGRAM + [{"role": "user", "content": item.description}]
+        data_url = await asyncio.to_thread(sketch_to_data_url, item.sketch)
+        return SKETCH_TO_DIAGRAM + [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": data_url}}]}]
+
+    async def _process(self, item: BatchItem, slots: asyncio.Semaphore) -> dict:
+        start = time.perf_counter()
+        entry = {"id": item.id, "source": "text" if item.description is not None else item.sketch}
+        try:
+            async with slots:
+                messages = await self._messages(item)
+                await self.rate_limiter.acquire()
+                response = await self.client.send_message_async(messages)
+            if response is None:
+                raise RuntimeError("The model request failed")
+            result = _parse_response(response)
+            entry["generated_s"] = round(time.perf_counter() - start, 3)
+
+            # Rendering happens on the worker pool, outside the request slots
+            svg, png = await asyncio.gather(*(asyncio.wrap_future(f) for f in submit_render(result["plantuml_syntax"])))
+            outputs = self._outputs(item)
+            _write(outputs["svg"], svg[0])
+            _write(outputs["png"], png[0])
+            _write(outputs["puml"], result["plantuml_syntax"].encode("utf-8"))
+            _write(outputs["txt"], str(result.get("explanation", "")).encode("utf-8"))
+            entry["status"] = "done"
+        except Exception as e:
+            entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+        entry["total_s"] = round(time.perf_counter() - start, 3)
+        self._record(entry)
+        print(f"[{entry['status']:>6}] {item.id} ({entry['total_s']:.1f}s){' - ' + entry['error'] if 'error' in entry else ''}", flush=True)
+        return entry
+
+    async def run(self, items: list) -> dict:
+        """
+        Processes a batch.
+
+        Args:
+            items (list): The BatchItems.
+
+        Returns:
+            dict: Counts of "done", "failed" and "skipped" items, and the wall time in seconds.
+        """
+        start = time.perf_counter()
+        pending = [item for item in items if self.force or not self.is_done(item)]
+        slots = asyncio.Semaphore(self.concurrency)
+        try:
+            entries = await asyncio.gather(*(self._process(item, slots) for item in pending))
+        finally:
+            await self.client.aclose()
+        return {
+            "done": sum(entry["status"] == "done" for entry in entries),
+            "failed": sum(entry["status"] == "failed" for entry in entries),
+            "skipped": len(items) - len(pending),
+            "wall_s": round(time.perf_counter() - start, 2),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate diagrams for a directory or JSONL file of descriptions and sketches.")
+    parser.add_argument("input", help="Directory of .txt/.md descriptions and .png/.jpg sketches, or a JSONL file")
+    parser.add_argument("-o", "--output", default="diagrams", help="Output directory (default: diagrams)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="Model requests in flight")
+    parser.add_argument("--rpm", type=float, default=60, help="Maximum model requests per minute (0 for no limit)")
+    parser.add_argument("--force", action="store_true", help="Regenerate items whose outputs already exist")
+    args = parser.parse_args()
+
+    items = load_items(args.input)
+    runner = BatchRunner(args.output, args.concurrency, args.rpm, args.force)
+    summary = asyncio.run(runner.run(items))
+    print(f"{summary['done']} done, {summary['failed']} failed, {summary['skipped']} skipped in {summary['wall_s']}s")
+    raise SystemExit(1 if summary["failed"] else 0)
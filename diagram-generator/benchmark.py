@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from mock_openai_server import MockOpenAIServer
+
+def _summary(name: str, latencies, wall: float) -> str:
+    latencies = sorted(latencies)
+    p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    return (f"{name:<28} n={len(latencies):<4} mean={statistics.mean(latencies) * 1000:7.1f}ms "
+            f"p95={p95 * 1000:7.1f}ms wall={wall:6.2f}s")
+
+def _check(failures: list, ok: bool, message: str):
+    """Records a failed benchmark expectation (the command exits with status 1 if any failed)."""
+    if not ok:
+        failures.append(f"FAIL: {message}")
+
+def _use_server(base_url: str):
+    os.environ["AZURE_OPENAI_API_KEY"] = ""  # force the OpenAI-compatible route (load_dotenv does not override)
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    os.environ["OPENAI_BASE_URL"] = base_url
+
+def bench_latency(requests_count: int = 50, latency: float = 0.0, base_url: str | None = None) -> list:
+    """
+    Compare per-request latency of a new connection per call (plain requests.post)
+    against LLMClient's pooled session and its async path.
+
+    Args:
+        requests_count (int): Requests per variant.
+        latency (float): Simulated model latency of the mock server, in seconds.
+        base_url (str, optional): Benchmark an already running OpenAI-compatible server instead of the mock.
+
+    Returns:
+        list: One summary line per variant, then a "FAIL: ..." line per failed expectation
+            (every pooled request answered, over fewer connections than requests).
+    """
+    from llm import LLMClient
+
+    server = None
+    if not base_url:
+        server = MockOpenAIServer(latency=latency).start()
+        base_url = server.base_url
+    _use_server(base_url)
+
+    client = LLMClient(cache_size=0)  # measure the network path, not the response cache
+    results, failures = [], []
+    try:
+        timings = []
+        start = time.perf_counter()
+        for _ in range(requests_count):
+            t = time.perf_counter()
+            requests.post(client.endpoint, headers=client.headers, json={**client.payload, "messages": [{"role": "user", "content": "ping"}]}).json()
+            timings.append(time.perf_counter() - t)
+        results.append(_summary("new connection per call", timings, time.perf_counter() - start))
+
+        timings, answered = [], 0
+        connections = server.connections if server else 0
+        start = time.perf_counter()
+        for _ in range(requests_count):
+            t = time.perf_counter()
+            answered += client.send_message("ping") is not None
+            timings.append(time.perf_counter() - t)
+        results.append(_summary("pooled session", timings, time.perf_counter() - start))
+        _check(failures, answered == requests_count, f"pooled session answered {answered}/{requests_count} requests")
+        if server and requests_count > 1:
+            pooled = server.connections - connections
+            _check(failures, pooled < requests_count, f"pooled session opened {pooled} connections for {requests_count} requests")
+
+        async def run_async():
+            async def one():
+                t = time.perf_counter()
+                content = await client.send_message_async("ping")
+                return time.perf_counter() - t, content is not None
+            try:
+                return await asyncio.gather(*(one() for _ in range(requests_count)))
+            finally:
+                await client.aclose()
+
+        start = time.perf_counter()
+        outcomes = asyncio.run(run_async())
+        results.append(_summary("async, all concurrent", [t for t, _ in outcomes], time.perf_counter() - start))
+        answered = sum(ok for _, ok in outcomes)
+        _check(failures, answered == requests_count, f"async path answered {answered}/{requests_count} requests")
+    finally:
+        client.close()
+        if server:
+            results.append(f"server accepted {server.connections} connections for {len(server.requests)} requests")
+            server.stop()
+    return results + failures
+
+def bench_concurrency(workers: int = 32, requests_count: int = 500, latency: float = 0.01) -> list:
+    """
+    Stress one shared LLMClient from many threads and async tasks at once, and check
+    that every response belongs to its own request (no messages or parameters leak
+    between concurrent calls).
+
+    Args:
+        workers (int): Concurrent threads (and concurrent async tasks).
+        requests_count (int): Requests per mode.
+        latency (float): Simulated model latency of the mock server, in seconds.
+
+    Returns:
+        list: One summary line per mode, with the number of mismatched responses,
+            then a "FAIL: ..." line per mode with mismatched or missing responses.
+    """
+    from llm import LLMClient
+
+    results, failures = [], []
+    with MockOpenAIServer(latency=latency, echo=True) as server:
+        _use_server(server.base_url)
+        client = LLMClient(pool_size=workers, cache_size=0)
+
+        def check(i, content):
+            if content is None:
+                return False
+            reply = json.loads(content)
+            return reply["explanation"] == f"request {i}" and reply["params"]["max_tokens"] == 100 + i
+
+        def one(i):
+            t = time.perf_counter()
+            ok = check(i, client.send_message(f"request {i}", max_tokens=100 + i))
+            return time.perf_counter() - t, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(one, range(requests_count)))
+        wall = time.perf_counter() - start
+        mismatches = sum(not ok for _, ok in outcomes)
+        results.append(f"{_summary(f'{workers} threads', [t for t, _ in outcomes], wall)} "
+                       f"rps={requests_count / wall:6.0f} mismatches={mismatches}")
+        _check(failures, mismatches == 0, f"{mismatches} thread responses were missing or crossed")
+
+        async def run_async():
+            semaphore = asyncio.Semaphore(workers)
+            async def one_async(i):
+                async with semaphore:
+                    t = time.perf_counter()
+                    ok = check(i, await client.send_message_async(f"request {i}", max_tokens=100 + i))
+                    return time.perf_counter() - t, ok
+            try:
+                return await asyncio.gather(*(one_async(i) for i in range(requests_count)))
+            finally:
+                await client.aclose()
+
+        start = time.perf_counter()
+        outcomes = asyncio.run(run_async())
+        wall = time.perf_counter() - start
+        mismatches = sum(not ok for _, ok in outcomes)
+        results.append(f"{_summary(f'{workers} async tasks', [t for t, _ in outcomes], wall)} "
+                       f"rps={requests_count / wall:6.0f} mismatches={mismatches}")
+        _check(failures, mismatches == 0, f"{mismatches} async responses were missing or crossed")
+        client.close()
+    return results + failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLMClient benchmarks against a mock OpenAI-compatible server.")
+    parser.add_argument("mode", nargs="?", choices=["latency", "concurrency"], default="latency")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="Requests per variant")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated model latency (mock server only)")
+    parser.add_argument("--base-url", default=None, help="Use a running OpenAI-compatible server instead of the mock (latency mode)")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent threads / tasks (concurrency mode)")
+    args = parser.parse_args()
+
+    if args.mode == "concurrency":
+        lines = bench_concurrency(args.workers, args.requests, args.latency)
+    else:
+        lines = bench_latency(args.requests, args.latency, args.base_url)
+    for line in lines:
+        print(line)
+    raise SystemExit(1 if any(line.startswith("FAIL:") for line in lines) else 0)
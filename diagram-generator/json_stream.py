@@ -0,0 +1,138 @@
+import json
+from typing import Dict, List, Tuple
+
+class JSONFieldStream:
+    """
+    Incrementally extracts the top-level fields of a JSON object as it streams in.
+
+    String values are decoded as they arrive (escapes included, even when split
+    across chunks), so a long field can be displayed while it is still being
+    generated, and every field is reported the moment its value closes, before
+    the rest of the object has arrived. Any text before the opening brace (such
+    as a ```json fence) is ignored.
+
+    Attributes:
+        fields (dict): Fields whose values are complete, in arrival order.
+    Methods:
+        feed(chunk):
+            Consumes the next chunk of text and returns the resulting events:
+            ("delta", key, text) for each newly decoded piece of a string value, and
+            ("done", key, value) when a field's value is complete.
+        partial(key):
+            Returns the decoded text of a string field so far (complete or not).
+
+    Example:
+        >>> stream = JSONFieldStream()
+        >>> stream.feed('{"plantuml_syntax": "@startuml\\\\nA -> B\\\\n@end')
+        [('delta', 'plantuml_syntax', '@startuml\\nA -> B\\n@end')]
+        >>> stream.feed('uml", "expl')
+        [('delta', 'plantuml_syntax', 'uml'), ('done', 'plantuml_syntax', '@startuml\\nA -> B\\n@enduml')]
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, object] = {}
+        self._state = "start"
+        self._key = ""
+        self._buffer = []      # decoded text of the current key or string value
+        self._escape = ""      # escape sequence being read (e.g. "\\u00e")
+        self._high_surrogate = ""
+        self._raw = []         # raw text of a non-string value
+        self._depth = 0
+        self._raw_in_string = False
+        self._raw_escaped = False
+
+    def partial(self, key: str) -> str:
+        if key in self.fields:
+            value = self.fields[key]
+            return value if isinstance(value, str) else json.dumps(value)
+        if self._state == "string_value" and self._key == key:
+            return "".join(self._buffer)
+        return ""
+
+    def _read_escape(self, char: str) -> str:
+        """Adds a character to the pending escape sequence; returns decoded text once it is complete."""
+        self._escape += char
+        if self._escape[1] == "u" and len(self._escape) < 6:
+            return ""
+        sequence, self._escape = self._escape, ""
+        if sequence[1] == "u" and 0xD800 <= int(sequence[2:], 16) <= 0xDBFF:
+            self._high_surrogate = sequence  # wait for the low half of the pair
+            return ""
+        sequence, self._high_surrogate = self._high_surrogate + sequence, ""
+        return json.loads(f'"{sequence}"')
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, object]]:
+        events = []
+        delta = []
+        for char in chunk:
+            state = self._state
+            if state == "start":
+                if char == "{":
+                    self._state = "key_or_end"
+            elif state == "key_or_end":
+                if char == '"':
+                    self._state, self._buffer = "key", []
+                elif char == "}":
+                    self._state = "done"
+            elif state in ("key", "string_value"):
+                if self._escape:
+                    text = self._read_escape(char)
+                elif char == "\\":
+                    self._escape, text = "\\", ""
+                elif char == '"':
+                    text = None
+                else:
+                    text = char
+                if text is None:
+                    value = "".join(self._buffer)
+                    if state == "key":
+                        self._key, self._state = value, "colon"
+                    else:
+                        if delta:
+                            events.append(("delta", self._key, "".join(delta)))
+                            delta = []
+                        self.fields[self._key] = value
+                        events.append(("done", self._key, value))
+                        self._state = "key_or_end"
+                elif text:
+                    self._buffer.append(text)
+                    if state == "string_value":
+                        delta.append(text)
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value_start"
+            elif state == "value_start":
+                if char == '"':
+                    self._state, self._buffer = "string_value", []
+                elif not char.isspace():
+                    self._state, self._raw, self._depth = "raw_value", [], 0
+                    self._raw_in_string = self._raw_escaped = False
+                    self._feed_raw(char, events)
+            elif state == "raw_value":
+                self._feed_raw(char, events)
+        if delta:
+            events.append(("delta", self._key, "".join(delta)))
+        return events
+
+    def _feed_raw(self, char: str, events: list):
+        """Collects a non-string value (number, literal, array, object) until it ends at depth 0."""
+        if self._raw_in_string:
+            if self._raw_escaped:
+                self._raw_escaped = False
+            elif char == "\\":
+                self._raw_escaped = True
+            elif char == '"':
+                self._raw_in_string = False
+        elif char == '"':
+            self._raw_in_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}" and self._depth > 0:
+            self._depth -= 1
+        elif char in ",}" and self._depth == 0:
+            value = json.loads("".join(self._raw))
+            self.fields[self._key] = value
+            events.append(("done", self._key, value))
+            self._state = "done" if char == "}" else "key_or_end"
+            return
+        self._raw.append(char)
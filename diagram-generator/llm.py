@@ -1,6 +1,68 @@
 import os
+import json
+import time
+import random
+import asyncio
 import requests
+from dataclasses import dataclass
+from types import MappingProxyType
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from response_cache import ResponseCache
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+@dataclass(frozen=True)
+class ChatRequest:
+    """
+    An immutable chat completion request, built fresh for every call.
+
+    Attributes:
+        messages (tuple): The conversation messages (read-only mappings).
+        params (tuple): Sorted (name, value) pairs of model parameters.
+    Methods:
+        to_payload():
+            Returns a new JSON-serializable payload dict for the API.
+    """
+    messages: tuple
+    params: tuple
+
+    @classmethod
+    def build(cls, message, defaults, **overrides):
+        """
+        Build a request from a message and parameters, without touching shared state.
+
+        Args:
+            message (str or list): A user message string, or a list of message dictionaries.
+            defaults (Mapping): Default model parameters.
+            **overrides: Parameter overrides (only names present in `defaults` are applied).
+
+        Returns:
+            ChatRequest: The request.
+
+        Raises:
+            ValueError: If the message is not a string or a list of dictionaries.
+        """
+        if isinstance(message, str):
+            messages = ({"role": "user", "content": message},)
+        elif isinstance(message, list) and all(isinstance(item, dict) for item in message):
+            messages = tuple(message)
+        else:
+            raise ValueError("Message must be either a string or a list of dictionaries")
+        params = {**defaults, **{key: value for key, value in overrides.items() if key in defaults}}
+        return cls(
+            messages=tuple(MappingProxyType(dict(m)) for m in messages),
+            params=tuple(sorted(params.items())),
+        )
+
+    def to_payload(self):
+        return {"messages": [dict(m) for m in self.messages], **dict(self.params)}
 
 class LLMClient:
     """
@@ -11,12 +73,20 @@ class LLMClient:
         api_key (str): The API key for authentication.
         deployment_name (str): The deployment name for Azure OpenAI (if applicable).
         api_version (str): The API version for Azure OpenAI (if applicable).
-        payload (dict): The payload for the API request.
+        payload (Mapping): Default model parameters (read-only; each call builds its own ChatRequest, so one client can serve concurrent requests).
+        session (requests.Session): Connection-pooled HTTP session reused by every request.
+        timeout (tuple): (connect, read) timeouts in seconds.
+        max_retries (int): Retries on connection errors, 429 and 5xx responses.
+        backoff (float): Base delay in seconds for exponential backoff between retries.
+        embeddings_endpoint (str): The embeddings API endpoint URL (used by the semantic cache tier), or None if no embedding model is configured.
+        cache (ResponseCache): Cache of responses in front of all send methods (None if disabled).
     Methods:
-        __init__():
-            Initializes the LLM class, sets up API keys, endpoints, and headers.
+        __init__(timeout=None, max_retries=None, backoff=None, pool_size=None, cache_size=None, cache_ttl=None):
+            Initializes the LLM class, sets up API keys, endpoints, headers, the HTTP session and the response cache.
+        build_request(message, **kwargs):
+            Builds the immutable ChatRequest for a call.
         send_message(message, **kwargs):
-            Sends a message to the API and returns the response.
+            Sends a message to the API and returns the response. Safe to call from many threads at once.
             Args:
                 message (str or list): The message to send. Can be a string or a list of dictionaries.
                 **kwargs: Additional keyword arguments to override payload values.
@@ -24,9 +94,17 @@ class LLMClient:
                 str: The content of the response message.
             Raises:
                 ValueError: If the message is not a string or a list of dictionaries.
+        stream_message(message, **kwargs):
+            Sends a message and yields the response content as it is generated.
+        send_message_async(message, **kwargs):
+            Async variant of send_message (uses httpx if installed, otherwise runs send_message in a thread).
+        embed(text):
+            Returns the embedding vector of a text, or None if the request failed.
+        close() / aclose():
+            Close the pooled sync / async HTTP connections.
     """
-    
-    def __init__(self):
+
+    def __init__(self, timeout=None, max_retries=None, backoff=None, pool_size=None, cache_size=None, cache_ttl=None):
         load_dotenv()
         self.headers = {}
         self.endpoint = ""
@@ -42,10 +120,15 @@ class LLMClient:
                 "api-key": self.api_key,
             }
 
+            # Azure serves embeddings from their own deployment; without one the similarity tier is unavailable
+            embedding_deployment = os.getenv('AZURE_OPENAI_EMBEDDING_DEPLOYMENT')
+            self.embeddings_endpoint = f'{self.endpoint}/openai/deployments/{embedding_deployment}/embeddings?api-version={self.api_version}' if embedding_deployment else None
             self.endpoint = f'{self.endpoint}/openai/deployments/{self.deployment_name}/chat/completions?api-version={self.api_version}'
         elif "OPENAI_API_KEY" in os.environ and not (os.environ['OPENAI_API_KEY'] == "" or os.environ['OPENAI_API_KEY'] is None):
             self.api_key = os.getenv('OPENAI_API_KEY')
-            self.endpoint = "https://api.openai.com/v1/chat/completions"
+            base_url = os.getenv('OPENAI_BASE_URL') or "https://api.openai.com/v1"
+            self.endpoint = f"{base_url.rstrip('/')}/chat/completions"
+            self.embeddings_endpoint = f"{base_url.rstrip('/')}/embeddings"
             self.headers = {
                 'Content-Type': 'application/json',
                 "Authorization": f"Bearer {self.api_key}",
@@ -53,37 +136,219 @@ class LLMClient:
         else:
             raise ValueError("API key not found in environment variables")
 
-        self.payload = {
-            "messages": [],
+        self.payload = MappingProxyType({
             "max_tokens": 1000,
             "temperature": 0.7,
             "top_p": 0.95,
             "frequency_penalty": 0,
             "presence_penalty": 0
-        }
+        })
+
+        self.timeout = timeout or (
+            float(os.getenv('LLM_CONNECT_TIMEOUT', 10)),
+            float(os.getenv('LLM_READ_TIMEOUT', 120)),
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', 3))
+        self.backoff = backoff if backoff is not None else float(os.getenv('LLM_BACKOFF_SECONDS', 1.0))
+        self.pool_size = pool_size or int(os.getenv('LLM_POOL_SIZE', 10))
+
+        # One pooled session for all requests, so TLS handshakes are paid once per connection, not per call
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._async_client = None
+
+        # Repeated (and, with RESPONSE_CACHE_SIMILARITY, near-identical) requests are answered from memory
+        cache_size = cache_size if cache_size is not None else int(os.getenv('RESPONSE_CACHE_SIZE', 256))
+        similarity = os.getenv('RESPONSE_CACHE_SIMILARITY')
+        if similarity and cache_size > 0 and not self.embeddings_endpoint:
+            raise ValueError("RESPONSE_CACHE_SIMILARITY requires AZURE_OPENAI_EMBEDDING_DEPLOYMENT with Azure OpenAI")
+        self.cache = ResponseCache(
+            max_entries=cache_size,
+            ttl=cache_ttl or float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+            similarity=float(similarity) if similarity else None,
+            embed=self.embed if similarity else None,
+        ) if cache_size > 0 else None
+
+    def build_request(self, message, **kwargs):
+        # Override payload values with any provided keyword arguments (per call; defaults are never mutated)
+        return ChatRequest.build(message, self.payload, **kwargs)
+
+    def _retry_delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retry number `attempt` (0-based).
+        Honors a numeric Retry-After header; otherwise exponential backoff with jitter.
+        """
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+    def _post(self, payload, stream=False, endpoint=None):
+        """
+        POST a payload (to the chat completions endpoint by default), retrying connection errors, 429 and 5xx responses.
+        Returns the successful response; raises requests.RequestException otherwise.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(endpoint or self.endpoint, json=payload, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                response.close()
+                time.sleep(self._retry_delay(attempt, response.headers.get("Retry-After")))
+                continue
+            response.raise_for_status()
+            return response
 
     def send_message(self, message, **kwargs):
-        if isinstance(message, str):
-            self.payload["messages"] = [{"role": "user", "content": message}]
-        elif isinstance(message, list) and all(isinstance(item, dict) for item in message):
-            self.payload["messages"] = message
-        else:
-            raise ValueError("Message must be either a string or a list of dictionaries")
+        request = self.build_request(message, **kwargs)
+        if self.cache and (cached := self.cache.get(request)) is not None:
+            return cached
+        try:
+            content = self._post(request.to_payload()).json()["choices"][0]["message"]["content"]
+        except (requests.RequestException, ValueError, KeyError, IndexError, TypeError):
+            return None
+        if self.cache:
+            self.cache.put(request, content)
+        return content
+
+    def stream_message(self, message, **kwargs):
+        """
+        Sends a message and yields the response content as it is generated (server-sent events).
+        Retries (as in send_message) only happen before the first chunk arrives.
+
+        Args:
+            message (str or list): The message to send. Can be a string or a list of dictionaries.
+            **kwargs: Additional keyword arguments to override payload values.
+
+        Yields:
+            str: The next piece of the response message.
+
+        Raises:
+            requests.RequestException: If the request fails.
+        """
+        request = self.build_request(message, **kwargs)
+        if self.cache and (cached := self.cache.get(request)) is not None:
+            yield cached
+            return
+        payload = request.to_payload()
+        payload["stream"] = True
+        chunks = []
+        # Only a stream that ended with [DONE] or a finish_reason is complete; a dropped connection is not cached
+        done = False
+        with self._post(payload, stream=True) as response:
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    done = True
+                    break
+                # Azure sends an initial chunk with no choices (content filter results)
+                for choice in json.loads(data).get("choices", []):
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        chunks.append(content)
+                        yield content
+                    if choice.get("finish_reason"):
+                        done = True
+        if self.cache and done:
+            self.cache.put(request, "".join(chunks))
+
+    def embed(self, text):
+        """
+        Returns the embedding vector of a text (AZURE_OPENAI_EMBEDDING_DEPLOYMENT or OPENAI_EMBEDDING_MODEL).
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            list: The embedding vector, or None if the request failed.
 
-        # Override payload values with any provided keyword arguments
-        for key, value in kwargs.items():
-            if key in self.payload:
-                self.payload[key] = value
-        
+        Raises:
+            ValueError: If no embedding model is configured (AZURE_OPENAI_EMBEDDING_DEPLOYMENT with Azure OpenAI).
+        """
+        if not self.embeddings_endpoint:
+            raise ValueError("No embedding model configured: set AZURE_OPENAI_EMBEDDING_DEPLOYMENT")
+        payload = {"input": text, "model": os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-3-small')}
         try:
-            response = requests.post(
-                self.endpoint,
+            return self._post(payload, endpoint=self.embeddings_endpoint).json()["data"][0]["embedding"]
+        except (requests.RequestException, ValueError, KeyError, IndexError, TypeError):
+            return None
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            connect_timeout, read_timeout = self.timeout
+            self._async_client = httpx.AsyncClient(
                 headers=self.headers,
-                json=self.payload
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
             )
-            response.raise_for_status()
-            response = response.json()
-        except requests.RequestException:
-            return None
-        return response["choices"][0]["message"]["content"]
-        
\ No newline at end of file
+        return self._async_client
+
+    async def _cache_call(self, method, *args):
+        """Runs a cache method, off the event loop when the semantic tier may make a blocking embeddings call."""
+        if self.cache.similarity:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def send_message_async(self, message, **kwargs):
+        """
+        Async variant of send_message, with the same retry policy.
+
+        The httpx connection pool is bound to the event loop of the first call;
+        use one LLMClient per event loop (or call aclose() before switching loops).
+
+        Args:
+            message (str or list): The message to send. Can be a string or a list of dictionaries.
+            **kwargs: Additional keyword arguments to override payload values.
+
+        Returns:
+            str: The content of the response message, or None if the request failed.
+        """
+        if httpx is None:
+            return await asyncio.to_thread(self.send_message, message, **kwargs)
+
+        request = self.build_request(message, **kwargs)
+        if self.cache and (cached := await self._cache_call(self.cache.get, request)) is not None:
+            return cached
+        payload = request.to_payload()
+        client = self._get_async_client()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await client.post(self.endpoint, json=payload)
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    retry_after = response.headers.get("Retry-After")
+                else:
+                    response.raise_for_status()
+                    content = response.json()["choices"][0]["message"]["content"]
+                    if self.cache:
+                        await self._cache_call(self.cache.put, request, content)
+                    return content
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    return None
+            except (httpx.HTTPError, ValueError, KeyError, IndexError, TypeError):
+                # Error statuses and malformed bodies (invalid JSON, no choices) fail like send_message
+                return None
+            await asyncio.sleep(self._retry_delay(attempt, retry_after))
+        return None
+
+    def close(self):
+        """Close the pooled connections of the sync session."""
+        self.session.close()
+
+    async def aclose(self):
+        """Close the pooled connections of the async client."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
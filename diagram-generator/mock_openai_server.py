@@ -0,0 +1,237 @@
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONTENT = json.dumps({
+    "plantuml_syntax": "@startuml\nAlice -> Bob: Hello\nBob --> Alice: Hi!\n@enduml",
+    "explanation": "Alice sends a greeting to Bob, who replies with an acknowledgement.",
+})
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # room for many concurrent benchmark clients
+
+class MockOpenAIServer:
+    """
+    A local OpenAI-compatible chat completions server for tests and latency benchmarks.
+
+    Serves both the OpenAI route (`/v1/chat/completions`) and the Azure OpenAI route
+    (`/openai/deployments/<name>/chat/completions`) over HTTP/1.1 with keep-alive, so
+    connection reuse by the client can be observed. `/embeddings` returns bag-of-words
+    vectors, so texts sharing most words are similar.
+
+    Attributes:
+        latency (float): Seconds to wait before answering each request (before the first chunk when streaming).
+        chunk_delay (float): Seconds between streamed chunks (requests with "stream": true get server-sent events).
+        chunk_size (int): Characters of content per streamed chunk.
+        fail_first (int): Number of initial requests answered with `fail_status` (to exercise retries).
+        fail_status (int): Status code for injected failures (e.g. 429 or 503).
+        content (str): Message content returned in every completion.
+        echo (bool): Instead of `content`, answer with a diagram JSON whose explanation is the last
+            user message and whose "params" echo the request's model parameters (to detect cross-talk).
+        requests (list): JSON payloads of all received requests.
+        connections (int): Number of TCP connections accepted so far.
+    Methods:
+        start():
+            Starts serving on a background thread and returns the server.
+        serve_forever():
+            Serves on the current thread (used when run as a script).
+        stop():
+            Stops the server.
+        base_url:
+            URL to use as OPENAI_BASE_URL (e.g. http://127.0.0.1:8765/v1).
+
+    Example:
+        >>> with MockOpenAIServer(latency=0.2) as server:
+        ...     os.environ["OPENAI_API_KEY"] = "mock"
+        ...     os.environ["OPENAI_BASE_URL"] = server.base_url
+        ...     LLMClient().send_message("hello")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 fail_first: int = 0, fail_status: int = 429, content: str = DEFAULT_CONTENT, echo: bool = False,
+                 chunk_delay: float = 0.0, chunk_size: int = 8):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.content = content
+        self.echo = echo
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _next_request(self, payload):
+        """Record a request and decide whether it should fail. Returns the status code to send."""
+        with self._lock:
+            self.requests.append(payload)
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return self.fail_status
+        return 200
+
+    def reply_content(self, payload) -> str:
+        """Message content for a request payload."""
+        if not self.echo:
+            return self.content
+        user_messages = [m for m in payload.get("messages", []) if m.get("role") == "user"]
+        return json.dumps({
+            "explanation": user_messages[-1]["content"] if user_messages else "",
+            "plantuml_syntax": json.loads(DEFAULT_CONTENT)["plantuml_syntax"],
+            "params": {key: value for key, value in payload.items() if key != "messages"},
+        })
+
+    def completion(self, payload) -> dict:
+        """Build a chat.completion response body for a request payload."""
+        content = self.reply_content(payload)
+        prompt_chars = sum(len(json.dumps(m.get("content", ""))) for m in payload.get("messages", []))
+        return {
+            "id": f"chatcmpl-mock-{len(self.requests)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "mock-gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (prompt_chars + len(content)) // 4,
+            },
+        }
+
+    def completion_chunks(self, payload):
+        """Yield chat.completion.chunk bodies for a streamed request."""
+        content = self.reply_content(payload)
+        base = {"id": f"chatcmpl-mock-{len(self.requests)}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": payload.get("model", "mock-gpt-4o")}
+        yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}
+        for i in range(0, len(content), self.chunk_size):
+            yield {**base, "choices": [{"index": 0, "delta": {"content": content[i:i + self.chunk_size]}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+    @staticmethod
+    def embedding(text: str, dimensions: int = 64) -> list:
+        """A deterministic bag-of-words vector of a text."""
+        vector = [0.0] * dimensions
+        for word in text.lower().split():
+            vector[zlib.crc32(word.strip(".,!?").encode("utf-8")) % dimensions] += 1.0
+        return vector
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # headers and body are separate writes; avoid delayed-ACK stalls on keep-alive
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_event_stream(self, payload):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                events = [f"data: {json.dumps(chunk)}\n\n" for chunk in server.completion_chunks(payload)]
+                for i, event in enumerate(events + ["data: [DONE]\n\n"]):
+                    if i and server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                    data = event.encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def do_POST(self):
+                path = self.path.split("?")[0]
+                if path.endswith("/embeddings"):
+                    length = int(self.headers.get("Content-Length", 0))
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    self._send_json(200, {"object": "list", "data": [{"object": "embedding", "index": 0, "embedding": server.embedding(payload.get("input", ""))}]})
+                    return
+                if not path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown route {path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                status = server._next_request(payload)
+                if status != 200:
+                    self._send_json(status, {"error": {"message": "Injected failure"}}, {"Retry-After": "0"})
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                if payload.get("stream"):
+                    self._send_event_stream(payload)
+                else:
+                    self._send_json(200, server.completion(payload))
+
+        return Handler
+
+    def serve_forever(self):
+        """Serve on the current thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--fail-first", type=int, default=0, help="Answer the first N requests with --fail-status")
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--echo", action="store_true", help="Echo the last user message as the explanation")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, args.latency, args.fail_first, args.fail_status,
+                              echo=args.echo, chunk_delay=args.chunk_delay)
+    print(f"Mock OpenAI server listening on {server.base_url} (set OPENAI_BASE_URL to this and OPENAI_API_KEY to any value)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -26,10 +26,10 @@ Given a simple query or description, write accurate PlantUML syntax to render a
 - Use notes, or highlights where necessary
 
 # Output
-The output must be a JSON object containing the following fields:
-- "explanation": "<Detailed explanation of the scenario illustrated by the diagram>"
+The output must be a JSON object containing the following fields, in this order:
 - "plantuml_syntax": "<Valid PlantUML syntax representing the diagram>"
     - Note: Do **NOT** add any ``` or code blocks around the syntax
+- "explanation": "<Detailed explanation of the scenario illustrated by the diagram>"
 """
     },
     {
@@ -38,7 +38,7 @@ The output must be a JSON object containing the following fields:
     },
     {
         "role": "assistant",
-        "content": "{\n\"explanation\": \"To illustrate the working of UPI (Unified Payments Interface) payments, we need to consider the following key components and their interactions:\\n\\n- User: The person initiating the transaction.\\n- UPI App: The application (like Google Pay, PhonePe, etc.) used by the user to make the payment.\\n- Bank A: The bank associated with the sender's account.\\n- Bank B: The bank associated with the receiver's account.\\n- NPCI: The National Payments Corporation of India which acts as the intermediary to facilitate the transaction.\\n- Receiver: The person or entity receiving the payment.\\n\\nThe process starts with the User initiating a payment request via the UPI App and concludes with the Receiver being notified of the payment. The diagram illustrates the sequence of interactions that occur during this process.\",\n\"plantuml_syntax\": \"@startuml\\nactor User  \\nparticipant \\\"UPI App\\\" as UPIApp  \\nparticipant \\\"Bank A\\\" as BankA  \\nparticipant NPCI  \\nparticipant \\\"Bank B\\\" as BankB  \\nactor Receiver  \\n  \\nUser -> UPIApp: Initiate Payment Request  \\nUPIApp -> BankA: Send Payment Request  \\nBankA -> NPCI: Forward Request for Validation  \\nNPCI -> BankB: Validate and Forward Request  \\nBankB -> NPCI: Process Payment and Send Response  \\nNPCI -> BankA: Send Response  \\nBankA -> UPIApp: Send Confirmation  \\nUPIApp -> User: Notify Transaction Status  \\nNPCI -> Receiver: Notify Payment  \\n@enduml\"\n}"
+        "content": "{\n\"plantuml_syntax\": \"@startuml\\nactor User  \\nparticipant \\\"UPI App\\\" as UPIApp  \\nparticipant \\\"Bank A\\\" as BankA  \\nparticipant NPCI  \\nparticipant \\\"Bank B\\\" as BankB  \\nactor Receiver  \\n  \\nUser -> UPIApp: Initiate Payment Request  \\nUPIApp -> BankA: Send Payment Request  \\nBankA -> NPCI: Forward Request for Validation  \\nNPCI -> BankB: Validate and Forward Request  \\nBankB -> NPCI: Process Payment and Send Response  \\nNPCI -> BankA: Send Response  \\nBankA -> UPIApp: Send Confirmation  \\nUPIApp -> User: Notify Transaction Status  \\nNPCI -> Receiver: Notify Payment  \\n@enduml\",\n\"explanation\": \"To illustrate the working of UPI (Unified Payments Interface) payments, we need to consider the following key components and their interactions:\\n\\n- User: The person initiating the transaction.\\n- UPI App: The application (like Google Pay, PhonePe, etc.) used by the user to make the payment.\\n- Bank A: The bank associated with the sender's account.\\n- Bank B: The bank associated with the receiver's account.\\n- NPCI: The National Payments Corporation of India which acts as the intermediary to facilitate the transaction.\\n- Receiver: The person or entity receiving the payment.\\n\\nThe process starts with the User initiating a payment request via the UPI App and concludes with the Receiver being notified of the payment. The diagram illustrates the sequence of interactions that occur during this process.\"\n}"
     }
 ]
 
@@ -63,10 +63,10 @@ Given a hand-drawn sketch or diagram, convert it into valid PlantUML syntax to r
 - Use notes or highlights where necessary.
 
 # Output
-The output must be a JSON object containing the following fields:
-- "explanation": "<Detailed explanation of the scenario illustrated by the diagram>"
+The output must be a JSON object containing the following fields, in this order:
 - "plantuml_syntax": "<Valid PlantUML syntax representing the diagram>"
     - Note: Do **NOT** add any ``` or code blocks around the syntax
+- "explanation": "<Detailed explanation of the scenario illustrated by the diagram>"
 """
     },
     {
@@ -82,7 +82,7 @@ The output must be a JSON object containing the following fields:
     },
     {
         "role": "assistant",
-        "content": "{ \"explanation\": \"This sequence diagram depicts a game system interaction where an Observer initiates and plays a game. The flow starts with initialization of the number of players, followed by game play. The diagram includes a loop that continues while there is no winner, during which the system returns information about dice totals, player positions, and squares. This appears to be a board game implementation where players move based on dice rolls until someone wins.\",\n\"plantuml_syntax\": \"@startuml\\nskinparam sequenceMessageAlign center\\nparticipant Observer\\nparticipant System\\nObserver -> System: initialize(numOfPlayers)\\nObserver -> System: playGame\\nloop [no winner]\\nSystem --> Observer: dice total, player, square\\nend\\n@enduml\" }"
+        "content": "{ \"plantuml_syntax\": \"@startuml\\nskinparam sequenceMessageAlign center\\nparticipant Observer\\nparticipant System\\nObserver -> System: initialize(numOfPlayers)\\nObserver -> System: playGame\\nloop [no winner]\\nSystem --> Observer: dice total, player, square\\nend\\n@enduml\",\n\"explanation\": \"This sequence diagram depicts a game system interaction where an Observer initiates and plays a game. The flow starts with initialization of the number of players, followed by game play. The diagram includes a loop that continues while there is no winner, during which the system returns information about dice totals, player positions, and squares. This appears to be a board game implementation where players move based on dice rolls until someone wins.\" }"
     }
 ]
 
@@ -0,0 +1,296 @@
+import os
+import time
+import queue
+import base64
+import select
+import shutil
+import string
+import threading
+import subprocess
+import zlib
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from plantweb.render import render as plantweb_render
+except ImportError:
+    plantweb_render = None
+
+# PlantUML's URL-safe base64 alphabet (same bit layout as standard base64)
+_PLANTUML_ALPHABET = str.maketrans(
+    string.ascii_uppercase + string.ascii_lowercase + string.digits + "+/",
+    string.digits + string.ascii_uppercase + string.ascii_lowercase + "-_",
+)
+
+def encode_plantuml(plantuml_syntax: str) -> str:
+    """
+    Encodes PlantUML syntax for a PlantUML server URL (raw deflate + PlantUML's base64 alphabet).
+
+    Args:
+        plantuml_syntax (str): The PlantUML syntax to encode.
+
+    Returns:
+        str: The encoded diagram, as used in `<server>/svg/<encoded>`.
+    """
+    compressed = zlib.compress(plantuml_syntax.encode("utf-8"), 9)[2:-4]
+    return base64.b64encode(compressed).decode("ascii").rstrip("=").translate(_PLANTUML_ALPHABET)
+
+def _ensure_delimited(plantuml_syntax: str) -> str:
+    """Wraps diagram text in @startuml/@enduml where missing (pipe mode splits diagrams on them)."""
+    text = plantuml_syntax.strip()
+    if not text.startswith("@start"):
+        text = f"@startuml\n{text}"
+    if "\n@end" not in text:
+        text = f"{text}\n@enduml"
+    return text + "\n"
+
+class PlantwebRenderer:
+    """
+    Renders diagrams on the public PlantUML server through plantweb (a network round trip per diagram).
+    """
+    name = "plantweb"
+
+    def __init__(self):
+        if plantweb_render is None:
+            raise RuntimeError("plantweb is not installed")
+
+    def render(self, plantuml_syntax: str, format: str) -> bytes:
+        return plantweb_render(plantuml_syntax, engine='plantuml', format=format)[0]
+
+    def close(self):
+        pass
+
+class ServerRenderer:
+    """
+    Renders diagrams with a PlantUML HTTP server, such as a local picoweb server
+    (`java -jar plantuml.jar -picoweb:8080`) or a self-hosted plantuml-server.
+
+    Attributes:
+        server_url (str): Base URL of the server (e.g. http://127.0.0.1:8080/plantuml).
+        session (requests.Session): Keep-alive session reused by every render.
+        timeout (float): Seconds to wait for a render.
+    """
+    name = "server"
+
+    def __init__(self, server_url: str, timeout: float = 30.0, pool_size: int = 8):
+        self.server_url = server_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def render(self, plantuml_syntax: str, format: str) -> bytes:
+        response = self.session.get(f"{self.server_url}/{format}/{encode_plantuml(plantuml_syntax)}", timeout=self.timeout)
+        # Syntax errors come back as an error image with status 400; show it like a diagram
+        if response.status_code != 400:
+            response.raise_for_status()
+        return response.content
+
+    def close(self):
+        self.session.close()
+
+class _PipeProcess:
+    """One long-lived `plantuml.jar -pipe` process rendering a single format."""
+
+    def __init__(self, command: list, delimiter: bytes):
+        self.delimiter = delimiter
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._buffer = b""
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def render(self, plantuml_syntax: str, timeout: float) -> bytes:
+        self.process.stdin.write(_ensure_delimited(plantuml_syntax).encode("utf-8"))
+        self.process.stdin.flush()
+        fd = self.process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while self.delimiter not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TimeoutError(f"PlantUML did not answer within {timeout}s")
+            data = os.read(fd, 65536)
+            if not data:
+                raise RuntimeError("PlantUML process exited")
+            self._buffer += data
+        image, _, rest = self._buffer.partition(self.delimiter)
+        self._buffer = rest.lstrip(b"\r\n")
+        return image.rstrip(b"\r\n") if image.lstrip().startswith(b"<") else image
+
+    def close(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+
+class JarRenderer:
+    """
+    Renders diagrams with local, long-lived `java -jar plantuml.jar -pipe` processes fed through stdin,
+    so each diagram costs only the render itself (no JVM start-up, no network).
+
+    Each process renders one format; up to `processes` processes per format run in parallel,
+    so throughput scales with local CPU cores. A process that fails is discarded, and the next
+    render that needs one starts its replacement. POSIX only (replies are read with select()).
+
+    Attributes:
+        jar_path (str): Path to plantuml.jar.
+        java (str): Java executable.
+        processes (int): Maximum processes per format.
+        timeout (float): Seconds to wait for a render before the process is restarted.
+    """
+    name = "jar"
+    delimiter = b"___PLANTUML_DIAGRAM_END___"
+
+    def __init__(self, jar_path: str, java: str = "java", processes: int = 2, timeout: float = 30.0):
+        if os.name != "posix":
+            raise RuntimeError("The jar backend needs a POSIX system (select() on pipes); use the server backend")
+        if not os.path.isfile(jar_path):
+            raise FileNotFoundError(f"PlantUML jar not found: {jar_path}")
+        if not shutil.which(java):
+            raise FileNotFoundError(f"Java executable not found: {java}")
+        self.jar_path = jar_path
+        self.java = java
+        self.processes = processes
+        self.timeout = timeout
+        self._idle = {}
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _command(self, format: str) -> list:
+        return [self.java, "-Djava.awt.headless=true", "-jar", self.jar_path, "-pipe", f"-t{format}",
+                "-charset", "UTF-8", "-pipedelimitor", self.delimiter.decode()]
+
+    def _reserve(self, format: str) -> bool:
+        """Counts a new process against the per-format limit (False if the limit is reached)."""
+        with self._lock:
+            if self._started.get(format, 0) >= self.processes:
+                return False
+            self._started[format] = self._started.get(format, 0) + 1
+            return True
+
+    def _free_slot(self, format: str):
+        with self._lock:
+            self._started[format] = max(0, self._started.get(format, 0) - 1)
+            idle = self._idle.setdefault(format, queue.LifoQueue())
+        # None wakes one waiting render, which starts a process in the freed slot
+        idle.put(None)
+
+    def _spawn(self, format: str) -> _PipeProcess:
+        try:
+            return _PipeProcess(self._command(format), self.delimiter)
+        except Exception:
+            self._free_slot(format)
+            raise
+
+    def _acquire(self, format: str) -> _PipeProcess:
+        with self._lock:
+            idle = self._idle.setdefault(format, queue.LifoQueue())
+        while True:
+            try:
+                process = idle.get_nowait()
+            except queue.Empty:
+                if self._reserve(format):
+                    return self._spawn(format)
+                process = idle.get()
+            if process is not None:
+                return process
+            if self._reserve(format):
+                return self._spawn(format)
+
+    def _release(self, format: str, process: _PipeProcess, healthy: bool):
+        if healthy and process.alive:
+            self._idle[format].put(process)
+            return
+        # Drop the broken process; its replacement is started by the next render (not here,
+        # so a failing start-up cannot mask the render error)
+        try:
+            process.close()
+        finally:
+            self._free_slot(format)
+
+    def render(self, plantuml_syntax: str, format: str) -> bytes:
+        process = self._acquire(format)
+        healthy = False
+        try:
+            image = process.render(plantuml_syntax, self.timeout)
+            healthy = True
+            return image
+        finally:
+            self._release(format, process, healthy)
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    process = idle.get_nowait()
+                    if process is not None:
+                        process.close()
+            self._idle, self._started = {}, {}
+
+class FallbackRenderer:
+    """
+    Renders with a primary backend and retries failed renders on a fallback backend.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def render(self, plantuml_syntax: str, format: str) -> bytes:
+        try:
+            return self.primary.render(plantuml_syntax, format)
+        except Exception:
+            return self.fallback.render(plantuml_syntax, format)
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+def create_renderer():
+    """
+    Creates the render backend selected by the environment.
+
+    PLANTUML_BACKEND is one of:
+        - "jar": local `plantuml.jar -pipe` processes (PLANTUML_JAR, default ./plantuml.jar; JAVA_BIN; PLANTUML_PROCESSES)
+        - "server": a PlantUML HTTP server such as local picoweb (PLANTUML_SERVER_URL)
+        - "plantweb": the public PlantUML server via plantweb
+        - "auto" (default): "jar" if the jar and Java are available (POSIX only), else "server" if PLANTUML_SERVER_URL is set, else "plantweb"
+    With a local backend, failed renders are retried on the public server only if PLANTUML_REMOTE_FALLBACK is true.
+
+    Returns:
+        The renderer, with render(plantuml_syntax, format) -> bytes and close().
+
+    Raises:
+        ValueError: If PLANTUML_BACKEND is unknown or a required setting is missing.
+    """
+    backend = os.getenv("PLANTUML_BACKEND", "auto").lower()
+    jar_path = os.getenv("PLANTUML_JAR") or "plantuml.jar"
+    java = os.getenv("JAVA_BIN") or "java"
+    server_url = os.getenv("PLANTUML_SERVER_URL")
+    timeout = float(os.getenv("PLANTUML_TIMEOUT", 30))
+
+    if backend == "auto":
+        if os.name == "posix" and os.path.isfile(jar_path) and shutil.which(java):
+            backend = "jar"
+        elif server_url:
+            backend = "server"
+        else:
+            backend = "plantweb"
+
+    if backend == "jar":
+        processes = int(os.getenv("PLANTUML_PROCESSES") or max(1, (os.cpu_count() or 2) // 2))
+        renderer = JarRenderer(jar_path, java, processes, timeout)
+    elif backend == "server":
+        if not server_url:
+            raise ValueError("PLANTUML_SERVER_URL must be set for the 'server' backend")
+        renderer = ServerRenderer(server_url, timeout)
+    elif backend == "plantweb":
+        return PlantwebRenderer()
+    else:
+        raise ValueError(f"Unknown PLANTUML_BACKEND: {backend}")
+
+    if os.getenv("PLANTUML_REMOTE_FALLBACK", "false").lower() in ("1", "true", "yes"):
+        return FallbackRenderer(renderer, PlantwebRenderer())
+    return renderer
@@ -0,0 +1,135 @@
+import re
+import json
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def _normalize_content(content):
+    """Collapses whitespace in text so trivially different prompts share a cache entry."""
+    if isinstance(content, str):
+        return re.sub(r"\s+", " ", content).strip()
+    if isinstance(content, list):
+        return [_normalize_content(part) for part in content]
+    if isinstance(content, dict):
+        return {key: _normalize_content(value) for key, value in content.items()}
+    return content
+
+def _hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _cosine(a, b) -> float:
+    if np is not None:
+        a, b = np.asarray(a), np.asarray(b)
+        return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b) or 1.0))
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+class ResponseCache:
+    """
+    A cache of LLM responses with TTL and LRU eviction, keyed by the normalized messages and model parameters.
+
+    With an `embed` function and a `similarity` threshold, a request that misses the exact key is also
+    matched against cached requests with the same context (all messages but the last, and the same
+    parameters) whose last user message is semantically similar (cosine similarity of embeddings).
+
+    Attributes:
+        max_entries (int): Maximum number of cached responses.
+        ttl (float): Seconds a response stays valid.
+        similarity (float): Cosine similarity threshold of the semantic tier (None disables it).
+        embed (callable): Function returning the embedding vector of a text, or None on failure.
+        hits (int): Exact-key hits so far.
+        similar_hits (int): Semantic-tier hits so far.
+        misses (int): Misses so far.
+    Methods:
+        get(request):
+            Returns the cached response content for a ChatRequest, or None.
+        put(request, content):
+            Caches the response content of a ChatRequest.
+        clear():
+            Drops all entries.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, similarity: float | None = None, embed=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity if embed else None
+        self.embed = embed
+        self.hits = self.similar_hits = self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, content, context_key, vector)
+        self._embeddings = OrderedDict()  # text -> vector, so a miss is not embedded twice
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(request):
+        """Returns the exact key, the context key and the text of the last user message (if semantic matching applies)."""
+        messages = [_normalize_content(dict(m)) for m in request.messages]
+        params = dict(request.params)
+        key = _hash({"messages": messages, "params": params})
+        last = messages[-1] if messages else {}
+        if last.get("role") == "user" and isinstance(last.get("content"), str):
+            return key, _hash({"messages": messages[:-1], "params": params}), last["content"]
+        return key, None, None
+
+    def _vector(self, text: str):
+        with self._lock:
+            if text in self._embeddings:
+                return self._embeddings[text]
+        vector = self.embed(text)
+        if vector is not None:
+            with self._lock:
+                self._embeddings[text] = vector
+                while len(self._embeddings) > self.max_entries:
+                    self._embeddings.popitem(last=False)
+        return vector
+
+    def get(self, request):
+        key, context_key, text = self._keys(request)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if e[2] is not None and e[2] == context_key and e[3] is not None and e[0] > now]
+        if self.similarity and text and candidates:
+            vector = self._vector(text)
+            if vector is not None:
+                score, best = max(((_cosine(vector, e[3]), k) for k, e in candidates), key=lambda c: c[0])
+                if score >= self.similarity:
+                    with self._lock:
+                        entry = self._entries.get(best)
+                        if entry:
+                            self._entries.move_to_end(best)
+                            self.similar_hits += 1
+                            return entry[1]
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, request, content: str):
+        if content is None:
+            return
+        key, context_key, text = self._keys(request)
+        vector = self._vector(text) if self.similarity and text else None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, content, context_key, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._embeddings.clear()
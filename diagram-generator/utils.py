@@ -1,9 +1,138 @@
+import io
 import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from mimetypes import guess_type
-from typing import Dict, List
-from plantweb.render import render
+from typing import Dict, List, Tuple
+from render_backends import create_renderer
 import os
 
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+class RenderCache:
+    """
+    A content-addressed cache of rendered diagrams: an in-memory LRU, optionally backed by a directory on disk.
+
+    Keys are SHA-256 hashes of the output format and the PlantUML syntax, so identical diagrams
+    (sample texts, reruns, other sessions) are rendered once. Disk reads refresh a file's mtime,
+    and writes evict the least recently used files until the directory fits in `max_bytes`.
+
+    Attributes:
+        max_entries (int): Maximum number of diagrams kept in memory.
+        directory (str): Directory of the disk tier, or None for memory only.
+        max_bytes (int): Maximum total size of the disk tier.
+    Methods:
+        key(plantuml_syntax, format):
+            Returns the cache key of a diagram.
+        get(key):
+            Returns the cached diagram bytes, or None.
+        put(key, data):
+            Stores diagram bytes in memory (and on disk, if enabled).
+    """
+
+    def __init__(self, max_entries: int = 128, directory: str | None = None, max_bytes: int = 200 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(plantuml_syntax: str, format: str) -> str:
+        return hashlib.sha256(f"{format}\n{plantuml_syntax}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if self.directory:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key))  # mark as recently used
+            except OSError:
+                return None
+            self._remember(key, data)
+            return data
+        return None
+
+    def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        if self.directory:
+            # Write to a temporary file first, so readers never see a partial diagram
+            tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                return
+            with self._lock:
+                self._evict()
+
+    def _evict(self):
+        """Removes the least recently used files until the disk tier fits in max_bytes."""
+        files, total = [], 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+render_cache = RenderCache(
+    max_entries=int(os.getenv("RENDER_CACHE_SIZE", 128)),
+    directory=os.getenv("RENDER_CACHE_DIR") or None,
+    max_bytes=int(float(os.getenv("RENDER_CACHE_MAX_MB", 200)) * 1024 * 1024),
+)
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+def get_renderer():
+    """
+    Returns the PlantUML render backend of this process, created from the environment on first use
+    (see render_backends.create_renderer).
+    """
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = create_renderer()
+        return _renderer
+
+# Shared by submit_render() and render_diagram(), so SVG and PNG are rendered at the same time
+_render_pool = ThreadPoolExecutor(max_workers=int(os.getenv("RENDER_WORKERS", 4)))
+
 def local_image_to_data_url(image_path: str):
     """
     Converts a local image file to a data URL.
@@ -29,6 +158,94 @@ def local_image_to_data_url(image_path: str):
 
     return f"data:{mime_type};base64,{base64_encoded_data}"
 
+# Vision models scale images to fit 2048x2048 and then to a 768px short side before tiling;
+# anything larger is uploaded only to be thrown away
+SKETCH_MAX_SIDE = int(os.getenv("SKETCH_MAX_SIDE", 2048))
+SKETCH_SHORT_SIDE = int(os.getenv("SKETCH_SHORT_SIDE", 768))
+
+_sketch_cache = OrderedDict()
+_sketch_cache_size = int(os.getenv("SKETCH_CACHE_SIZE", 32))
+_sketch_cache_lock = threading.Lock()
+
+def preprocess_sketch(image_bytes: bytes, max_side: int = SKETCH_MAX_SIDE, short_side: int = SKETCH_SHORT_SIDE) -> Tuple[bytes, str]:
+    """
+    Prepares a photo or scan of a sketch for the vision model: fixes the EXIF orientation, converts it to
+    grayscale with normalized contrast, shrinks it to the model's tile budget and recompresses it
+    (PNG or JPEG, whichever is smaller).
+
+    Args:
+        image_bytes (bytes): The original image file content.
+        max_side (int, optional): Maximum length of the longer side, in pixels.
+        short_side (int, optional): Maximum length of the shorter side, in pixels.
+
+    Returns:
+        tuple: The encoded image bytes and their MIME type.
+
+    Raises:
+        RuntimeError: If Pillow is not installed.
+        PIL.UnidentifiedImageError: If the bytes are not a supported image.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+    with Image.open(io.BytesIO(image_bytes)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            # Flatten transparent backgrounds onto white paper instead of black
+            background = Image.new("RGBA", image.size, "white")
+            background.alpha_composite(image.convert("RGBA"))
+            image = background
+        image = ImageOps.autocontrast(image.convert("L"), cutoff=1)
+
+        scale = min(1.0, max_side / max(image.size), short_side / min(image.size))
+        if scale < 1.0:
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+
+        png, jpeg = io.BytesIO(), io.BytesIO()
+        image.save(png, format="PNG", optimize=True)
+        image.save(jpeg, format="JPEG", quality=85, optimize=True)
+    if jpeg.tell() < png.tell():
+        return jpeg.getvalue(), "image/jpeg"
+    return png.getvalue(), "image/png"
+
+def sketch_to_data_url(image: str | bytes) -> str:
+    """
+    Converts a sketch (file path or file content) to a compact data URL for the vision model.
+
+    The image is preprocessed with preprocess_sketch and the result is cached by the SHA-256 of the
+    original bytes, so repeated conversions of the same sketch are not re-encoded. Without Pillow, or
+    for images Pillow cannot read, the original bytes are sent as they are.
+
+    Args:
+        image (str or bytes): Path to the sketch, or its file content.
+
+    Returns:
+        str: The data URL representing the (preprocessed) sketch.
+    """
+    if isinstance(image, str):
+        with open(image, "rb") as image_file:
+            image_bytes = image_file.read()
+    else:
+        image_bytes = bytes(image)
+
+    key = hashlib.sha256(image_bytes + f"|{SKETCH_MAX_SIDE}x{SKETCH_SHORT_SIDE}".encode()).hexdigest()
+    with _sketch_cache_lock:
+        if key in _sketch_cache:
+            _sketch_cache.move_to_end(key)
+            return _sketch_cache[key]
+
+    try:
+        data, mime_type = preprocess_sketch(image_bytes)
+    except Exception:
+        data = image_bytes
+        mime_type = (guess_type(image)[0] if isinstance(image, str) else None) or "image/png"
+    data_url = f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+    with _sketch_cache_lock:
+        _sketch_cache[key] = data_url
+        while len(_sketch_cache) > _sketch_cache_size:
+            _sketch_cache.popitem(last=False)
+    return data_url
+
 def plantuml_to_base64(plantuml_syntax: str, format: str = 'svg') -> str:
     """
     Converts PlantUML syntax to a base64 encoded string.
@@ -45,8 +262,40 @@ def plantuml_to_base64(plantuml_syntax: str, format: str = 'svg') -> str:
     """
     if format not in ['svg', 'png']:
         raise ValueError("Format must be 'svg' or 'png'")
-    diagram = render(plantuml_syntax, engine='plantuml', format=format)
-    return (diagram[0], base64.b64encode(diagram[0]).decode('utf-8'))
+    key = render_cache.key(plantuml_syntax, format)
+    data = render_cache.get(key)
+    if data is None:
+        data = get_renderer().render(plantuml_syntax, format)
+        render_cache.put(key, data)
+    return (data, base64.b64encode(data).decode('utf-8'))
+
+def submit_render(plantuml_syntax: str) -> Tuple[Future, Future]:
+    """
+    Starts rendering PlantUML syntax as SVG and PNG concurrently in the background.
+
+    Args:
+        plantuml_syntax (str): The PlantUML syntax to be converted.
+
+    Returns:
+        tuple: Futures of the SVG and PNG results of plantuml_to_base64.
+    """
+    return (
+        _render_pool.submit(plantuml_to_base64, plantuml_syntax, "svg"),
+        _render_pool.submit(plantuml_to_base64, plantuml_syntax, "png"),
+    )
+
+def render_diagram(plantuml_syntax: str) -> Tuple[tuple, tuple]:
+    """
+    Renders PlantUML syntax as SVG and PNG concurrently (each served from the render cache when possible).
+
+    Args:
+        plantuml_syntax (str): The PlantUML syntax to be converted.
+
+    Returns:
+        tuple: The SVG and PNG results of plantuml_to_base64.
+    """
+    svg, png = submit_render(plantuml_syntax)
+    return svg.result(), png.result()
 
 def get_sample_sketches(sketch_name: str|None = None) -> List[str] | bytes:
     """
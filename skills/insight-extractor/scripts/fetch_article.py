@@ -3,10 +3,13 @@
 Web Article Extraction Pipeline
 
 Fetches an article URL and extracts clean body text using trafilatura
-(best-in-class) with a BeautifulSoup fallback. Saves to raw/articles/.
+(best-in-class) with lxml and BeautifulSoup fallbacks. The HTML is parsed
+once per extractor; pages larger than --max-html-mb (default 5) stop
+downloading at that size and are truncated before parsing. Saves to raw/articles/.
 
 Usage:
     python scripts/fetch_article.py "https://example.com/some-article"
+    python scripts/fetch_article.py --max-html-mb 2 "https://example.com/huge-page"
 
 Output files (relative to workspace root):
     raw/articles/<slug>.md    Extracted article content in markdown
@@ -22,48 +25,83 @@ Exit codes:
 
 Requirements (at least one):
     pip install trafilatura       # Best: handles most sites, extracts metadata
+    pip install lxml              # Fallback: fast C parser (installed with trafilatura)
     pip install beautifulsoup4    # Fallback: basic HTML parsing
 """
 
 import re
 import sys
 import urllib.parse
-import urllib.request
 from pathlib import Path
 
+# Ensure utils/ is importable regardless of cwd
+sys.path.insert(0, str(Path(__file__).parent / "utils"))
+from http_client import get_client  # noqa: E402
+
 
 # ---------------------------------------------------------------------------
 # Fetch raw HTML
 # ---------------------------------------------------------------------------
 
-def fetch_html(url: str) -> tuple:
-    """Fetch HTML. Returns (html_str, final_url_after_redirects)."""
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        ),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-    }
-    req = urllib.request.Request(url, headers=headers)
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        html = resp.read().decode("utf-8", errors="replace")
-        final_url = resp.url
-    return html, final_url
+def fetch_html(url: str, max_bytes: int = 0) -> tuple:
+    """
+    Fetch HTML. Returns (html_str, final_url_after_redirects).
+
+    Goes through the shared HTTP client: keep-alive connections per host,
+    compressed transfer, per-host rate limiting, and conditional revalidation
+    against raw/.http-cache/ so unchanged pages aren't re-downloaded.
+    With `max_bytes`, the download stops after that many bytes.
+    """
+    resp = get_client().get(url, max_bytes=max_bytes or None)
+    resp.raise_for_status()
+    if resp.from_cache:
+        print("[Article] Not modified since last fetch — using cached copy", file=sys.stderr)
+    if resp.truncated:
+        print(f"[Article] Page exceeds {max_bytes / 1048576:.1f} MB — download stopped there", file=sys.stderr)
+    return resp.text, resp.url
 
 
 # ---------------------------------------------------------------------------
 # Extraction strategies
 # ---------------------------------------------------------------------------
 
+# Pages beyond this are truncated before parsing so one pathological page
+# can't stall a batch (override with --max-html-mb).
+MAX_HTML_BYTES = 5 * 1024 * 1024
+
+NOISE_TAGS = ["nav", "header", "footer", "aside", "script", "style",
+              "noscript", "iframe", "form", "button"]
+
+BODY_CLASS_RE = re.compile(r"article|post|content|entry", re.I)
+
+
+def limit_html(html: str, max_bytes: int = MAX_HTML_BYTES) -> str:
+    """Truncate oversized HTML (by characters, ~bytes for ASCII markup)."""
+    if max_bytes and len(html) > max_bytes:
+        print(f"[Article] HTML is {len(html) / 1048576:.1f} MB — truncating to "
+              f"{max_bytes / 1048576:.1f} MB before parsing", file=sys.stderr)
+        return html[:max_bytes]
+    return html
+
+
 def extract_with_trafilatura(html: str, url: str) -> dict:
-    """Primary: trafilatura — best article extractor, handles most sites."""
+    """
+    Primary: trafilatura — best article extractor, handles most sites.
+
+    The HTML is parsed into a single lxml tree which is reused for both
+    metadata and body extraction (trafilatura copies the tree before
+    pruning it, so metadata is read first from the pristine tree).
+    """
     import trafilatura
+    from trafilatura.utils import load_html
+
+    tree = load_html(html)
+    if tree is None:
+        return {"text": "", "title": "", "author": "", "date": ""}
 
+    meta = trafilatura.extract_metadata(tree, default_url=url)
     text = trafilatura.extract(
-        html,
+        tree,
         url=url,
         include_comments=False,
         include_tables=True,
@@ -71,7 +109,6 @@ def extract_with_trafilatura(html: str, url: str) -> dict:
         favor_precision=True,
         output_format="txt",
     )
-    meta = trafilatura.extract_metadata(html, default_url=url)
     return {
         "text": text or "",
         "title": (meta.title if meta and meta.title else ""),
@@ -80,41 +117,130 @@ def extract_with_trafilatura(html: str, url: str) -> dict:
     }
 
 
+def _clean_lines(text: str) -> str:
+    lines = [l.strip() for l in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(l for l in lines if l))
+
+
+def _pick_title(doc_title: str, headings) -> str:
+    title = doc_title
+    for candidate in headings:
+        if 5 < len(candidate) < 200:
+            return candidate
+    return title
+
+
+def extract_with_lxml(html: str, url: str) -> dict:
+    """Fallback: lxml.html — C parser, noise tags stripped in a single pass."""
+    import lxml.html
+    from lxml import etree
+
+    # Parse bytes: lxml rejects str input that starts with <?xml ... encoding=...?>.
+    # The explicit parser encoding overrides that declaration (the text is already decoded).
+    parser = lxml.html.HTMLParser(encoding="utf-8")
+    doc = lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+    etree.strip_elements(doc, *NOISE_TAGS, etree.Comment, with_tail=False)
+
+    doc_title = (doc.findtext(".//title") or "").strip()
+    headings = [h.text_content().strip() for h in doc.xpath("//h1 | //h2")[:3]]
+    title = _pick_title(doc_title, headings)
+
+    # Article body — try semantic elements first
+    body = None
+    for node in doc.iter("article"):
+        body = node
+        break
+    if body is None:
+        for node in doc.iter(etree.Element):
+            if BODY_CLASS_RE.search(node.get("class") or ""):
+                body = node
+                break
+    if body is None:
+        body = next(doc.iter("main"), None)
+    if body is None:
+        body = doc.find("body")
+    if body is None:
+        body = doc
+
+    # Break block-level elements onto separate lines, like get_text("\n")
+    for el in body.iter("p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "pre", "blockquote"):
+        el.tail = "\n" + (el.tail or "")
+    return {"text": _clean_lines(body.text_content()), "title": title, "author": "", "date": ""}
+
+
 def extract_with_beautifulsoup(html: str, url: str) -> dict:
-    """Fallback: BeautifulSoup-based extraction."""
+    """Fallback: BeautifulSoup-based extraction (lxml parser when available)."""
     from bs4 import BeautifulSoup
 
-    soup = BeautifulSoup(html, "html.parser")
+    try:
+        soup = BeautifulSoup(html, "lxml")
+    except Exception:
+        soup = BeautifulSoup(html, "html.parser")
 
-    # Remove noise
-    for tag in soup(["nav", "header", "footer", "aside", "script", "style",
-                     "noscript", "iframe", "form", "button"]):
+    # Remove noise (single tree walk collects every noise tag)
+    for tag in soup.find_all(NOISE_TAGS):
         tag.decompose()
 
     # Title
-    title = ""
-    if soup.title:
-        title = soup.title.get_text().strip()
-    for h in soup.find_all(["h1", "h2"], limit=3):
-        candidate = h.get_text().strip()
-        if 5 < len(candidate) < 200:
-            title = candidate
-            break
+    title = _pick_title(
+        soup.title.get_text().strip() if soup.title else "",
+        [h.get_text().strip() for h in soup.find_all(["h1", "h2"], limit=3)],
+    )
 
     # Article body — try semantic elements first
     body = (
         soup.find("article")
-        or soup.find(class_=re.compile(r"article|post|content|entry", re.I))
+        or soup.find(class_=BODY_CLASS_RE)
         or soup.find("main")
         or soup.body
     )
     text = body.get_text(separator="\n") if body else soup.get_text(separator="\n")
 
-    # Clean whitespace
-    lines = [l.strip() for l in text.splitlines()]
-    text = re.sub(r"\n{3,}", "\n\n", "\n".join(l for l in lines if l))
+    return {"text": _clean_lines(text), "title": title, "author": "", "date": ""}
 
-    return {"text": text, "title": title, "author": "", "date": ""}
+
+def extract_article(html: str, url: str, max_html_bytes: int = MAX_HTML_BYTES):
+    """
+    Extraction engine: size-guard the HTML, then try trafilatura, then the
+    lxml fallback, then BeautifulSoup. Returns the data dict, or None if no
+    extractor is installed.
+    """
+    html = limit_html(html, max_html_bytes)
+    data = None
+    try:
+        from lxml.etree import ParserError as LxmlParserError
+    except ImportError:
+        LxmlParserError = ValueError
+
+    # Try trafilatura (best)
+    try:
+        import trafilatura  # noqa: F401
+        print("[Article] Extracting with trafilatura...", file=sys.stderr)
+        data = extract_with_trafilatura(html, url)
+    except ImportError:
+        print("[Article] trafilatura not installed, trying fallbacks...", file=sys.stderr)
+
+    if data and len(data.get("text", "")) >= 300:
+        return data
+
+    # Fallbacks: lxml directly, then BeautifulSoup
+    for name, extractor in (("lxml", extract_with_lxml), ("BeautifulSoup", extract_with_beautifulsoup)):
+        try:
+            print(f"[Article] Trying {name} fallback...", file=sys.stderr)
+            fallback = extractor(html, url)
+        except ImportError:
+            continue
+        except (ValueError, LxmlParserError) as e:
+            # e.g. an empty or whitespace-only body; let the next extractor try
+            print(f"[Article] {name} could not parse the page: {e}", file=sys.stderr)
+            continue
+        # Keep trafilatura's metadata if the fallback has none
+        if data:
+            for key in ("title", "author", "date"):
+                fallback[key] = fallback[key] or data.get(key, "")
+        return fallback
+
+    return data
 
 
 # ---------------------------------------------------------------------------
@@ -155,18 +281,27 @@ def format_markdown(data: dict, url: str) -> str:
 # ---------------------------------------------------------------------------
 
 def main() -> None:
-    if len(sys.argv) < 2:
-        print("Usage: fetch_article.py <url>", file=sys.stderr)
+    args = sys.argv[1:]
+    max_html_bytes = MAX_HTML_BYTES
+
+    if "--max-html-mb" in args:
+        idx = args.index("--max-html-mb")
+        if idx + 1 < len(args):
+            max_html_bytes = int(float(args[idx + 1]) * 1024 * 1024)
+            args = [a for i, a in enumerate(args) if i not in (idx, idx + 1)]
+
+    if not args:
+        print("Usage: fetch_article.py [--max-html-mb N] <url>", file=sys.stderr)
         sys.exit(1)
 
-    url = sys.argv[1]
+    url = args[0]
     out_dir = Path("raw/articles")
     out_dir.mkdir(parents=True, exist_ok=True)
 
     # --- Step 1: Fetch HTML ---
     print(f"[Article] Fetching {url} ...", file=sys.stderr)
     try:
-        html, final_url = fetch_html(url)
+        html, final_url = fetch_html(url, max_html_bytes)
     except Exception as e:
         print(f"[Article] HTTP fetch failed: {e}", file=sys.stderr)
         print()
@@ -174,23 +309,7 @@ def main() -> None:
         sys.exit(1)
 
     # --- Step 2: Extract content ---
-    data = None
-
-    # Try trafilatura (best)
-    try:
-        import trafilatura  # noqa: F401
-        print("[Article] Extracting with trafilatura...", file=sys.stderr)
-        data = extract_with_trafilatura(html, final_url)
-    except ImportError:
-        print("[Article] trafilatura not installed, trying BeautifulSoup...", file=sys.stderr)
-
-    # Fallback: BeautifulSoup
-    if not data or len(data.get("text", "")) < 300:
-        try:
-            print("[Article] Trying BeautifulSoup fallback...", file=sys.stderr)
-            data = extract_with_beautifulsoup(html, final_url)
-        except ImportError:
-            pass
+    data = extract_article(html, final_url, max_html_bytes)
 
     if not data or len(data.get("text", "")) < 200:
         print("[Article] Insufficient content — page may be JS-rendered or paywalled.", file=sys.stderr)
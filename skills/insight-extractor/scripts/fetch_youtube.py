@@ -8,10 +8,15 @@ WebVTT karaoke format to clean text, and saves both to raw/transcripts/.
 Usage:
     python scripts/fetch_youtube.py "https://www.youtube.com/watch?v=XXXX"
     python scripts/fetch_youtube.py "https://youtu.be/XXXX"
+    python scripts/fetch_youtube.py --window 600 "https://youtu.be/XXXX"
+    python scripts/fetch_youtube.py --max-tokens 4000 "https://youtu.be/XXXX"
 
 Output files (created relative to cwd = workspace root):
-    raw/transcripts/<videoID>.vtt   Raw WebVTT from the API
-    raw/transcripts/<videoID>.txt   Clean plain-text transcript (with title header)
+    raw/transcripts/<videoID>.vtt             Raw WebVTT from the API
+    raw/transcripts/<videoID>.txt             Clean plain-text transcript (with title header)
+    raw/transcripts/<videoID>.segments.jsonl  Timestamped segments {"start","end","text"} (ms)
+    raw/transcripts/<videoID>.chunks.jsonl    Time/token-windowed chunks (only with
+                                              --window SECONDS and/or --max-tokens N)
 
 Stdout: one-line summary per field (Title, Video ID, Language, Words, files)
         → used by the LLM to know the title (for insight file naming) and file paths.
@@ -21,6 +26,7 @@ Exit codes:
     1  unrecoverable error (bad URL, no captions, network failure)
 """
 
+import collections
 import json
 import re
 import sys
@@ -30,7 +36,7 @@ from pathlib import Path
 
 # Ensure utils/ is importable regardless of cwd
 sys.path.insert(0, str(Path(__file__).parent / "utils"))
-from parse_vtt import parse_vtt  # noqa: E402
+from parse_vtt import _iter_lines, _pop_option, iter_segments, window_segments, write_jsonl  # noqa: E402
 
 OEMBED_URL = "https://www.youtube.com/oembed"
 CAPTIONS_API = "https://website-tools-dot-maestro-218920.uk.r.appspot.com/getYoutubeCaptions"
@@ -75,16 +81,38 @@ def slugify(text: str) -> str:
     return re.sub(r"-+", "-", text).strip("-")[:80]
 
 
+def record_segments(segments, seg_file, txt_file, counts: dict):
+    """
+    Pass segments through while writing each one to the segments JSONL and
+    the plain transcript, so neither the segments nor the text are held in
+    memory. Tallies "segments" and "words" in `counts`.
+    """
+    for seg in segments:
+        write_jsonl((seg,), seg_file)
+        if counts["segments"]:
+            txt_file.write(" ")
+        txt_file.write(seg["text"])
+        counts["segments"] += 1
+        counts["words"] += len(seg["text"].split())
+        yield seg
+
+
 # ---------------------------------------------------------------------------
 # Main pipeline
 # ---------------------------------------------------------------------------
 
 def main() -> None:
-    if len(sys.argv) < 2:
-        print("Usage: fetch_youtube.py <youtube_url>", file=sys.stderr)
+    args = sys.argv[1:]
+    window = _pop_option(args, "--window")
+    max_tokens = _pop_option(args, "--max-tokens")
+    window = float(window) if window else None
+    max_tokens = int(max_tokens) if max_tokens else None
+
+    if not args:
+        print("Usage: fetch_youtube.py [--window SECONDS] [--max-tokens N] <youtube_url>", file=sys.stderr)
         sys.exit(1)
 
-    video_url = sys.argv[1]
+    video_url = args[0]
     out_dir = Path("raw/transcripts")
     out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -118,26 +146,41 @@ def main() -> None:
     vtt_path.write_text(vtt_text, encoding="utf-8")
     print(f"[YouTube] Saved raw VTT → {vtt_path}", file=sys.stderr)
 
-    # --- Step 4: Parse VTT to clean transcript ---
+    # --- Step 4: Parse VTT in one streaming pass to segments, transcript and chunks ---
     print("[YouTube] Parsing VTT...", file=sys.stderr)
-    clean_text = parse_vtt(vtt_text)
-
-    if not clean_text.strip():
-        print("[YouTube] Warning: VTT parsed to empty text. Check the raw VTT file.", file=sys.stderr)
-
-    # --- Step 5: Save clean transcript (with title header) ---
+    seg_path = out_dir / f"{video_id}.segments.jsonl"
     txt_path = out_dir / f"{video_id}.txt"
-    txt_path.write_text(f"TITLE: {title}\n\n{clean_text}", encoding="utf-8")
+    chunks_path = out_dir / f"{video_id}.chunks.jsonl" if (window or max_tokens) else None
+    chunk_count = 0
+    counts = {"segments": 0, "words": 0}
+
+    with open(seg_path, "w", encoding="utf-8") as seg_file, open(txt_path, "w", encoding="utf-8") as txt_file:
+        txt_file.write(f"TITLE: {title}\n\n")
+        segments = record_segments(iter_segments(_iter_lines(vtt_text)), seg_file, txt_file, counts)
+        if chunks_path:
+            with open(chunks_path, "w", encoding="utf-8") as f:
+                chunk_count = write_jsonl(window_segments(segments, window, max_tokens), f)
+        else:
+            collections.deque(segments, maxlen=0)  # drain: segments are written as they pass
+
+    print(f"[YouTube] Saved timestamped segments → {seg_path}", file=sys.stderr)
+    if chunks_path:
+        print(f"[YouTube] Saved {chunk_count} chunks → {chunks_path}", file=sys.stderr)
+    if not counts["words"]:
+        print("[YouTube] Warning: VTT parsed to empty text. Check the raw VTT file.", file=sys.stderr)
     print(f"[YouTube] Saved clean transcript → {txt_path}", file=sys.stderr)
 
     # --- Summary (stdout — read by the LLM) ---
-    word_count = len(clean_text.split())
+    word_count = counts["words"]
     print(f"Title:       {title}")
     print(f"Video ID:    {video_id}")
     print(f"Language:    {language}")
     print(f"Words:       ~{word_count:,}")
     print(f"VTT file:    {vtt_path}")
     print(f"Transcript:  {txt_path}")
+    print(f"Segments:    {seg_path}")
+    if chunks_path:
+        print(f"Chunks:      {chunks_path} ({chunk_count})")
 
 
 if __name__ == "__main__":
@@ -9,9 +9,15 @@ Usage:
     python scripts/process_pdf.py paper.pdf
     python scripts/process_pdf.py https://arxiv.org/pdf/2301.00001
     python scripts/process_pdf.py --pages 1-30 https://arxiv.org/pdf/2301.00001
+    python scripts/process_pdf.py --sha256 <hex digest> https://example.com/paper.pdf
 
     For ArXiv: use the /pdf/ URL form, not /abs/.
 
+    Downloads are streamed to raw/pdfs/<slug>.pdf.part in chunks and renamed
+    on completion. Re-running after an interrupted download resumes from the
+    partial file with an HTTP Range request (when the server supports it),
+    guarded by If-Range so a changed remote file is downloaded from scratch.
+
 Output files (relative to workspace root):
     raw/pdfs/<slug>.pdf    Downloaded PDF (only created for remote URLs)
     raw/pdfs/<slug>.txt    Extracted plain text
@@ -28,10 +34,15 @@ Requirements (at least one):
     pip install pdfplumber   # Fallback: good table extraction
 """
 
+import hashlib
+import http.client
 import re
 import sys
+import time
+import urllib.error
 import urllib.request
 from pathlib import Path
+from typing import Callable, Optional
 
 # Ensure utils/ is importable regardless of cwd
 sys.path.insert(0, str(Path(__file__).parent / "utils"))
@@ -42,14 +53,173 @@ from extract_pdf import extract_pdf_text  # noqa: E402
 # Download helper
 # ---------------------------------------------------------------------------
 
-def download_pdf(url: str, dest: Path) -> None:
-    """Download PDF from URL to dest. Raises on failure."""
+CHUNK_SIZE = 256 * 1024
+MAX_RETRIES = 3
+
+
+class ChecksumMismatch(Exception):
+    """Raised when a downloaded file does not match the expected SHA-256."""
+
+
+def _hash_file(path: Path, digest) -> None:
+    """Feed an existing file into `digest` chunk by chunk."""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+
+def _print_progress(done: int, total: Optional[int]) -> None:
+    """Default progress callback: single updating line on stderr."""
+    if total:
+        print(f"\r[PDF] {done / 1048576:.1f} / {total / 1048576:.1f} MB ({done * 100 // total}%)",
+              end="", file=sys.stderr)
+    else:
+        print(f"\r[PDF] {done / 1048576:.1f} MB", end="", file=sys.stderr)
+
+
+def _validator_path(part: Path) -> Path:
+    """File next to `part` holding the ETag / Last-Modified it was downloaded under."""
+    return part.with_name(part.name + ".validator")
+
+
+def _response_validator(headers) -> Optional[str]:
+    """Strong ETag if present, else Last-Modified (If-Range does not accept weak ETags)."""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _discard_partial(part: Path) -> None:
+    part.unlink(missing_ok=True)
+    _validator_path(part).unlink(missing_ok=True)
+
+
+def _download_once(url: str, part: Path, digest, progress: Callable[[int, Optional[int]], None]):
+    """
+    Stream `url` into `part`, resuming from its current size when possible.
+    `digest` must already contain the hash of any existing bytes in `part`.
+    Returns the digest covering the whole of `part`.
+
+    A resume sends the validator saved with the partial file as `If-Range`,
+    so a server whose copy has changed answers 200 with the whole new file
+    instead of splicing new bytes onto the old prefix. A partial file with
+    no saved validator cannot be checked and is downloaded again.
+    """
+    validator_file = _validator_path(part)
+    validator = validator_file.read_text().strip() if validator_file.exists() else None
+    if part.exists() and not validator:
+        _discard_partial(part)
+    offset = part.stat().st_size if part.exists() else 0
+
     headers = {"User-Agent": "Mozilla/5.0 (compatible; InsightExtractor/1.0)"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
     req = urllib.request.Request(url, headers=headers)
+
+    try:
+        resp = urllib.request.urlopen(req, timeout=60)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and offset:
+            # Range not satisfiable: complete only if the server's size matches ours
+            total = (e.headers.get("Content-Range") or "").rpartition("/")[2]
+            if total.isdigit() and int(total) == offset:
+                return digest
+            print("[PDF] Partial file does not match the remote file; restarting", file=sys.stderr)
+            _discard_partial(part)
+            return _download_once(url, part, hashlib.sha256(), progress)
+        raise
+
+    with resp:
+        length = resp.headers.get("Content-Length")
+        length = int(length) if length and length.isdigit() else None
+        remote_validator = _response_validator(resp.headers)
+
+        if offset and resp.status == 206 and remote_validator not in (None, validator):
+            # The server ignored If-Range: this range belongs to a different file
+            print("[PDF] Remote file changed; restarting", file=sys.stderr)
+            resp.close()
+            _discard_partial(part)
+            return _download_once(url, part, hashlib.sha256(), progress)
+
+        if offset and resp.status == 206:
+            mode, done = "ab", offset
+            total = offset + length if length is not None else None
+            print(f"[PDF] Resuming at {offset:,} bytes", file=sys.stderr)
+        else:
+            if offset:
+                print("[PDF] Remote file changed or Range unsupported; restarting", file=sys.stderr)
+            # Fresh download, a changed remote file (If-Range failed), or the server ignored the Range header
+            digest = hashlib.sha256()
+            mode, done, total = "wb", 0, length
+            if remote_validator:
+                validator_file.write_text(remote_validator)
+            else:
+                validator_file.unlink(missing_ok=True)
+
+        with open(part, mode) as f:
+            while True:
+                chunk = resp.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                digest.update(chunk)
+                done += len(chunk)
+                progress(done, total)
+
+    if total is not None and done < total:
+        raise http.client.IncompleteRead(b"", total - done)
+    return digest
+
+
+def download_pdf(
+    url: str,
+    dest: Path,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    sha256: Optional[str] = None,
+    retries: int = MAX_RETRIES,
+) -> None:
+    """
+    Download PDF from URL to dest. Raises on failure.
+
+    The body is streamed in CHUNK_SIZE pieces to `<dest>.part` (never held
+    in memory), hashed on the fly, and renamed to `dest` once complete.
+    Transient network failures are retried, resuming from the partial file
+    via HTTP Range. If `sha256` is given the result must match it.
+
+    `progress(bytes_done, total_or_None)` is called after every chunk.
+    """
+    progress = progress or _print_progress
+    part = dest.with_name(dest.name + ".part")
+
     print(f"[PDF] Downloading {url} ...", file=sys.stderr)
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        dest.write_bytes(resp.read())
-    print(f"[PDF] Saved PDF → {dest}", file=sys.stderr)
+    for attempt in range(1, retries + 1):
+        # Re-hash whatever an earlier (possibly interrupted) attempt left on disk
+        digest = hashlib.sha256()
+        if part.exists():
+            _hash_file(part, digest)
+        try:
+            digest = _download_once(url, part, digest, progress)
+            break
+        except (urllib.error.URLError, http.client.HTTPException, ConnectionError, TimeoutError) as e:
+            if isinstance(e, urllib.error.HTTPError) and e.code < 500:
+                raise
+            if attempt == retries:
+                raise
+            print(f"\n[PDF] Download interrupted ({e}); retrying ({attempt}/{retries - 1})...",
+                  file=sys.stderr)
+            time.sleep(2 ** attempt)
+    print(file=sys.stderr)
+
+    actual = digest.hexdigest()
+    if sha256 and actual.lower() != sha256.lower():
+        _discard_partial(part)
+        raise ChecksumMismatch(f"SHA-256 mismatch: expected {sha256}, got {actual}")
+
+    part.replace(dest)
+    _validator_path(part).unlink(missing_ok=True)
+    print(f"[PDF] Saved PDF → {dest} (sha256 {actual[:12]}…)", file=sys.stderr)
 
 
 # ---------------------------------------------------------------------------
@@ -90,6 +260,7 @@ def parse_page_range(arg: str) -> int:
 def main() -> None:
     args = sys.argv[1:]
     max_pages = None
+    sha256 = None
 
     if "--pages" in args:
         idx = args.index("--pages")
@@ -97,8 +268,14 @@ def main() -> None:
             max_pages = parse_page_range(args[idx + 1])
             args = [a for i, a in enumerate(args) if i not in (idx, idx + 1)]
 
+    if "--sha256" in args:
+        idx = args.index("--sha256")
+        if idx + 1 < len(args):
+            sha256 = args[idx + 1]
+            args = [a for i, a in enumerate(args) if i not in (idx, idx + 1)]
+
     if not args:
-        print("Usage: process_pdf.py [--pages N-M] <local_path_or_url>", file=sys.stderr)
+        print("Usage: process_pdf.py [--pages N-M] [--sha256 HEX] <local_path_or_url>", file=sys.stderr)
         sys.exit(1)
 
     source = args[0]
@@ -112,9 +289,10 @@ def main() -> None:
         slug = slug_from_url(source)
         pdf_path = out_dir / f"{slug}.pdf"
         try:
-            download_pdf(source, pdf_path)
+            download_pdf(source, pdf_path, sha256=sha256)
         except Exception as e:
             print(f"[PDF] Download failed: {e}", file=sys.stderr)
+            print("[PDF] Re-run the same command to resume the partial download.", file=sys.stderr)
             print(f"[PDF] Try manually: curl -L -o {pdf_path} \"{source}\"", file=sys.stderr)
             sys.exit(1)
     else:
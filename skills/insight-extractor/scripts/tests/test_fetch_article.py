@@ -0,0 +1,30 @@
+"""Regression tests for fetch_article's lxml fallback."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import fetch_article  # noqa: E402
+
+pytest.importorskip("lxml")
+
+
+def test_lxml_accepts_xml_declaration():
+    html = '<?xml version="1.0" encoding="utf-8"?><html><body><p>short page</p></body></html>'
+    data = fetch_article.extract_with_lxml(html, "https://example.com/post")
+    assert data["text"] == "short page"
+
+
+@pytest.mark.parametrize("html", [
+    '<?xml version="1.0" encoding="utf-8"?><html><body><p>short page</p></body></html>',
+    "",
+    "   \n\t ",
+])
+def test_extract_article_falls_through_on_parse_errors(html, monkeypatch):
+    # Force the fallback chain (no trafilatura) regardless of what is installed
+    monkeypatch.setitem(sys.modules, "trafilatura", None)
+    data = fetch_article.extract_article(html, "https://example.com/post")
+    # Thin pages come back with little or no text (main() then exits with code 2) instead of raising
+    assert data is None or len(data["text"]) < 200
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming VTT parser against the original list-based one.
+
+Generates a synthetic YouTube karaoke-style VTT of the requested length,
+checks both implementations produce identical text, and reports wall time
+and peak traced memory for each.
+
+Usage:
+    python bench_parse_vtt.py                 # 1 hour of captions
+    python bench_parse_vtt.py --minutes 240   # 4-hour lecture
+    python bench_parse_vtt.py --file lecture.vtt
+
+Output: one line per implementation printed to stdout.
+"""
+
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from parse_vtt import iter_transcript, parse_vtt
+
+WORDS = (
+    "so the key idea here is that we want to keep latency low while "
+    "still handling the long tail of requests across every region"
+).split()
+
+
+# ---------------------------------------------------------------------------
+# Reference implementation (pre-streaming parse_vtt, kept for comparison)
+# ---------------------------------------------------------------------------
+
+def legacy_parse_vtt(vtt_text: str) -> str:
+    lines = vtt_text.split('\n')
+    segments = []
+    current_start = None
+
+    def parse_timestamp(ts_str):
+        ts_str = ts_str.strip().split(' ')[0]
+        parts = ts_str.split(':')
+        try:
+            if len(parts) == 3:
+                h, m, s = parts
+            else:
+                h, m, s = 0, parts[0], parts[1]
+            s_int, ms = s.split('.')
+            return int(h) * 3600000 + int(m) * 60000 + int(s_int) * 1000 + int(ms.ljust(3, '0')[:3])
+        except Exception:
+            return 0
+
+    def clean_cue_text(text):
+        text = re.sub(r'<\d{1,2}:\d{2}:\d{2}\.\d{3}>', '', text)
+        text = re.sub(r'</?c(?:\.[^>]*)?>', '', text)
+        text = re.sub(r'<[^>]+>', '', text)
+        return re.sub(r'\s+', ' ', text).strip()
+
+    for raw in lines:
+        line = raw.strip()
+        if line.startswith(('WEBVTT', 'Kind:', 'Language:', 'X-TIMESTAMP')) or line.isdigit() or not line:
+            continue
+        if '-->' in line:
+            start_ms = parse_timestamp(line.split('-->')[0])
+            if current_start != start_ms:
+                current_start = start_ms
+            continue
+        cleaned = clean_cue_text(line)
+        if cleaned:
+            segments.append((current_start or 0, cleaned))
+
+    filtered = []
+    for idx, (_, text) in enumerate(segments):
+        if idx + 1 < len(segments):
+            next_text = segments[idx + 1][1]
+            if next_text.startswith(text) and next_text != text:
+                continue
+            if text == next_text:
+                continue
+        filtered.append(text)
+
+    deduped = []
+    prev = None
+    for text in filtered:
+        if text != prev:
+            deduped.append(text)
+            prev = text
+    return ' '.join(deduped)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic input
+# ---------------------------------------------------------------------------
+
+def _ts(ms: int) -> str:
+    h, rem = divmod(ms, 3600000)
+    m, rem = divmod(rem, 60000)
+    s, ms = divmod(rem, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def make_karaoke_vtt(minutes: int) -> str:
+    """Build a karaoke VTT: each 8-word line is revealed one word per cue."""
+    out = ["WEBVTT", "Kind: captions", "Language: en", ""]
+    t = 0
+    w = 0
+    end = minutes * 60000
+    while t < end:
+        line_words = [WORDS[(w + k) % len(WORDS)] for k in range(8)]
+        w += 8
+        for n in range(1, len(line_words) + 1):
+            shown = line_words[:n]
+            tagged = shown[0] + "".join(
+                f"<{_ts(t + 250 * k)}><c> {word}</c>" for k, word in enumerate(shown[1:], 1)
+            )
+            out.append(f"{_ts(t)} --> {_ts(t + 250)} align:start position:0%")
+            out.append(tagged)
+            out.append("")
+            t += 250
+    return "\n".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _measure(fn, repeat=5):
+    """
+    Time `fn` (best of `repeat` runs, so one noisy run does not decide the
+    comparison), then re-run it under tracemalloc (which skews timings) for
+    peak memory.
+    """
+    elapsed = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = min(elapsed, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _stream_file(path: Path) -> int:
+    """Stream the transcript from disk, discarding output (measures parser only)."""
+    count = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for _ in iter_transcript(f):
+            count += 1
+    return count
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    minutes = 60
+    path = None
+    if "--minutes" in args:
+        minutes = int(args[args.index("--minutes") + 1])
+    if "--file" in args:
+        path = Path(args[args.index("--file") + 1])
+
+    generated = path is None
+    if path:
+        vtt_text = path.read_text(encoding="utf-8")
+    else:
+        vtt_text = make_karaoke_vtt(minutes)
+        tmp = tempfile.NamedTemporaryFile("w", suffix=".vtt", delete=False, encoding="utf-8")
+        with tmp:
+            tmp.write(vtt_text)
+        path = Path(tmp.name)
+
+    size_mb = len(vtt_text.encode("utf-8")) / (1024 * 1024)
+    print(f"Input:     {path} ({size_mb:.1f} MB)")
+
+    old, t_old, m_old = _measure(lambda: legacy_parse_vtt(vtt_text))
+    new, t_new, m_new = _measure(lambda: parse_vtt(vtt_text))
+    if old != new:
+        print("Mismatch: streaming output differs from legacy output", file=sys.stderr)
+        sys.exit(1)
+
+    # Streaming from disk: the VTT text is never held in memory
+    del vtt_text
+    _, t_stream, m_stream = _measure(lambda: _stream_file(path))
+
+    print(f"legacy:    {t_old * 1000:8.1f} ms   peak {m_old / 1024:10.0f} KiB")
+    print(f"parse_vtt: {t_new * 1000:8.1f} ms   peak {m_new / 1024:10.0f} KiB")
+    print(f"stream:    {t_stream * 1000:8.1f} ms   peak {m_stream / 1024:10.0f} KiB")
+    print(f"Speedup:   {t_old / t_new:.2f}x")
+
+    if generated:
+        path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP layer for the insight-extractor scripts.
+
+Stdlib-only client with:
+- Per-host keep-alive connection pooling (no TLS handshake per request)
+- gzip / deflate decoding, plus brotli when the `brotli` package is installed
+- Conditional GET (If-None-Match / If-Modified-Since) against a size-bounded on-disk cache
+- Optional body size limit (reading stops at `max_bytes`)
+- Per-host rate limiting so batch crawls don't get throttled
+- HTTP_PROXY / HTTPS_PROXY / NO_PROXY support (CONNECT tunnels for HTTPS)
+
+Usage (from another script):
+    from http_client import get_client
+    resp = get_client().get("https://example.com/post")
+    html = resp.text
+
+Usage (CLI, for debugging):
+    python http_client.py https://example.com/post
+
+Output (CLI): status line and cache/encoding info on stderr, body on stdout.
+"""
+
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import re
+import sys
+import base64
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br" if brotli else "gzip, deflate",
+}
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+MAX_IDLE_PER_HOST = 4
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+VALIDATOR_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+_CHARSET_RE = re.compile(r'charset=["\']?([\w.-]+)', re.I)
+
+
+class Response:
+    """A fully-read HTTP response (body already decompressed)."""
+
+    def __init__(self, status: int, url: str, headers: Dict[str, str], body: bytes,
+                 from_cache: bool = False, truncated: bool = False):
+        self.status = status
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.from_cache = from_cache
+        self.truncated = truncated
+
+    @property
+    def text(self) -> str:
+        """Body decoded with the declared charset (UTF-8 fallback, errors replaced)."""
+        match = _CHARSET_RE.search(self.headers.get("content-type", ""))
+        charset = match.group(1) if match else "utf-8"
+        try:
+            return self.body.decode(charset, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise http.client.HTTPException(f"HTTP Error {self.status} for {self.url}")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _inflate(body: bytes, wbits: int, max_bytes: int) -> bytes:
+    """zlib/gzip decode that accepts a truncated stream and stops after `max_bytes` of output (0 = no limit)."""
+    out = []
+    size = 0
+    while body:
+        decoder = zlib.decompressobj(wbits)
+        chunk = decoder.decompress(body, max_bytes - size if max_bytes else 0)
+        out.append(chunk)
+        size += len(chunk)
+        if max_bytes and size >= max_bytes:
+            break
+        body = decoder.unused_data  # next gzip member, if any
+    return b"".join(out)
+
+
+def decode_body(body: bytes, encoding: str, max_bytes: int = 0, partial: bool = False) -> bytes:
+    """
+    Undo Content-Encoding (gzip, deflate, br). Unknown encodings pass through.
+
+    With `max_bytes`, output stops at that size; `partial` means the body was
+    cut short on the wire, so a truncated compressed stream is decoded as far
+    as it goes instead of raising.
+    """
+    for coding in reversed([c.strip().lower() for c in encoding.split(",") if c.strip()]):
+        if coding in ("gzip", "x-gzip"):
+            body = _inflate(body, 16 + zlib.MAX_WBITS, max_bytes) if (max_bytes or partial) else gzip.decompress(body)
+        elif coding == "deflate":
+            try:
+                body = _inflate(body, zlib.MAX_WBITS, max_bytes)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header
+                body = _inflate(body, -zlib.MAX_WBITS, max_bytes)
+        elif coding == "br" and brotli:
+            body = brotli.Decompressor().process(body) if partial else brotli.decompress(body)
+    return body[:max_bytes] if max_bytes else body
+
+
+class _ResponseCache:
+    """
+    On-disk store of validators (ETag / Last-Modified) and bodies, keyed by URL.
+
+    Hits refresh an entry's mtime, and stores evict least-recently-used
+    entries until the directory fits in `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = CACHE_MAX_BYTES):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.dir / f"{key}.json", self.dir / f"{key}.body"
+
+    def load(self, url: str) -> Optional[Tuple[dict, Path]]:
+        meta_path, body_path = self._paths(url)
+        if not (meta_path.exists() and body_path.exists()):
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            os.utime(body_path)  # mark as recently used
+            return meta, body_path
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, resp: Response) -> None:
+        etag = resp.headers.get("etag")
+        last_modified = resp.headers.get("last-modified")
+        if not (etag or last_modified):
+            return  # nothing to revalidate against
+        meta_path, body_path = self._paths(url)
+        body_path.write_bytes(resp.body)
+        meta = {
+            "url": url,
+            "final_url": resp.url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": resp.headers.get("content-type", ""),
+        }
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove least-recently-used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for body_path in self.dir.glob("*.body"):
+            meta_path = body_path.with_suffix(".json")
+            try:
+                size = body_path.stat().st_size + meta_path.stat().st_size
+                mtime = body_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            entries.append((mtime, size, body_path, meta_path))
+            total += size
+
+        for _, size, body_path, meta_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            meta_path.unlink(missing_ok=True)
+            body_path.unlink(missing_ok=True)
+            total -= size
+
+
+def proxy_for(scheme: str, host: str) -> Optional[str]:
+    """Proxy URL for `scheme`://`host` from the environment (None if unset or bypassed via NO_PROXY)."""
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    return proxy if "://" in proxy else f"http://{proxy}"
+
+
+def _proxy_auth_header(proxy: urllib.parse.SplitResult) -> Dict[str, str]:
+    if proxy.username is None:
+        return {}
+    credentials = f"{urllib.parse.unquote(proxy.username)}:{urllib.parse.unquote(proxy.password or '')}"
+    return {"Proxy-Authorization": "Basic " + base64.b64encode(credentials.encode()).decode("ascii")}
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class HttpClient:
+    """
+    Thread-safe HTTP client with per-host keep-alive pools, conditional GET
+    caching and per-host rate limiting.
+
+    Args:
+        cache_dir: directory for the revalidation cache (None disables it)
+        min_interval: minimum seconds between request starts to the same host
+        timeout: socket timeout in seconds
+        cache_max_bytes: size bound of the revalidation cache directory
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, min_interval: float = 1.0, timeout: float = 30,
+                 cache_max_bytes: int = CACHE_MAX_BYTES):
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.cache = _ResponseCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self._idle: Dict[Tuple[str, str, int, Optional[str]], List[http.client.HTTPConnection]] = {}
+        self._pool_lock = threading.Lock()
+        self._host_locks: Dict[str, threading.Lock] = {}
+        self._last_request: Dict[str, float] = {}
+
+    # --- connection pool ---
+
+    def _acquire(self, key: Tuple[str, str, int, Optional[str]]) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused). Connections go through the key's proxy, if any."""
+        with self._pool_lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        scheme, host, port, proxy = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        if not proxy:
+            return cls(host, port, timeout=self.timeout), False
+        proxy_parts = urllib.parse.urlsplit(proxy)
+        proxy_port = proxy_parts.port or (443 if proxy_parts.scheme == "https" else 80)
+        if scheme == "https":
+            # TLS to the target through a CONNECT tunnel on the proxy
+            conn = http.client.HTTPSConnection(proxy_parts.hostname, proxy_port, timeout=self.timeout)
+            conn.set_tunnel(host, port, headers=_proxy_auth_header(proxy_parts))
+        else:
+            conn = http.client.HTTPConnection(proxy_parts.hostname, proxy_port, timeout=self.timeout)
+        return conn, False
+
+    def _release(self, key: Tuple[str, str, int, Optional[str]], conn: http.client.HTTPConnection) -> None:
+        with self._pool_lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < MAX_IDLE_PER_HOST:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._pool_lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+    # --- rate limiting ---
+
+    def _throttle(self, host: str) -> None:
+        """Block until `min_interval` has passed since the last request to `host`."""
+        if self.min_interval <= 0:
+            return
+        with self._pool_lock:
+            lock = self._host_locks.setdefault(host, threading.Lock())
+        with lock:
+            wait = self._last_request.get(host, 0) + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request[host] = time.monotonic()
+
+    # --- requests ---
+
+    def _request_once(self, url: str, headers: Dict[str, str], throttle: bool = True,
+                      max_bytes: Optional[int] = None) -> Response:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == "https" else 80)
+        proxy = proxy_for(scheme, parts.hostname)
+        key = (scheme, parts.hostname, port, proxy)
+        path = urllib.parse.urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        if proxy and scheme == "http":
+            # Plain HTTP through a proxy: absolute-form request target
+            path = urllib.parse.urlunsplit((scheme, parts.netloc, parts.path or "/", parts.query, ""))
+            headers = {**headers, **_proxy_auth_header(urllib.parse.urlsplit(proxy))}
+
+        if throttle:
+            self._throttle(parts.hostname)
+        for attempt in range(2):
+            conn, reused = self._acquire(key)
+            try:
+                conn.request("GET", path, headers=headers)
+                raw = conn.getresponse()
+                # One byte past the limit tells a body that fits from one that was cut short
+                body = raw.read(max_bytes + 1) if max_bytes else raw.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # server dropped an idle keep-alive connection; retry fresh
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            resp_headers = {k.lower(): v for k, v in raw.getheaders()}
+            truncated = bool(max_bytes) and len(body) > max_bytes
+            if truncated:
+                body = body[:max_bytes]
+            if raw.will_close or truncated:
+                conn.close()  # an unread body remainder makes the connection unusable
+            else:
+                self._release(key, conn)
+
+            encoding = resp_headers.get("content-encoding", "")
+            body = decode_body(body, encoding, max_bytes or 0, truncated)
+            if encoding and max_bytes and len(body) >= max_bytes:
+                truncated = True  # decompressed past the limit
+            return Response(raw.status, url, resp_headers, body, truncated=truncated)
+        raise http.client.HTTPException(f"Could not connect to {parts.hostname}")
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, revalidate: bool = True,
+            max_bytes: Optional[int] = None) -> Response:
+        """
+        GET `url`, following redirects. If a cached copy exists it is
+        revalidated with a conditional request and returned on 304.
+
+        Caller `headers` (which may carry credentials or cookies) are only
+        sent to the original host. With `max_bytes`, reading stops at that
+        many bytes and the response is marked `truncated` (and not cached).
+        """
+        cached = self.cache.load(url) if (self.cache and revalidate) else None
+        validators = {}
+        if cached:
+            meta, _ = cached
+            if meta.get("etag"):
+                validators["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                validators["If-Modified-Since"] = meta["last_modified"]
+
+        origin_host = urllib.parse.urlsplit(url).hostname
+        current = url
+        previous_host = None
+        for _ in range(MAX_REDIRECTS + 1):
+            host = urllib.parse.urlsplit(current).hostname
+            request_headers = dict(DEFAULT_HEADERS)
+            if host == origin_host:
+                request_headers.update(headers or {})
+            # The validators belong to the cached final URL; elsewhere a 304 would be meaningless
+            sent_validators = bool(validators) and current == (cached[0].get("final_url") or url)
+            if sent_validators:
+                request_headers.update(validators)
+            # Redirect hops to the same host are part of one fetch; only the first is rate limited
+            resp = self._request_once(current, request_headers, throttle=host != previous_host, max_bytes=max_bytes)
+            previous_host = host
+            if resp.status in REDIRECT_CODES and resp.headers.get("location"):
+                current = urllib.parse.urljoin(current, resp.headers["location"])
+                continue
+            break
+        else:
+            raise http.client.HTTPException(f"Too many redirects for {url}")
+
+        if resp.status == 304 and sent_validators:
+            meta, body_path = cached
+            return Response(
+                200,
+                meta.get("final_url") or url,
+                {"content-type": meta.get("content_type", "")},
+                body_path.read_bytes(),
+                from_cache=True,
+            )
+
+        if resp.status == 200 and self.cache and not resp.truncated:
+            self.cache.store(url, resp)
+        return resp
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client(cache_dir: Optional[Path] = Path("raw/.http-cache")) -> HttpClient:
+    """Process-wide shared client (created on first use)."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient(cache_dir=cache_dir)
+        return _default_client
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: http_client.py <url>", file=sys.stderr)
+        sys.exit(1)
+    resp = get_client().get(sys.argv[1])
+    print(f"HTTP {resp.status}  {resp.url}  cache={'hit' if resp.from_cache else 'miss'}  "
+          f"{len(resp.body):,} bytes", file=sys.stderr)
+    print(resp.text)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ Parse WebVTT transcript to clean plain text.
 Handles YouTube's karaoke-style VTT (where each word appears incrementally
 in overlapping cues), stripping timing metadata and deduplicating text.
 
+The parser is streaming: it consumes the VTT line by line and collapses
+karaoke duplicates online, so memory stays flat for multi-hour transcripts
+when reading from a file or stdin.
+
 Usage:
     # Pipe VTT JSON field:
     echo '...vtt text...' | python parse_vtt.py
@@ -15,143 +19,302 @@ Usage:
     # From argument (inline text):
     python parse_vtt.py "WEBVTT\nKind: captions\n..."
 
-Output: Clean transcript text printed to stdout.
+    # Timestamped segments as JSONL ({"start","end","text"}, ms):
+    python parse_vtt.py --segments transcript.vtt
+
+    # Chunks of at most 5 minutes / 2000 tokens as JSONL:
+    python parse_vtt.py --window 300 --max-tokens 2000 transcript.vtt
+
+Output: Clean transcript text (or JSONL records) printed to stdout.
 """
 
+import io
+import json
 import re
 import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 
-def parse_vtt(vtt_text: str) -> str:
-    """
-    Parse WebVTT format to clean transcript text.
+# Inline timestamp tags like <00:00:01.280>
+_INLINE_TS_RE = re.compile(r'<\d{1,2}:\d{2}:\d{2}\.\d{3}>')
+# <c> and </c> and <c.color> tags
+_C_TAG_RE = re.compile(r'</?c(?:\.[^>]*)?>')
+# Any remaining HTML tags
+_TAG_RE = re.compile(r'<[^>]+>')
+
+_HEADER_PREFIXES = ('WEBVTT', 'Kind:', 'Language:', 'X-TIMESTAMP')
+
+
+# ---------------------------------------------------------------------------
+# Cue-level helpers
+# ---------------------------------------------------------------------------
+
+def parse_timestamp(ts_str: str) -> int:
+    """Convert HH:MM:SS.mmm or MM:SS.mmm to milliseconds."""
+    ts_str = ts_str.strip().split(' ')[0]  # remove align/position tags
+    parts = ts_str.split(':')
+    try:
+        if len(parts) == 3:
+            h, m, s = parts
+        else:
+            h, m, s = 0, parts[0], parts[1]
+        s_int, ms = s.split('.')
+        return int(h) * 3600000 + int(m) * 60000 + int(s_int) * 1000 + int(ms.ljust(3, '0')[:3])
+    except Exception:
+        return 0
 
-    YouTube's VTT format uses karaoke cues: each cue extends the previous
-    line with one more word, e.g.:
-        cue 1: "Hello"
-        cue 2: "Hello world"       <- overlaps cue 1
-        cue 3: "Hello world this"  <- overlaps cue 2
 
-    Strategy: extract the last (most complete) text from each timestamp group,
-    then deduplicate adjacent identical or prefix-subset lines.
+def clean_cue_text(text: str) -> str:
+    """Strip inline timing tags and HTML-like tags from a cue text line."""
+    if '<' in text:
+        text = _INLINE_TS_RE.sub('', text)
+        text = _C_TAG_RE.sub('', text)
+        text = _TAG_RE.sub('', text)
+    # Normalize whitespace
+    return ' '.join(text.split())
+
+
+# ---------------------------------------------------------------------------
+# Streaming parser
+# ---------------------------------------------------------------------------
+
+def iter_cue_lines(lines: Iterable[str]) -> Iterator[Tuple[int, int, str]]:
     """
-    lines = vtt_text.split('\n')
-    segments = []   # (start_ms, text)
-    current_start = None
-    current_text = None
-
-    def parse_timestamp(ts_str: str) -> int:
-        """Convert HH:MM:SS.mmm or MM:SS.mmm to milliseconds."""
-        ts_str = ts_str.strip().split(' ')[0]  # remove align/position tags
-        parts = ts_str.split(':')
-        try:
-            if len(parts) == 3:
-                h, m, s = parts
-            else:
-                h, m, s = 0, parts[0], parts[1]
-            s_int, ms = s.split('.')
-            return int(h) * 3600000 + int(m) * 60000 + int(s_int) * 1000 + int(ms.ljust(3, '0')[:3])
-        except Exception:
-            return 0
-
-    def clean_cue_text(text: str) -> str:
-        """Strip inline timing tags and HTML-like tags from a cue text line."""
-        # Remove inline timestamp tags like <00:00:01.280>
-        text = re.sub(r'<\d{1,2}:\d{2}:\d{2}\.\d{3}>', '', text)
-        # Remove <c> and </c> and <c.color> tags
-        text = re.sub(r'</?c(?:\.[^>]*)?>', '', text)
-        # Remove any remaining HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
+    Yield (start_ms, end_ms, cleaned_text) for every non-empty cue text line.
+
+    `lines` can be any iterable of strings (an open file, sys.stdin, a list);
+    it is consumed lazily, one line at a time.
+    """
+    current_start = 0
+    current_end = 0
+
+    for raw in lines:
+        line = raw.strip()
+
+        # Empty line = end of cue block
+        if not line:
+            continue
 
         # Skip WEBVTT header and metadata
-        if line.startswith('WEBVTT') or line.startswith('Kind:') or line.startswith('Language:') or line.startswith('X-TIMESTAMP'):
-            i += 1
+        if line.startswith(_HEADER_PREFIXES):
             continue
 
         # Cue numeric identifier (optional line before timestamp)
         if line.isdigit():
-            i += 1
             continue
 
         # Timestamp line
         if '-->' in line:
-            parts = line.split('-->')
-            start_ms = parse_timestamp(parts[0])
-            if current_start != start_ms:
-                current_start = start_ms
-                current_text = None
-            i += 1
-            continue
-
-        # Empty line = end of cue block
-        if not line:
-            i += 1
+            start, end = line.split('-->', 1)
+            current_start = parse_timestamp(start)
+            current_end = parse_timestamp(end)
             continue
 
-        # Text line: clean and accumulate (take last/most-complete line per cue)
         cleaned = clean_cue_text(line)
         if cleaned:
-            current_text = cleaned
-            # Check if next non-empty line is still part of this cue
-            # For multi-line cues, we want to collect all lines
-            # But for YouTube karaoke format, we want just the last (complete) line
-            segments.append((current_start or 0, cleaned))
-
-        i += 1
-
-    # Deduplicate: remove lines that are exact prefixes of the immediately next line
-    # This collapses the karaoke duplicates
-    filtered = []
-    for idx, (ts, text) in enumerate(segments):
-        if idx + 1 < len(segments):
-            next_text = segments[idx + 1][1]
-            # Skip if current text is a leading substring of the next
-            if next_text.startswith(text) and next_text != text:
-                continue
-            # Skip exact duplicates
-            if text == next_text:
-                continue
-        filtered.append(text)
-
-    # Further dedup: collapse consecutive identical lines
-    deduped = []
-    prev = None
-    for text in filtered:
-        if text != prev:
-            deduped.append(text)
-            prev = text
-
-    # Join into paragraphs - use space, since these are flowing speech segments
-    return ' '.join(deduped)
+            yield current_start, current_end, cleaned
+
+
+def iter_segments(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield deduplicated transcript segments as {"start", "end", "text"} records.
+
+    YouTube's VTT format uses karaoke cues: each cue extends the previous
+    line with one more word, e.g.:
+        cue 1: "Hello"
+        cue 2: "Hello world"       <- overlaps cue 1
+        cue 3: "Hello world this"  <- overlaps cue 2
+
+    Collapse is done online with O(1) state: a segment is held back until
+    the next one arrives, and dropped if the next one starts with it (i.e.
+    it was an incomplete karaoke prefix or an exact repeat). Consecutive
+    identical segments that survive are emitted once.
+
+    A collapsed segment spans from the start of its first karaoke cue to
+    the end of its last one. Times are in milliseconds.
+    """
+    pending: Optional[str] = None
+    pending_start = pending_end = 0
+    last_emitted: Optional[str] = None
+
+    for start, end, text in iter_cue_lines(lines):
+        if pending is not None and text.startswith(pending):
+            # Karaoke extension (or repeat): keep the original start time
+            pending, pending_end = text, max(pending_end, end)
+            continue
+        if pending is not None and pending != last_emitted:
+            yield {"start": pending_start, "end": pending_end, "text": pending}
+            last_emitted = pending
+        pending, pending_start, pending_end = text, start, end
+
+    if pending is not None and pending != last_emitted:
+        yield {"start": pending_start, "end": pending_end, "text": pending}
+
+
+def iter_transcript(lines: Iterable[str]) -> Iterator[str]:
+    """Yield deduplicated transcript text segments from VTT lines."""
+    for segment in iter_segments(lines):
+        yield segment["text"]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate (~4 characters per token for English)."""
+    return max(1, len(text) // 4)
+
+
+def window_segments(
+    segments: Iterable[Dict[str, Any]],
+    max_seconds: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Group segments into consecutive chunks for parallel downstream processing.
+
+    A chunk is closed before adding a segment that would make it span more
+    than `max_seconds` or exceed `max_tokens` (estimated). A single segment
+    larger than the budget becomes its own chunk. With neither limit set,
+    the whole transcript is one chunk.
+
+    Yields {"index", "start", "end", "tokens", "text"} records.
+    """
+    max_ms = max_seconds * 1000 if max_seconds else None
+    index = 0
+    parts: List[str] = []
+    start = end = tokens = 0
+
+    for seg in segments:
+        seg_tokens = estimate_tokens(seg["text"])
+        if parts and (
+            (max_ms is not None and seg["end"] - start > max_ms)
+            or (max_tokens is not None and tokens + seg_tokens > max_tokens)
+        ):
+            yield {"index": index, "start": start, "end": end, "tokens": tokens, "text": ' '.join(parts)}
+            index += 1
+            parts = []
+            tokens = 0
+        if not parts:
+            start = seg["start"]
+        parts.append(seg["text"])
+        end = max(end, seg["end"])
+        tokens += seg_tokens
+
+    if parts:
+        yield {"index": index, "start": start, "end": end, "tokens": tokens, "text": ' '.join(parts)}
+
+
+def write_jsonl(records: Iterable[Dict[str, Any]], out=None) -> int:
+    """Write records as compact JSON lines to `out` (default: stdout). Returns the count."""
+    out = out or sys.stdout
+    count = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        out.write('\n')
+        count += 1
+    return count
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """Yield the lines of `text` lazily (no intermediate list or copy of the text)."""
+    start = 0
+    find = text.find
+    while True:
+        end = find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def parse_vtt(vtt_text: str) -> str:
+    """
+    Parse WebVTT format to clean transcript text.
+
+    Thin wrapper over `iter_transcript` for callers that already hold the
+    whole VTT in memory; lines are sliced from the text one at a time rather
+    than split into a list up front. Segments are joined with spaces, since
+    these are flowing speech segments.
+    """
+    return ' '.join(iter_transcript(_iter_lines(vtt_text)))
+
+
+def write_transcript(lines: Iterable[str], out=None) -> int:
+    """
+    Stream the clean transcript for `lines` to `out` (default: stdout),
+    space-separated, without building the full text in memory.
+
+    Returns the number of segments written.
+    """
+    out = out or sys.stdout
+    count = 0
+    for text in iter_transcript(lines):
+        if count:
+            out.write(' ')
+        out.write(text)
+        count += 1
+    return count
+
+
+def _track_content(lines: Iterable[str], seen: list) -> Iterator[str]:
+    """Pass lines through, recording whether any non-blank line was seen."""
+    for line in lines:
+        if not seen and line.strip():
+            seen.append(True)
+        yield line
+
+
+def _pop_option(args: list, name: str) -> Optional[str]:
+    """Remove `name VALUE` from args and return VALUE (None if absent)."""
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args):
+            value = args[idx + 1]
+            del args[idx:idx + 2]
+            return value
+    return None
 
 
 def main():
-    if len(sys.argv) > 1:
-        arg = sys.argv[1]
+    args = sys.argv[1:]
+    window = _pop_option(args, '--window')
+    max_tokens = _pop_option(args, '--max-tokens')
+    as_segments = '--segments' in args
+    args = [a for a in args if a != '--segments']
+
+    def run(lines):
+        if window or max_tokens:
+            chunks = window_segments(
+                iter_segments(lines),
+                max_seconds=float(window) if window else None,
+                max_tokens=int(max_tokens) if max_tokens else None,
+            )
+            write_jsonl(chunks)
+        elif as_segments:
+            write_jsonl(iter_segments(lines))
+        else:
+            write_transcript(lines)
+            # Blank input yields no segments, so nothing has been written yet
+            if seen:
+                sys.stdout.write('\n')
+
+    seen = []
+    if args:
+        arg = args[0]
         # Try to open as file
         try:
-            with open(arg, 'r', encoding='utf-8') as f:
-                vtt_text = f.read()
+            f = open(arg, 'r', encoding='utf-8')
         except (FileNotFoundError, OSError):
             # Treat as raw VTT text (unescape \n if passed as single argument)
-            vtt_text = arg.replace('\\n', '\n')
+            f = io.StringIO(arg.replace('\\n', '\n'))
+        with f:
+            run(_track_content(f, seen))
     else:
-        vtt_text = sys.stdin.read()
+        run(_track_content(sys.stdin, seen))
 
-    if not vtt_text.strip():
+    if not seen:
         print("Error: No VTT content provided.", file=sys.stderr)
         sys.exit(1)
 
-    result = parse_vtt(vtt_text)
-    print(result)
-
 
 if __name__ == '__main__':
     main()